@@ -0,0 +1,106 @@
+"""
+ابزارهای مشترک برای changelistهای بزرگ ادمین.
+
+- EstimatedCountPaginator: برای changelist بدون فیلتر به جای COUNT(*) از آمار
+  جدول در خود دیتابیس (pg_class.reltuples در PostgreSQL، information_schema در
+  MySQL) استفاده می‌کند؛ اگر تخمین کمتر از ADMIN_ESTIMATED_COUNT_THRESHOLD باشد
+  یا دیتابیس آماری نداشته باشد (SQLite) همان COUNT دقیق اجرا می‌شود.
+- IndexedSearchMixin: جست‌وجو فقط با برابری/پیشوند روی ستون‌های ایندکس‌دار
+  (به جای icontains که کل جدول را اسکن می‌کند). پیشوند در PostgreSQL با
+  collation غیر C فقط از ایندکس varchar_pattern_ops استفاده می‌کند؛ Django آن
+  را برای CharField با unique/db_index خودکار می‌سازد، ولی نه برای Meta.indexes.
+- ScalableAdminMixin: ترکیب دو مورد بالا + show_full_result_count=False.
+"""
+
+from django.conf import settings
+from django.contrib.admin.utils import get_fields_from_path
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+DEFAULT_THRESHOLD = 10000
+PREFIX_LOOKUPS = ("startswith", "istartswith")
+
+
+def estimated_row_count(model, using: str = "default"):
+    """تعداد تقریبی ردیف‌های جدول از آمار دیتابیس؛ None اگر در دسترس نباشد."""
+    connection = connections[using]
+    table = model._meta.db_table
+    if connection.vendor == "postgresql":
+        sql = "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)"
+    elif connection.vendor == "mysql":
+        sql = (
+            "SELECT TABLE_ROWS FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s"
+        )
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [table])
+            row = cursor.fetchone()
+    except Exception:
+        return None
+    # reltuples = -1 یعنی جدول هنوز ANALYZE نشده است
+    if not row or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        qs = self.object_list
+        query = getattr(qs, "query", None)
+        # فقط لیست کامل جدول؛ با فیلتر/جست‌وجو تخمین جدول معنا ندارد
+        if query is not None and not query.where:
+            threshold = getattr(
+                settings, "ADMIN_ESTIMATED_COUNT_THRESHOLD", DEFAULT_THRESHOLD
+            )
+            estimate = estimated_row_count(qs.model, qs.db)
+            if estimate is not None and estimate >= threshold:
+                return estimate
+        return super().count
+
+
+def _search_value(model, lookup: str, term: str):
+    """مقدار قابل مقایسه برای lookup، یا None اگر term با نوع ستون جور نیست."""
+    path, _sep, suffix = lookup.rpartition("__")
+    if suffix not in PREFIX_LOOKUPS:
+        path, suffix = lookup, "exact"
+    field = get_fields_from_path(model, path)[-1]
+    if suffix != "exact":
+        return term
+    try:
+        value = field.to_python(term)
+    except ValidationError:
+        return None
+    return value if value not in (None, "") else None
+
+
+class IndexedSearchMixin:
+    """
+    search_fields اینجا lookup دقیق‌اند: «phone» یعنی برابری و
+    «sku__startswith» یعنی پیشوند؛ مقدارهایی که با نوع ستون نمی‌خوانند (مثلاً
+    متن برای id) نادیده گرفته می‌شوند.
+    """
+
+    def get_search_results(self, request, queryset, search_term):
+        term = (search_term or "").strip()
+        if not term:
+            return queryset, False
+        cond = Q()
+        for lookup in self.get_search_fields(request):
+            value = _search_value(queryset.model, lookup, term)
+            if value is not None:
+                cond |= Q(**{lookup: value})
+        if not cond:
+            return queryset.none(), False
+        return queryset.filter(cond), False
+
+
+class ScalableAdminMixin(IndexedSearchMixin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
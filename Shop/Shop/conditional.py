@@ -0,0 +1,78 @@
+"""
+پاسخ شرطی (ETag / Last-Modified => 304) برای صفحه‌های کاتالوگ.
+
+- هر view یک تابع resolve ارزان دارد که قبل از queryset سنگین اجرا می‌شود و
+  (کلید منبع، زمان آخرین تغییر) یا None (=> 404 را خود view می‌دهد) برمی‌گرداند.
+  resolve یک lookup ساده است، نه aggregate؛ زمان تغییر لیست‌ها همان نسخهٔ
+  کاتالوگ است و زمان آخرین تغییر می‌تواند None باشد.
+- ETag = هش کلید + querystring استاندارد + نسخهٔ کاتالوگ (Shop.page_cache)؛
+  پس هر تغییر کاتالوگ (منو، دسته‌ها، …) هم ETag را عوض می‌کند.
+- Last-Modified = بیشینهٔ زمان تغییر منبع و زمان آخرین تغییر کاتالوگ؛
+  فقط وقتی querystring خالی است (پارامترها در زمان دیده نمی‌شوند).
+- کاربر واردشده یا پیام flash در انتظار => بدون پاسخ شرطی (HTML شخصی است)؛
+  برای پاسخ‌هایی که به کاربر وابسته نیستند (مثل JSON شهرها) personal=False.
+"""
+
+import hashlib
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.views.decorators.http import condition
+
+from .page_cache import canonical_querystring, catalog_state
+
+_UNSET = object()
+
+
+def conditional_allowed(request) -> bool:
+    if "messages" in request.COOKIES:
+        return False
+    if settings.SESSION_COOKIE_NAME not in request.COOKIES:
+        # بدون کوکی session، session اصلاً خوانده نمی‌شود
+        return True
+    session = request.session
+    return not (session.get("_auth_user_id") or session.get("_messages"))
+
+
+def _validators(request, resolve, personal, args, kwargs):
+    if personal and not conditional_allowed(request):
+        return None, None
+    resolved = resolve(request, *args, **kwargs)
+    if resolved is None:
+        return None, None
+    key, changed_at = resolved
+    query = canonical_querystring(request.GET)
+    version, catalog_changed_at = catalog_state()
+
+    raw = f"{key}|{query}|v{version}"
+    if changed_at is not None:
+        raw += f"|{changed_at.timestamp()}"
+    etag = hashlib.blake2b(raw.encode("utf-8"), digest_size=12).hexdigest()
+
+    last_modified = None
+    if not query:
+        catalog_changed = datetime.fromtimestamp(catalog_changed_at, tz=dt_timezone.utc)
+        last_modified = max(filter(None, (changed_at, catalog_changed)))
+    return etag, last_modified
+
+
+def catalog_condition(resolve, personal: bool = True):
+    """
+    دکوراتور view؛ resolve(request, *args, **kwargs) -> (key, datetime | None) | None.
+    ETag و Last-Modified با یک بار اجرای resolve محاسبه می‌شوند.
+    """
+
+    def state(request, *args, **kwargs):
+        cached = getattr(request, "_catalog_condition", _UNSET)
+        if cached is _UNSET:
+            cached = _validators(request, resolve, personal, args, kwargs)
+            request._catalog_condition = cached
+        return cached
+
+    def etag_func(request, *args, **kwargs):
+        return state(request, *args, **kwargs)[0]
+
+    def last_modified_func(request, *args, **kwargs):
+        return state(request, *args, **kwargs)[1]
+
+    return condition(etag_func=etag_func, last_modified_func=last_modified_func)
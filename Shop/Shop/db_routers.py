@@ -0,0 +1,127 @@
+"""
+مسیریابی دیتابیس: خواندن‌های کاتالوگ به replica، بقیه (و همهٔ نوشتن‌ها) به primary.
+
+خواندن بعد از نوشتن (read-your-writes):
+- در طول درخواستی که روی کاتالوگ نوشته (یا متد غیرامن دارد)، همهٔ خواندن‌ها از primary است.
+- ReplicaPinningMiddleware بعد از چنین درخواستی یک کوکی کوتاه‌عمر می‌گذارد تا
+  درخواست‌های بعدی همان کاربر هم تا REPLICA_PIN_SECONDS از primary بخوانند
+  (فاصلهٔ تأخیر replication).
+- داخل transaction.atomic روی primary هم خواندن‌ها به replica نمی‌روند.
+- pin بعد از نوشتن فقط داخل request_scope است؛ بیرون از آن (management command،
+  ورکر) نوشتن pin نمی‌کند تا پروسهٔ طولانی بعد از اولین نوشتن برای همیشه به
+  primary نچسبد. کدی که بیرون از درخواست باید نوشتهٔ خودش را بخواند دورش
+  use_primary() می‌گذارد (import_catalog، sync_stock، run_image_worker).
+
+اگر DATABASE_REPLICAS خالی باشد، router هیچ اثری ندارد.
+"""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# اپ/مدل‌هایی که فقط خوانده می‌شوند و کمی عقب بودن‌شان اشکالی ندارد
+CATALOG_APPS = {"products"}
+CATALOG_MODELS = {"accounts.city", "accounts.province"}
+# صف ورکر تصویر، نسخهٔ کاتالوگ (کش صفحه/ETag) و جدول‌های buildهای افزایشی
+# (که همان build دوباره می‌خواندشان) باید همیشه تازه باشند
+PRIMARY_ONLY_MODELS = {
+    "products.imagejob",
+    "products.catalogversion",
+    "products.neighborbuild",
+    "products.productneighbor",
+    "products.productcooccurrence",
+}
+
+_pinned = ContextVar("db_pinned_to_primary", default=False)
+_wrote = ContextVar("db_wrote_in_request", default=False)
+_scoped = ContextVar("db_in_request_scope", default=False)
+
+
+def replica_aliases():
+    return [
+        alias
+        for alias in getattr(settings, "DATABASE_REPLICAS", [])
+        if alias in settings.DATABASES
+    ]
+
+
+def pin_to_primary():
+    _pinned.set(True)
+
+
+def is_pinned() -> bool:
+    return _pinned.get()
+
+
+def wrote_in_request() -> bool:
+    return _wrote.get()
+
+
+@contextmanager
+def use_primary():
+    """
+    برای کدهایی که بیرون از چرخهٔ درخواست (مثلاً management command) تازه‌ترین داده را لازم دارند.
+    """
+    token = _pinned.set(True)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+@contextmanager
+def request_scope(pinned: bool = False):
+    """وضعیت pin/نوشتن را برای یک درخواست جدا نگه می‌دارد."""
+    pin_token = _pinned.set(pinned)
+    wrote_token = _wrote.set(False)
+    scope_token = _scoped.set(True)
+    try:
+        yield
+    finally:
+        _pinned.reset(pin_token)
+        _wrote.reset(wrote_token)
+        _scoped.reset(scope_token)
+
+
+def _is_catalog(model) -> bool:
+    label = model._meta.label_lower
+    if label in PRIMARY_ONLY_MODELS:
+        return False
+    return model._meta.app_label in CATALOG_APPS or label in CATALOG_MODELS
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = replica_aliases()
+        if not replicas or not _is_catalog(model):
+            return None
+        if _pinned.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        # فقط نوشتن روی مدل‌های کاتالوگ مهم است؛ بقیه همیشه از primary خوانده می‌شوند
+        if _is_catalog(model) and _scoped.get():
+            _pinned.set(True)
+            _wrote.set(True)
+        # شیئی که از replica خوانده شده باید روی primary نوشته شود؛
+        # در بقیهٔ حالت‌ها رفتار پیش‌فرض Django (همان دیتابیس شیء یا default)
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db in replica_aliases():
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replicaها از primary کپی می‌شوند و خودشان migrate نمی‌شوند
+        if db in replica_aliases():
+            return False
+        return None
@@ -0,0 +1,74 @@
+import time
+
+from django.conf import settings
+from django.utils.cache import patch_cache_control
+
+from .db_routers import replica_aliases, request_scope, wrote_in_request
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS", "TRACE")
+
+
+class ImmutableAssetsMiddleware:
+    """
+    فایل‌های media/cas (نام = هش محتوا) تغییرناپذیرند؛ پس برای همیشه کش می‌شوند.
+    فقط مسیرهایی را می‌پوشاند که خود Django سرو می‌کند (media با static() در
+    urls)؛ STATIC_URL را runserver پیش از middleware و در production وب‌سرور سرو
+    می‌کند، پس هدر immutable نام‌های هش‌دار استاتیک باید در وب‌سرور تنظیم شود.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix = (
+            settings.MEDIA_URL.rstrip("/") + "/cas/" if settings.MEDIA_URL else ""
+        )
+        self.max_age = getattr(settings, "IMMUTABLE_ASSETS_MAX_AGE", 31536000)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            self.prefix
+            and response.status_code == 200
+            and request.path.startswith(self.prefix)
+        ):
+            patch_cache_control(
+                response, public=True, max_age=self.max_age, immutable=True
+            )
+        return response
+
+
+class ReplicaPinningMiddleware:
+    """
+    read-your-writes برای Shop.db_routers: درخواست‌های غیرامن و درخواست‌هایی
+    که در پنجرهٔ کوکی pin هستند از primary می‌خوانند؛ بعد از هر نوشتن کوکی تمدید می‌شود.
+    """
+
+    cookie_name = "db_pin"
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.seconds = getattr(settings, "REPLICA_PIN_SECONDS", 5)
+
+    def __call__(self, request):
+        if not replica_aliases():
+            return self.get_response(request)
+
+        pinned = request.method not in SAFE_METHODS or self._cookie_valid(request)
+        with request_scope(pinned=pinned):
+            response = self.get_response(request)
+            wrote = wrote_in_request()
+
+        if wrote or request.method not in SAFE_METHODS:
+            response.set_cookie(
+                self.cookie_name,
+                str(int(time.time()) + self.seconds),
+                max_age=self.seconds,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+    def _cookie_valid(self, request) -> bool:
+        try:
+            return int(request.COOKIES.get(self.cookie_name, 0)) > time.time()
+        except ValueError:
+            return False
@@ -0,0 +1,274 @@
+"""
+کش صفحه برای کاربران مهمان (صفحه‌های کاتالوگ).
+
+- کلید: نام view + مسیر + querystring استاندارد (مرتب، بدون پارامترهای ردیابی/خالی)
+  + نسخهٔ کاتالوگ. هر تغییر کاتالوگ (save/delete مدل‌ها یا سیگنال catalog_changed)
+  نسخه را بالا می‌برد؛ جز save فقط موجودی (checkout) که فقط صفحهٔ همان محصول را
+  پاک می‌کند (drop_pages). نسخه در دیتابیس (products.CatalogVersion) است، نه در کش،
+  تا bump یک ورکر یا یک management command (sync_stock، import_catalog، …) فوراً
+  به همهٔ پروسه‌ها برسد؛ هزینه‌اش یک کوئری pk برای هر درخواست مهمان است.
+- stale-while-revalidate: بعد از انقضا (یا تغییر نسخه) تا PAGE_CACHE["stale"] ثانیه
+  نسخهٔ قبلی سرو می‌شود و فقط یک درخواست (با قفل cache.add) صفحه را دوباره می‌سازد.
+- دور زدن کش: متدهای غیر GET/HEAD، کاربر واردشده (از جمله staff)، سبد غیرخالی
+  و پیام‌های flash در انتظار.
+- صفحهٔ مهمان به session و CSRF دست نمی‌زند: فیلد CSRF خالی رندر می‌شود
+  (_csrf_field.html) و نشان سبد/توکن سمت کاربر از کوکی یا cart/summary/ پر می‌شوند.
+  پس پاسخ بدون Set-Cookie و Vary: Cookie است و با Cache-Control public/s-maxage
+  (PAGE_CACHE["edge_ttl"]) در CDN هم کش می‌شود.
+- CDN باید درخواست‌های دارای کوکی sessionid را از کش عبور دهد (bypass)؛
+  این درخواست‌ها اینجا private علامت می‌خورند.
+"""
+
+import hashlib
+import time
+from functools import wraps
+from urllib.parse import unquote, urlencode
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import F
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+
+from .surrogate import surrogate_header
+
+DEFAULTS = {
+    "alias": "default",
+    "ttl": 120,
+    "stale": 600,
+    "lock_timeout": 30,
+    "edge_ttl": 60,
+    "edge_stale": 300,
+    "ttls": {},
+}
+# پارامترهایی که محتوای صفحه را عوض نمی‌کنند
+IGNORED_PARAMS = {"gclid", "fbclid", "yclid", "_"}
+STORED_HEADERS = ("Content-Type", "Content-Language", "Last-Modified", "ETag")
+
+
+def _conf():
+    return {**DEFAULTS, **getattr(settings, "PAGE_CACHE", {})}
+
+
+def _cache():
+    return caches[_conf()["alias"]]
+
+
+def _version_model():
+    return apps.get_model("products", "CatalogVersion")
+
+
+def catalog_state() -> tuple:
+    """
+    (نسخه، epoch آخرین تغییر) با یک کوئری روی ردیف pk=1.
+    اگر ردیف نباشد «الان» فرض می‌شود که محافظه‌کارانه است (304 اشتباه نمی‌دهد).
+    """
+    row = _version_model().objects.filter(pk=1).values_list("version", "changed_at")
+    row = row.first()
+    if row is None:
+        return 0, time.time()
+    return row[0], row[1].timestamp()
+
+
+def get_catalog_version() -> int:
+    return catalog_state()[0]
+
+
+def get_catalog_changed_at() -> float:
+    """زمان (epoch) آخرین تغییر کاتالوگ؛ برای Last-Modified."""
+    return catalog_state()[1]
+
+
+def _bump():
+    CatalogVersion = _version_model()
+    now = timezone.now()
+    updated = CatalogVersion.objects.filter(pk=1).update(
+        version=F("version") + 1, changed_at=now
+    )
+    if not updated:
+        CatalogVersion.objects.get_or_create(
+            pk=1, defaults={"version": int(now.timestamp() * 1000), "changed_at": now}
+        )
+
+
+def bump_catalog_version(**kwargs):
+    """
+    گیرندهٔ سیگنال هم هست (آرگومان‌های اضافه نادیده گرفته می‌شوند).
+    داخل تراکنش یک‌بار و بعد از commit اجرا می‌شود تا قفل ردیف نسخه فقط
+    لحظه‌ای گرفته شود (نه تا پایان تراکنش checkout).
+    """
+    connection = transaction.get_connection()
+    if connection.in_atomic_block:
+        if not any(item[1] is _bump for item in connection.run_on_commit):
+            transaction.on_commit(_bump)
+    else:
+        _bump()
+
+
+def drop_pages(name: str, paths):
+    """
+    کش صفحه‌های name روی paths (خروجی reverse، بدون querystring) را پاک می‌کند،
+    هم نسخهٔ فعلی و هم stale؛ برای تغییری که عمداً نسخهٔ کاتالوگ را بالا نمی‌برد
+    (موجودی).
+    صفحه‌های همان مسیر با querystring تا پایان TTL خودشان می‌مانند.
+    """
+    version = get_catalog_version()
+    keys = []
+    for path in paths:
+        # request.path رمزگشایی‌شده است (slug فارسی)، reverse درصدی
+        base = _path_key(name, unquote(path))
+        keys += [f"{base}:v{version}", f"{base}:last"]
+    if keys:
+        _cache().delete_many(keys)
+
+
+def canonical_querystring(querydict) -> str:
+    items = []
+    for key in sorted(querydict.keys()):
+        if key in IGNORED_PARAMS or key.startswith("utm_"):
+            continue
+        for value in sorted(querydict.getlist(key)):
+            if value == "":
+                continue
+            if key == "page" and value == "1":
+                continue
+            items.append((key, value))
+    return urlencode(items)
+
+
+def _page_key(name: str, request) -> str:
+    return _path_key(name, request.path, canonical_querystring(request.GET))
+
+
+def _path_key(name: str, path: str, query: str = "") -> str:
+    raw = f"{path}?{query}"
+    digest = hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+    return f"page:{name}:{digest}"
+
+
+def should_bypass(request) -> bool:
+    if request.method not in ("GET", "HEAD"):
+        return True
+    if "messages" in request.COOKIES:
+        return True
+    if settings.SESSION_COOKIE_NAME in request.COOKIES:
+        # فقط وقتی کوکی session هست session خوانده می‌شود
+        from cart.cart import CART_SESSION_ID
+
+        session = request.session
+        if (
+            session.get("_auth_user_id")
+            or session.get(CART_SESSION_ID)
+            or session.get("_messages")
+        ):
+            return True
+    return False
+
+
+def _serialize(response) -> dict:
+    return {
+        "status": response.status_code,
+        "content": response.content,
+        "headers": {
+            h: response[h]
+            for h in (*STORED_HEADERS, surrogate_header())
+            if response.has_header(h)
+        },
+        "created": time.time(),
+    }
+
+
+def _to_response(entry, state: str):
+    response = HttpResponse(entry["content"], status=entry["status"])
+    for header, value in entry["headers"].items():
+        response[header] = value
+    response["X-Page-Cache"] = state
+    return response
+
+
+def _edge_headers(request, response, conf):
+    """
+    پاسخ مشترک مهمان را برای CDN قابل کش می‌کند؛ هر چیز شخصی => private.
+    """
+    session = getattr(request, "session", None)
+    has_session_cookie = settings.SESSION_COOKIE_NAME in request.COOKIES
+    if session is not None and not has_session_cookie and not session.modified:
+        # خواندن session خالی (مثلاً request.user در قالب) نباید Vary: Cookie بگذارد
+        session.accessed = False
+    if response.cookies or has_session_cookie or (session and session.modified):
+        patch_cache_control(response, private=True)
+    else:
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=0,
+            s_maxage=conf["edge_ttl"],
+            stale_while_revalidate=conf["edge_stale"],
+        )
+    return response
+
+
+def _cacheable(response) -> bool:
+    if response.status_code != 200 or response.streaming:
+        return False
+    cc = response.get("Cache-Control", "")
+    return "private" not in cc and "no-store" not in cc
+
+
+def anonymous_page_cache(name: str, ttl: int | None = None):
+    """
+    دکوراتور view؛ name برای کلید و برای TTL اختصاصی در PAGE_CACHE["ttls"] است.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            conf = _conf()
+            if not conf.get("enabled", True):
+                return view(request, *args, **kwargs)
+            if should_bypass(request):
+                response = view(request, *args, **kwargs)
+                if request.method in ("GET", "HEAD"):
+                    patch_cache_control(response, private=True)
+                return response
+
+            cache = _cache()
+            fresh_ttl = ttl or conf["ttls"].get(name, conf["ttl"])
+            base = _page_key(name, request)
+            version = get_catalog_version()
+            fresh_key = f"{base}:v{version}"
+            stale_key = f"{base}:last"
+
+            found = cache.get_many([fresh_key, stale_key])
+            if fresh_key in found:
+                return _edge_headers(
+                    request, _to_response(found[fresh_key], "hit"), conf
+                )
+
+            stale = found.get(stale_key)
+            lock_key = f"{base}:lock"
+            if stale is not None and not cache.add(
+                lock_key, 1, timeout=conf["lock_timeout"]
+            ):
+                # کس دیگری در حال ساختن است؛ نسخهٔ قبلی را بده
+                return _edge_headers(request, _to_response(stale, "stale"), conf)
+
+            try:
+                response = view(request, *args, **kwargs)
+                if _cacheable(response):
+                    entry = _serialize(response)
+                    cache.set(fresh_key, entry, timeout=fresh_ttl)
+                    cache.set(stale_key, entry, timeout=fresh_ttl + conf["stale"])
+                    response["X-Page-Cache"] = "miss"
+                    return _edge_headers(request, response, conf)
+                return response
+            finally:
+                if stale is not None:
+                    cache.delete(lock_key)
+
+        return wrapper
+
+    return decorator
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -42,15 +43,21 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "Shop.middleware.ImmutableAssetsMiddleware",
+    "Shop.middleware.ReplicaPinningMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
+    "cart.middleware.CartSummaryCookieMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
 ROOT_URLCONF = "Shop.urls"
+# فیلد CSRF صفحه‌های کش‌شدهٔ مهمان با JS پر می‌شود؛ افزودن به سبد بدون JS به
+# صفحهٔ تأیید cart:add می‌رود (cart.views.csrf_failure)
+CSRF_FAILURE_VIEW = "cart.views.csrf_failure"
 
 TEMPLATES = [
     {
@@ -62,7 +69,6 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
-                "cart.context_processors.cart_summary",
                 "products.context_processors.nav_categories",
             ],
         },
@@ -74,13 +80,101 @@ WSGI_APPLICATION = "Shop.wsgi.application"
 
 
 
+# پروفایل SQLite برای هم‌زمانی: busy timeout به‌جای خطای فوری "database is locked"،
+# و BEGIN IMMEDIATE برای transaction.atomic تا قفل نوشتن از ابتدا گرفته شود (نه
+# ارتقای قفل وسط تراکنش). init_command هنگام باز شدن هر اتصال اجرا می‌شود.
+# WAL (خواننده‌ها نویسنده را قفل نمی‌کنند) روی خود فایل ماندگار است و فایل‌های
+# -wal/-shm می‌سازد؛ پس فقط با SHOP_SQLITE_WAL=1 (روی سرور) فعال می‌شود، نه با هر
+# manage.py روی db.sqlite3 مخزن. مقایسه: manage.py bench_checkout
+SQLITE_WAL = os.environ.get("SHOP_SQLITE_WAL") == "1"
+SQLITE_WAL_INIT = "PRAGMA journal_mode=WAL;PRAGMA synchronous=NORMAL;"
+SQLITE_OPTIONS = {
+    "timeout": 20,
+    "transaction_mode": "IMMEDIATE",
+    "init_command": (
+        (SQLITE_WAL_INIT if SQLITE_WAL else "")
+        + "PRAGMA busy_timeout=20000;"
+        "PRAGMA mmap_size=134217728;"
+        "PRAGMA cache_size=-20000;"
+        "PRAGMA temp_store=MEMORY;"
+    ),
+}
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        "OPTIONS": SQLITE_OPTIONS,
+        # اتصال‌های ماندگار؛ health check اتصال قطع‌شده را قبل از استفاده عوض می‌کند
+        "CONN_MAX_AGE": 60,
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
+# پروفایل PostgreSQL (با متغیرهای محیطی):
+#   SHOP_DB_ENGINE=postgres POSTGRES_DB=shop POSTGRES_USER=… POSTGRES_PASSWORD=…
+#   POSTGRES_HOST=localhost POSTGRES_PORT=5432 [POSTGRES_REPLICA_HOST=…]
+# با psycopg_pool (psycopg[pool]) اتصال‌ها از pool داخلی Django می‌آیند؛
+# بدون آن، اتصال‌های ماندگار (CONN_MAX_AGE). تست: همین متغیرها + manage.py test
+try:
+    import psycopg_pool  # noqa: F401
+
+    HAS_PSYCOPG_POOL = True
+except Exception:
+    HAS_PSYCOPG_POOL = False
+
+if os.environ.get("SHOP_DB_ENGINE") == "postgres":
+    DATABASES["default"] = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": os.environ.get("POSTGRES_DB", "shop"),
+        "USER": os.environ.get("POSTGRES_USER", "shop"),
+        "PASSWORD": os.environ.get("POSTGRES_PASSWORD", ""),
+        "HOST": os.environ.get("POSTGRES_HOST", "localhost"),
+        "PORT": os.environ.get("POSTGRES_PORT", "5432"),
+        "CONN_HEALTH_CHECKS": True,
+        # pool داخلی Django با CONN_MAX_AGE ناسازگار است
+        "CONN_MAX_AGE": 0 if HAS_PSYCOPG_POOL else 60,
+        "OPTIONS": (
+            {
+                "pool": {
+                    "min_size": int(os.environ.get("POSTGRES_POOL_MIN", 2)),
+                    "max_size": int(os.environ.get("POSTGRES_POOL_MAX", 10)),
+                    "timeout": 10,
+                }
+            }
+            if HAS_PSYCOPG_POOL
+            else {}
+        ),
+    }
+
+# replica فقط‌خواندنی برای کاتالوگ (Shop.db_routers). برای آزمایش محلی:
+#   SHOP_SQLITE_REPLICA=1 => فایل دوم SQLite که با manage.py sync_sqlite_replica پر می‌شود
+#   یا روی PostgreSQL: POSTGRES_REPLICA_HOST (پایین‌تر)
+DATABASE_REPLICAS = []
+if os.environ.get("SHOP_SQLITE_REPLICA"):
+    DATABASES["replica"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "db_replica.sqlite3",
+        "OPTIONS": SQLITE_OPTIONS,
+        # در تست‌ها replica همان دیتابیس تست primary است
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS = ["replica"]
+elif os.environ.get("SHOP_DB_ENGINE") == "postgres" and os.environ.get(
+    "POSTGRES_REPLICA_HOST"
+):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "HOST": os.environ["POSTGRES_REPLICA_HOST"],
+        "PORT": os.environ.get("POSTGRES_REPLICA_PORT", DATABASES["default"]["PORT"]),
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS = ["replica"]
+
+DATABASE_ROUTERS = ["Shop.db_routers.PrimaryReplicaRouter"]
+# چند ثانیه بعد از نوشتن، خواندن‌های همان کاربر از primary (فاصلهٔ تأخیر replication)
+REPLICA_PIN_SECONDS = 5
+
 
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -117,6 +211,15 @@ STATICFILES_DIRS = [
 
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+# collectstatic: نام هش‌دار + minify + نسخه‌های .gz (و .br اگر brotli نصب باشد)
+# با DEBUG=False هر {% static %} باید در manifest باشد؛ بعد از هر تغییر static
+# collectstatic لازم است (فایل ناموجود => 500)
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "Shop.staticfiles.CompressedManifestStaticFilesStorage"},
+}
+IMMUTABLE_ASSETS_MAX_AGE = 60 * 60 * 24 * 365
+
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
@@ -138,3 +241,102 @@ ZARINPAL_REQUEST_URL = (
 ZARINPAL_VERIFY_URL = (
     "https://sandbox.zarinpal.com/pg/rest/WebGate/PaymentVerification.json"
 )
+
+
+# پردازش پس‌زمینهٔ تصاویر (manage.py run_image_worker)
+PRODUCT_IMAGE_DERIVATIVES = {"thumb": 320, "card": 640, "large": 1280}
+PRODUCT_IMAGE_FORMAT = "WEBP"
+PRODUCT_IMAGE_QUALITY = 82
+
+# ذخیرهٔ محتوامحور تصاویر محصول (media/cas/…)؛ نام فایل = هش BLAKE2 محتوا
+PRODUCT_MEDIA_CAS = True
+# blobهای بی‌ارجاعِ جدیدتر از این (ثانیه) حذف نمی‌شوند؛ پیش‌فرض gc_media --grace
+CAS_GRACE_SECONDS = 3600
+
+# همگام‌سازی موجودی انبار (POST /products/stock/sync/ با هدر Authorization: Token <…>)
+# خالی = endpoint غیرفعال؛ از manage.py sync_stock استفاده کنید
+STOCK_SYNC_TOKEN = ""
+STOCK_SYNC_CHUNK_SIZE = 1000
+
+# فید محصولات برای مارکت‌پلیس‌ها (manage.py build_product_feed)
+# BASE_URL خالی => در view از دامنهٔ درخواست ساخته می‌شود
+# ROOT بیرون از MEDIA_ROOT است (state هر محصول را دارد)؛ /products/feed/<fmt>/
+# فقط فایل فید ساخته‌شده را سرو می‌کند
+PRODUCT_FEED_BASE_URL = ""
+PRODUCT_FEED_ROOT = BASE_DIR / "var" / "feeds"
+PRODUCT_FEED_CURRENCY = "IRT"
+
+# سایت‌مپ‌های تکه‌ای؛ فقط manage.py build_sitemaps (مثلاً با cron) می‌سازد و
+# /sitemap.xml فایل آماده را سرو می‌کند. BASE_URL لازم است (از Host درخواست ساخته نمی‌شود)
+SITEMAP_BASE_URL = os.environ.get("SITEMAP_BASE_URL", PRODUCT_FEED_BASE_URL)
+SITEMAP_ROOT = BASE_DIR / "media" / "sitemaps"
+SITEMAP_SHARD_SIZE = 50_000
+SITEMAP_PROBE_INTERVAL = 60
+SITEMAP_MAX_AGE = 24 * 3600
+
+# کش؛ LocMem برای هر پروسه جداست — در production از Redis/Memcached استفاده کنید.
+# نسخهٔ کاتالوگ (باطل‌سازی کش صفحه و ETag) در دیتابیس است و به این کش وابسته نیست.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "shop-default",
+        "OPTIONS": {"MAX_ENTRIES": 5000},
+    }
+}
+
+# کش صفحه‌های کاتالوگ برای مهمان‌ها (Shop.page_cache)؛ ttl/stale به ثانیه
+PAGE_CACHE = {
+    "enabled": True,
+    "alias": "default",
+    "ttl": 120,
+    "stale": 600,
+    "ttls": {"home": 60, "products:detail": 300},
+    # Cache-Control: public, s-maxage برای CDN (فقط پاسخ‌های بدون کوکی)
+    "edge_ttl": 60,
+    "edge_stale": 300,
+}
+
+# شمارنده‌های داشبورد staff (accounts.stats)؛ ثانیه
+STAFF_STATS_TTL = 60
+
+# برچسب surrogate key روی پاسخ‌های کاتالوگ و purge انتخابی (Shop.surrogate)
+# backend: Shop.surrogate.HttpPurgeBackend | LocMemPurgeBackend | NullPurgeBackend
+SURROGATE_KEYS = {
+    "header": "Surrogate-Key",
+    "backend": os.environ.get(
+        "SURROGATE_PURGE_BACKEND", "Shop.surrogate.NullPurgeBackend"
+    ),
+    "url": os.environ.get("SURROGATE_PURGE_URL", ""),
+    "token": os.environ.get("SURROGATE_PURGE_TOKEN", ""),
+    "batch_size": 256,
+    "timeout": 5,
+}
+
+# changelistهای ادمین بالاتر از این تعداد ردیف، تعداد تقریبی نشان می‌دهند
+# (Shop.admin_tools.EstimatedCountPaginator؛ فقط PostgreSQL/MySQL)
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 10000
+
+# سفارش‌های قدیمی‌تر از این تعداد ماه با archive_orders بایگانی می‌شوند؛
+# خروجی حسابداری (orders.export) بایگانی را هم می‌آورد. خروجی XLSX آن به
+# xlsxwriter نیاز دارد (pip install xlsxwriter)؛ بدون آن فقط CSV
+ORDER_ARCHIVE_MONTHS = 12
+# فقط این وضعیت‌های پایانی بایگانی می‌شوند (pending/paid در جدول اصلی می‌مانند)
+ORDER_ARCHIVE_STATUSES = ("shipped", "delivered", "canceled")
+
+# «معمولاً با هم خریده می‌شوند» (products.recommendations)
+PRODUCT_NEIGHBORS = {
+    "top_k": 8,
+    "metric": "lift",  # lift | jaccard
+    "min_pair_orders": 2,
+    "settle_hours": 48,
+}
+
+# «محصولات مشابه» بر اساس محتوا (products.similarity)؛ workers > 1 => process pool
+# موتور سریع به numpy (و threadpoolctl) نیاز دارد؛ بدون آن‌ها نسخهٔ پایتونی کند
+PRODUCT_SIMILARITY = {
+    "top_k": 8,
+    "min_score": 0.2,
+    "batch_size": 512,
+    "workers": 1,
+    "full_ratio": 0.2,
+}
@@ -0,0 +1,160 @@
+"""
+خط لولهٔ فایل‌های استاتیک در collectstatic:
+  1) کوچک‌سازی CSS/JS (rcssmin/rjsmin اگر نصب باشند؛ برای CSS یک fallback ساده داریم)
+  2) هش محتوا در نام فایل (ManifestStaticFilesStorage) — روی محتوای کوچک‌شده،
+     تا هش نام فایل با محتوای واقعی آن یکی باشد
+  3) ساخت نسخه‌های از پیش فشرده‌شدهٔ .gz، و .br فقط اگر بستهٔ brotli نصب باشد
+     (pip install brotli؛ بدون آن فقط .gz ساخته می‌شود)
+
+هر فایلی که قالب‌ها با {% static %} می‌خوانند باید در static/ باشد؛ نبودِ آن
+بعد از collectstatic خطای 500 می‌دهد (ValueError از ManifestStaticFilesStorage).
+
+چون نام‌ها هش‌دار هستند، وب‌سرور می‌تواند همهٔ STATIC_URL را با
+Cache-Control: immutable سرو کند (gzip_static / brotli_static در nginx).
+"""
+
+import gzip
+import re
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+
+    HAS_BROTLI = True
+except Exception:
+    brotli = None
+    HAS_BROTLI = False
+
+try:
+    import rcssmin
+except Exception:
+    rcssmin = None
+
+try:
+    import rjsmin
+except Exception:
+    rjsmin = None
+
+
+COMPRESSIBLE_EXTENSIONS = (
+    ".css",
+    ".js",
+    ".svg",
+    ".json",
+    ".map",
+    ".txt",
+    ".xml",
+    ".html",
+)
+# فایل‌های خیلی کوچک ارزش فشرده‌سازی ندارند
+MIN_COMPRESS_SIZE = 512
+
+# رشته‌ها (با escape) و کامنت‌ها با هم اسکن می‌شوند تا «/*» داخل رشته کامنت حساب نشود
+_CSS_TOKENS = re.compile(
+    r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|(/\*(?!!).*?\*/)""", re.S
+)
+_CSS_STRING_SLOT = re.compile(r"\x00(\d+)\x00")
+_CSS_SPACE = re.compile(r"\s+")
+_CSS_PUNCT = re.compile(r"\s*([{};,>])\s*")
+
+
+def minify_css(text: str) -> str:
+    if rcssmin is not None:
+        return rcssmin.cssmin(text)
+    # fallback محافظه‌کار: حذف کامنت‌ها و فاصله‌های اضافه؛ رشته‌ها کنار گذاشته
+    # و بعد دست‌نخورده برگردانده می‌شوند
+    strings = []
+
+    def stash(match):
+        if match.group(1) is None:
+            return ""
+        strings.append(match.group(1))
+        return f"\x00{len(strings) - 1}\x00"
+
+    text = _CSS_TOKENS.sub(stash, text)
+    text = _CSS_SPACE.sub(" ", text)
+    text = _CSS_PUNCT.sub(r"\1", text)
+    text = text.replace(";}", "}").strip()
+    return _CSS_STRING_SLOT.sub(lambda m: strings[int(m.group(1))], text)
+
+
+def minify_js(text: str) -> str:
+    # JS را بدون ابزار مطمئن دست نمی‌زنیم
+    if rjsmin is not None:
+        return rjsmin.jsmin(text)
+    return text
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    minify = True
+
+    def post_process(self, paths, dry_run=False, **options):
+        if self.minify and not dry_run:
+            # ManifestStaticFilesStorage هش را از فایل مبدأ (paths) می‌سازد؛ کپی
+            # کوچک‌شدهٔ خودمان را مبدأ می‌کنیم تا هش و محتوا یکی باشند
+            paths = dict(paths)
+            for name in paths:
+                if self._minify(name):
+                    paths[name] = (self, name)
+        hashed = []
+        for name, hashed_name, processed in super().post_process(
+            paths, dry_run=dry_run, **options
+        ):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed.append(hashed_name)
+            yield name, hashed_name, processed
+
+        if dry_run:
+            return
+
+        # در چند pass ممکن است یک نام تکرار شود
+        for hashed_name in dict.fromkeys(hashed):
+            for variant in self._compress(hashed_name):
+                yield variant, variant, True
+
+    def _minify(self, name) -> bool:
+        """کپی collectstatic‌شدهٔ name را درجا کوچک می‌کند؛ True اگر عوض شد."""
+        if name.endswith(".css"):
+            func = minify_css
+        elif name.endswith(".js"):
+            func = minify_js
+        else:
+            return False
+        # فایل‌هایی که خودشان .min هستند را دوباره پردازش نمی‌کنیم
+        if ".min." in name:
+            return False
+        with self.open(name) as fh:
+            try:
+                original = fh.read().decode("utf-8")
+            except UnicodeDecodeError:
+                return False
+        minified = func(original)
+        if not minified or len(minified) >= len(original):
+            return False
+        self.delete(name)
+        self._save(name, ContentFile(minified.encode("utf-8")))
+        return True
+
+    def _compress(self, name):
+        if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+            return
+        with self.open(name) as fh:
+            data = fh.read()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return
+
+        # mtime=0 => خروجی قطعی (برای کش و build تکرارپذیر)
+        variants = [(".gz", gzip.compress(data, compresslevel=9, mtime=0))]
+        if HAS_BROTLI:
+            variants.append((".br", brotli.compress(data, quality=11)))
+
+        for suffix, payload in variants:
+            if len(payload) >= len(data):
+                continue
+            target = name + suffix
+            if self.exists(target):
+                self.delete(target)
+            self._save(target, ContentFile(payload))
+            yield target
@@ -0,0 +1,172 @@
+"""
+برچسب‌گذاری پاسخ‌ها با surrogate key و purge انتخابی در کش جلویی (CDN/Varnish).
+
+- viewها با tag_response کلیدها (product:ID، brand:ID، category:ID، catalog) را
+  در هدر SURROGATE_KEYS["header"] می‌گذارند؛ Shop.page_cache همین هدر را هم
+  ذخیره می‌کند تا پاسخ‌های کش‌شده هم برچسب داشته باشند.
+- schedule_purge کلیدها را جمع می‌کند: داخل تراکنش بعد از commit و یک‌جا
+  (تراکنش rollback‌شده خودش purge نمی‌فرستد)، بیرون از تراکنش بلافاصله.
+  هر درخواست HTTP حداکثر batch_size کلید دارد.
+- backendها: HttpPurgeBackend (POST به PURGE URL)، LocMemPurgeBackend
+  (برای تست؛ مثل mail.outbox) و NullPurgeBackend (پیش‌فرض).
+  برای تست end-to-end بک‌اند HTTP: manage.py fake_purge_proxy
+"""
+
+import json
+import logging
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+try:
+    import requests
+
+    HAS_REQUESTS = True
+except Exception:
+    requests = None
+    HAS_REQUESTS = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "header": "Surrogate-Key",
+    "backend": "Shop.surrogate.NullPurgeBackend",
+    "url": "",
+    "token": "",
+    "batch_size": 256,
+    "timeout": 5,
+}
+CATALOG_KEY = "catalog"
+
+
+def _conf():
+    return {**DEFAULTS, **getattr(settings, "SURROGATE_KEYS", {})}
+
+
+def product_key(pk) -> str:
+    return f"product:{pk}"
+
+
+def brand_key(pk) -> str:
+    return f"brand:{pk}"
+
+
+def category_key(pk) -> str:
+    return f"category:{pk}"
+
+
+def surrogate_header() -> str:
+    return _conf()["header"]
+
+
+def tag_response(response, keys):
+    """کلیدها (بدون تکرار، با حفظ ترتیب) به هدر پاسخ اضافه می‌شوند."""
+    header = surrogate_header()
+    existing = response.get(header, "").split()
+    merged = list(dict.fromkeys([*existing, *(str(k) for k in keys if k)]))
+    if merged:
+        response[header] = " ".join(merged)
+    return response
+
+
+# --- backendها -------------------------------------------------------------
+
+
+class NullPurgeBackend:
+    def purge(self, keys):
+        pass
+
+
+class LocMemPurgeBackend:
+    """هر purge به outbox اضافه می‌شود؛ برای تست‌ها و توسعهٔ محلی."""
+
+    outbox = []
+
+    def purge(self, keys):
+        self.outbox.append(list(keys))
+
+
+class HttpPurgeBackend:
+    """
+    POST {"keys": [...]} به SURROGATE_KEYS["url"]؛ کلیدها در هدر Surrogate-Key هم
+    فرستاده می‌شوند (قالب purge دسته‌ای Fastly/Varnish xkey).
+    """
+
+    def __init__(self):
+        conf = _conf()
+        self.url = conf["url"]
+        self.token = conf["token"]
+        self.timeout = conf["timeout"]
+
+    def purge(self, keys):
+        if not self.url:
+            return
+        if not HAS_REQUESTS:
+            logger.warning("requests نصب نیست؛ purge انجام نشد: %s", keys)
+            return
+        headers = {"Content-Type": "application/json", "Surrogate-Key": " ".join(keys)}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        try:
+            resp = requests.post(
+                self.url,
+                data=json.dumps({"keys": list(keys)}),
+                headers=headers,
+                timeout=self.timeout,
+            )
+            resp.raise_for_status()
+        except Exception:
+            # purge نشدن فقط یعنی تا TTL داده کهنه می‌ماند؛ ذخیره نباید خطا بدهد
+            logger.exception("purge کلیدها ناموفق بود: %s", keys)
+
+
+_backend = None
+_backend_path = None
+
+
+def get_backend():
+    global _backend, _backend_path
+    path = _conf()["backend"]
+    if _backend is None or _backend_path != path:
+        _backend = import_string(path)()
+        _backend_path = path
+    return _backend
+
+
+# --- dispatcher --------------------------------------------------------------
+
+_local = threading.local()
+
+
+def _pending() -> set:
+    if not hasattr(_local, "keys"):
+        _local.keys = set()
+    return _local.keys
+
+
+def flush_purges():
+    keys = sorted(_pending())
+    _local.keys = set()
+    if not keys:
+        return
+    backend = get_backend()
+    size = max(1, _conf()["batch_size"])
+    for start in range(0, len(keys), size):
+        backend.purge(keys[start : start + size])
+
+
+def schedule_purge(keys):
+    pending = _pending()
+    pending.update(k for k in keys if k)
+    if not pending:
+        return
+    connection = transaction.get_connection()
+    if connection.in_atomic_block:
+        # بعد از rollback (یا rollback یک savepoint) callback حذف شده؛ دوباره ثبت می‌کنیم.
+        # کلیدهای باقی‌مانده از تراکنش ناموفق هم purge می‌شوند که بی‌ضرر است.
+        if not any(item[1] is flush_purges for item in connection.run_on_commit):
+            transaction.on_commit(flush_purges)
+    else:
+        flush_purges()
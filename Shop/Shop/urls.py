@@ -21,9 +21,16 @@ from django.conf import settings
 from django.conf.urls.static import static
 import accounts
 from home.views import home
+from products import views as product_views
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("sitemap.xml", product_views.sitemap_index, name="sitemap_index"),
+    path(
+        "sitemap-<str:section>-<int:page>.xml",
+        product_views.sitemap_section,
+        name="sitemap_section",
+    ),
     path("", include("home.urls", namespace="home")),
     path("accounts/", include("accounts.urls", namespace="accounts")),
     path("products/", include("products.urls", namespace="products")),
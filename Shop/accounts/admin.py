@@ -3,10 +3,11 @@ from .models import Province, City, User, Profile, Address
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.translation import gettext_lazy as _
 from .forms import UserRegisterForm, UserProfileForm
+from Shop.admin_tools import ScalableAdminMixin
 
 
 @admin.register(User)
-class UserAdmin(BaseUserAdmin):
+class UserAdmin(ScalableAdminMixin, BaseUserAdmin):
     add_form = UserRegisterForm
     form = UserProfileForm
     model = User
@@ -19,7 +20,15 @@ class UserAdmin(BaseUserAdmin):
         "is_active",
     )
     list_filter = ("is_staff", "is_superuser", "is_active", "groups")
-    search_fields = ("email", "username", "first_name", "last_name")
+    # email/username یکتا هستند و ایندکس پیشوند دارند (ن.ک. Shop.admin_tools)؛
+    # تلفن روی Profile یکتاست
+    search_fields = (
+        "id",
+        "email__startswith",
+        "username__startswith",
+        "profile__phone",
+    )
+    search_help_text = _("شناسه، تلفن یا ابتدای ایمیل / نام کاربری")
     ordering = ("-date_joined",)
     fieldsets = (
         (None, {"fields": ("email", "username", "password")}),
@@ -61,9 +70,11 @@ class UserAdmin(BaseUserAdmin):
 
 
 @admin.register(Profile)
-class ProfileAdmin(admin.ModelAdmin):
+class ProfileAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = ("user", "phone", "is_phone_verified", "date_of_birth")
-    search_fields = ("user__username", "user__email", "phone")
+    list_select_related = ("user",)
+    search_fields = ("phone", "user__email", "user__username")
+    raw_id_fields = ("user",)
 
 
 @admin.register(Address)
@@ -77,7 +88,9 @@ class AddressAdmin(admin.ModelAdmin):
         "postal_code",
         "is_default",
     )
-    list_filter = ("province", "city", "is_default")
+    # فیلتر شهر همهٔ شهرها را (هرکدام با استانش) رندر می‌کرد؛ استان + جست‌وجو کافی است
+    list_filter = ("province", "is_default")
+    list_select_related = ("user", "province", "city")
     search_fields = (
         "full_name",
         "address_exact",
@@ -87,6 +100,8 @@ class AddressAdmin(admin.ModelAdmin):
         "user__username",
         "user__email",
     )
+    raw_id_fields = ("user",)
+    autocomplete_fields = ("province", "city")
 
 
 @admin.register(Province)
@@ -100,3 +115,7 @@ class CityAdmin(admin.ModelAdmin):
     list_display = ("name", "province")
     list_filter = ("province",)
     search_fields = ("name", "province__name")
+
+    def get_queryset(self, request):
+        # __str__ شهر نام استان را دارد (changelist و autocomplete)
+        return super().get_queryset(request).select_related("province")
@@ -5,8 +5,8 @@ from django.contrib.auth import get_user_model
 from django.contrib.auth.forms import PasswordChangeForm
 from .models import Profile, Address, Province, City
 from django import forms
-from django.forms import inlineformset_factory
-from products.models import Product, ProductVariation, Color, Size
+from django.forms import inlineformset_factory, modelform_factory
+from products.models import Brand, Category, Product, ProductVariation, Color, Size
 from orders.models import Order
 
 User = get_user_model()
@@ -255,6 +255,38 @@ class SizeForm(forms.ModelForm):
         fields = ["name", "sort_order", "code"]
 
 
+# فرم‌های سریع داشبورد staff؛ یک‌بار هنگام import ساخته می‌شوند، نه در هر درخواست
+VariationForm = modelform_factory(
+    ProductVariation,
+    fields=[
+        "product",
+        "color",
+        "size",
+        "sku",
+        "barcode",
+        "price_override",
+        "stock",
+        "is_active",
+        "image",
+    ],
+)
+# تحمل مدل بدون is_active
+BrandForm = modelform_factory(
+    Brand,
+    fields=[
+        f.name for f in Brand._meta.fields if f.name in {"name", "slug", "is_active"}
+    ],
+)
+CategoryForm = modelform_factory(
+    Category,
+    fields=[
+        f.name
+        for f in Category._meta.fields
+        if f.name in {"name", "slug", "parent", "is_active"}
+    ],
+)
+
+
 class OrderStatusForm(forms.ModelForm):
     class Meta:
         model = Order
@@ -9,6 +9,11 @@ class Migration(migrations.Migration):
     ]
 
     operations = [
+        # ایندکس قبل از حذف ستون province (روی SQLite بازسازی جدول ایندکس را می‌برد)
+        migrations.RemoveIndex(
+            model_name="address",
+            name="accounts_ad_provinc_09fa27_idx",
+        ),
         migrations.AlterUniqueTogether(
             name="city",
             unique_together=None,
@@ -26,10 +31,6 @@ class Migration(migrations.Migration):
             model_name="address",
             name="province",
         ),
-        migrations.RemoveIndex(
-            model_name="address",
-            name="accounts_ad_provinc_09fa27_idx",
-        ),
         migrations.AddField(
             model_name="address",
             name="state",
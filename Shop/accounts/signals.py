@@ -1,10 +1,25 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.conf import settings
-from .models import Profile
+from Shop.page_cache import bump_catalog_version
+from .models import City, Profile, Province
 
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
 def create_profile(sender, instance, created, **kwargs):
     if created:
         Profile.objects.get_or_create(user=instance)
+
+
+# استان/شهر جزو کاتالوگ‌اند (ETag پاسخ ajax شهرها به نسخهٔ کاتالوگ بسته است)
+for _model in (Province, City):
+    post_save.connect(
+        bump_catalog_version,
+        sender=_model,
+        dispatch_uid=f"page_cache_save_{_model.__name__}",
+    )
+    post_delete.connect(
+        bump_catalog_version,
+        sender=_model,
+        dispatch_uid=f"page_cache_delete_{_model.__name__}",
+    )
@@ -0,0 +1,111 @@
+"""
+پنل‌های لیست داشبورد staff که با کلیک روی هر تب بارگذاری می‌شوند.
+
+- هر پنل یک queryset پایه، تابع جست‌وجو و قالب ردیف‌ها دارد.
+- صفحه‌بندی keyset روی id نزولی (ایندکس PK)؛ cursor همان id آخرین ردیف است.
+- جست‌وجو فقط روی ستون‌های ایندکس‌دار/دقیق: id، SKU (startswith روی
+  ایندکس unique)، بارکد و تلفن (برابری)، نام (icontains؛ روی PostgreSQL
+  ایندکس تری‌گرام دارد).
+"""
+
+from django.db.models import Prefetch, Q
+
+from orders.models import Order, OrderItem
+from products.models import Brand, Category, Color, Product, ProductVariation, Size
+
+DEFAULT_PAGE_SIZE = 25
+
+
+def _name_search(q):
+    return Q(name__icontains=q)
+
+
+def _product_search(q):
+    cond = Q(name__icontains=q) | Q(slug=q)
+    if q.isdigit():
+        cond |= Q(id=int(q))
+    return cond
+
+
+def _variation_search(q):
+    cond = Q(sku__startswith=q) | Q(barcode=q)
+    if q != q.upper():
+        cond |= Q(sku__startswith=q.upper())
+    if q.isdigit():
+        cond |= Q(id=int(q))
+    return cond
+
+
+def _order_search(q):
+    cond = Q(phone=q)
+    if q.isdigit():
+        cond |= Q(id=int(q))
+    return cond
+
+
+PANELS = {
+    "brands": {
+        "queryset": lambda: Brand.objects.all(),
+        "search": _name_search,
+        "template": "accounts/staff/_rows_brands.html",
+    },
+    "categories": {
+        "queryset": lambda: Category.objects.select_related("parent"),
+        "search": _name_search,
+        "template": "accounts/staff/_rows_categories.html",
+    },
+    "colors": {
+        "queryset": lambda: Color.objects.all(),
+        "search": _name_search,
+        "template": "accounts/staff/_rows_colors.html",
+    },
+    "sizes": {
+        "queryset": lambda: Size.objects.all(),
+        "search": _name_search,
+        "template": "accounts/staff/_rows_sizes.html",
+    },
+    "products": {
+        "queryset": lambda: Product.objects.select_related("brand", "category"),
+        "search": _product_search,
+        "template": "accounts/staff/_rows_products.html",
+    },
+    "variations": {
+        "queryset": lambda: ProductVariation.objects.select_related(
+            "product", "color", "size"
+        ),
+        "search": _variation_search,
+        "template": "accounts/staff/_rows_variations.html",
+    },
+    "orders": {
+        "queryset": lambda: Order.objects.select_related("user").prefetch_related(
+            Prefetch("items", queryset=OrderItem.objects.order_by("id"))
+        ),
+        "search": _order_search,
+        "template": "accounts/staff/_rows_orders.html",
+    },
+}
+
+
+def order_status_choices():
+    try:
+        return list(Order._meta.get_field("status").choices or [])
+    except Exception:
+        return []
+
+
+def panel_page(name: str, q: str = "", cursor=None, size: int = DEFAULT_PAGE_SIZE):
+    """
+    (ردیف‌ها، cursor بعدی یا None). KeyError برای پنل ناشناخته،
+    ValueError برای cursor نامعتبر.
+    """
+    panel = PANELS[name]
+    qs = panel["queryset"]()
+    q = (q or "").strip()
+    if q:
+        qs = qs.filter(panel["search"](q))
+    if cursor:
+        qs = qs.filter(id__lt=int(cursor))
+    rows = list(qs.order_by("-id")[: size + 1])
+    has_next = len(rows) > size
+    rows = rows[:size]
+    return rows, (str(rows[-1].pk) if has_next else None)
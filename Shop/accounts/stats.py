@@ -0,0 +1,85 @@
+"""
+شمارنده‌های نوار کناری داشبورد staff.
+
+همهٔ COUNT(*)ها در یک SELECT مرکب (یک زیرکوئری برای هر جدول) اجرا می‌شوند و
+نتیجه برای STAFF_STATS_TTL ثانیه کش می‌شود؛ پس هزینهٔ هر بار باز شدن داشبورد
+حداکثر یک کوئری است، مستقل از تعداد جدول‌ها.
+refresh=True (یا ?refresh_stats=1 در داشبورد) کش را نادیده می‌گیرد.
+"""
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+CACHE_KEY = "staff:sidebar_counts"
+DEFAULT_TTL = 60
+
+# گروه => (نام شمارنده، مدل)
+COUNTERS = {
+    "accounts": [
+        ("profiles", "accounts.Profile"),
+        ("addresses", "accounts.Address"),
+        ("provinces", "accounts.Province"),
+        ("cities", "accounts.City"),
+        ("users", settings.AUTH_USER_MODEL),
+    ],
+    "products": [
+        ("brands", "products.Brand"),
+        ("categories", "products.Category"),
+        ("colors", "products.Color"),
+        ("sizes", "products.Size"),
+        ("products", "products.Product"),
+        ("variations", "products.ProductVariation"),
+    ],
+    "orders": [
+        ("orders", "orders.Order"),
+        ("coupons", "orders.Coupon"),
+    ],
+}
+
+
+def _model(label):
+    try:
+        return apps.get_model(label)
+    except (LookupError, ValueError):
+        return None
+
+
+def compute_counts(using: str = DEFAULT_DB_ALIAS) -> dict:
+    """SELECT (SELECT COUNT(*) FROM a), (SELECT COUNT(*) FROM b), ... در یک رفت‌وبرگشت."""
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    slots, selects = [], []
+    for group, items in COUNTERS.items():
+        for name, label in items:
+            model = _model(label)
+            if model is None:
+                continue
+            slots.append((group, name))
+            selects.append(f"(SELECT COUNT(*) FROM {qn(model._meta.db_table)})")
+
+    counts = {
+        group: {name: 0 for name, _l in items} for group, items in COUNTERS.items()
+    }
+    if not selects:
+        return counts
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT " + ", ".join(selects))
+        row = cursor.fetchone()
+    for (group, name), value in zip(slots, row):
+        counts[group][name] = value
+    return counts
+
+
+def get_dashboard_counts(refresh: bool = False) -> dict:
+    counts = None if refresh else cache.get(CACHE_KEY)
+    if counts is None:
+        counts = compute_counts()
+        ttl = getattr(settings, "STAFF_STATS_TTL", DEFAULT_TTL)
+        cache.set(CACHE_KEY, counts, timeout=ttl)
+    return counts
+
+
+def invalidate_dashboard_counts():
+    cache.delete(CACHE_KEY)
@@ -1,2 +1,213 @@
-from django.test import TestCase
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
 
+from accounts.staff import DEFAULT_PAGE_SIZE, panel_page
+from accounts.stats import (
+    CACHE_KEY,
+    compute_counts,
+    get_dashboard_counts,
+    invalidate_dashboard_counts,
+)
+from products.models import Brand, Category, Color, Product, ProductVariation
+
+PLAIN_STATIC = {
+    **settings.STORAGES,
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+
+@override_settings(STORAGES=PLAIN_STATIC)
+class DashboardCountsTests(TestCase):
+    """
+    شمارنده‌های نوار کناری داشبورد staff: یک SELECT مرکب، کش تا TTL، و
+    پاک شدن کش با هر POST فرم‌های staff.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.staff = User.objects.create_user("s@example.com", "staff", "x")
+        cls.staff.is_staff = True
+        cls.staff.save()
+        Brand.objects.create(name="برند ۱")
+        Brand.objects.create(name="برند ۲")
+        Color.objects.create(name="مشکی", code="BK")
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+
+    def test_compute_counts_in_one_query(self):
+        with self.assertNumQueries(1):
+            counts = compute_counts()
+        self.assertEqual(counts["products"]["brands"], 2)
+        self.assertEqual(counts["products"]["colors"], 1)
+        self.assertEqual(counts["products"]["products"], 0)
+        self.assertEqual(counts["accounts"]["users"], 1)
+        self.assertEqual(counts["orders"]["orders"], 0)
+
+    def test_cached_until_invalidated(self):
+        first = get_dashboard_counts()
+        Brand.objects.create(name="برند ۳")
+        with self.assertNumQueries(0):
+            self.assertEqual(get_dashboard_counts(), first)
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                get_dashboard_counts(refresh=True)["products"]["brands"], 3
+            )
+
+        Brand.objects.create(name="برند ۴")
+        invalidate_dashboard_counts()
+        self.assertIsNone(caches["default"].get(CACHE_KEY))
+        self.assertEqual(get_dashboard_counts()["products"]["brands"], 4)
+
+    @override_settings(STAFF_STATS_TTL=0)
+    def test_ttl_setting(self):
+        get_dashboard_counts()
+        self.assertIsNone(caches["default"].get(CACHE_KEY))
+
+    def sidebar(self, **params):
+        response = self.client.get(reverse("accounts:profile"), params)
+        self.assertEqual(response.status_code, 200)
+        return response.context["sidebar_counts"]
+
+    def test_profile_uses_cache_and_refresh_param(self):
+        self.client.force_login(self.staff)
+        self.assertEqual(self.sidebar()["products"]["brands"], 2)
+        Brand.objects.create(name="برند ۳")
+        self.assertEqual(self.sidebar()["products"]["brands"], 2)
+        self.assertEqual(self.sidebar(refresh_stats="1")["products"]["brands"], 3)
+
+    def test_staff_post_invalidates_counts(self):
+        self.client.force_login(self.staff)
+        self.assertEqual(self.sidebar()["products"]["colors"], 1)
+        response = self.client.post(
+            reverse("accounts:profile"),
+            {"context": "staff", "action": "add_color", "name": "قرمز", "code": "RD"},
+        )
+        self.assertRedirects(
+            response, reverse("accounts:profile"), fetch_redirect_response=False
+        )
+        self.assertEqual(self.sidebar()["products"]["colors"], 2)
+
+    def test_invalid_staff_post_still_invalidates(self):
+        self.client.force_login(self.staff)
+        self.sidebar()
+        Color.objects.create(name="سفید", code="WH")
+        # فرم نامعتبر (بدون نام) ذخیره نمی‌شود ولی کش را پاک می‌کند
+        response = self.client.post(
+            reverse("accounts:profile"),
+            {"context": "staff", "action": "add_color", "name": ""},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["sidebar_counts"]["products"]["colors"], 2)
+
+
+@override_settings(STORAGES=PLAIN_STATIC)
+class StaffPanelTests(TestCase):
+    """
+    صفحه‌بندی keyset پنل‌های staff (id نزولی، cursor = id آخرین ردیف):
+    هیچ ردیفی روی مرز صفحه تکرار یا جا نمی‌افتد و جست‌وجو با cursor ترکیب می‌شود.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.staff = User.objects.create_user("p@example.com", "panel", "x")
+        cls.staff.is_staff = True
+        cls.staff.save()
+        cls.customer = User.objects.create_user("c@example.com", "customer", "x")
+        cls.brands = [Brand.objects.create(name=f"برند {i}") for i in range(7)]
+        cls.expected = sorted((b.pk for b in cls.brands), reverse=True)
+        product = Product.objects.create(
+            category=Category.objects.create(name="تیشرت"),
+            brand=cls.brands[0],
+            name="تیشرت ساده",
+            price=100,
+        )
+        cls.variations = [
+            ProductVariation.objects.create(product=product, sku=f"TS-{i}", stock=1)
+            for i in range(3)
+        ]
+        ProductVariation.objects.create(product=product, sku="HD-1", stock=1)
+
+    def walk(self, name, size, q=""):
+        pages, cursor = [], None
+        for _ in range(len(self.expected) + 2):
+            rows, cursor = panel_page(name, q, cursor, size=size)
+            pages.append([r.pk for r in rows])
+            if cursor is None:
+                return pages
+        self.fail("panel cursor never reached the last page")
+
+    def test_pages_cover_every_row_once(self):
+        for size in (1, 2, 3, 6, 7, 10):
+            with self.subTest(size=size):
+                pages = self.walk("brands", size)
+                self.assertEqual(sum(pages, []), self.expected)
+                self.assertTrue(all(len(p) == size for p in pages[:-1]))
+
+    def test_exact_multiple_has_no_empty_last_page(self):
+        self.assertEqual([len(p) for p in self.walk("brands", 7)], [7])
+        Brand.objects.create(name="برند ۸")
+        self.assertEqual([len(p) for p in self.walk("brands", 4)], [4, 4])
+
+    def test_cursor_is_last_row_id(self):
+        rows, cursor = panel_page("brands", size=3)
+        self.assertEqual(cursor, str(rows[-1].pk))
+        rows, _cursor = panel_page("brands", cursor=cursor, size=1)
+        self.assertEqual(rows[0].pk, self.expected[3])
+
+    def test_search_pages_with_cursor(self):
+        expected = sorted((v.pk for v in self.variations), reverse=True)
+        # SKU با حروف کوچک هم با startswith روی حروف بزرگ پیدا می‌شود
+        pages = self.walk("variations", 2, q="ts-")
+        self.assertEqual(pages, [expected[:2], expected[2:]])
+
+    def test_unknown_panel_and_bad_cursor(self):
+        with self.assertRaises(KeyError):
+            panel_page("nope")
+        with self.assertRaises(ValueError):
+            panel_page("brands", cursor="abc")
+
+    def test_view_returns_rows_and_next_cursor(self):
+        self.client.force_login(self.staff)
+        url = reverse("accounts:staff_panel", args=["brands"])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertIsNone(data["next"])
+        for brand in self.brands:
+            self.assertIn(brand.name, data["html"])
+
+        data = self.client.get(url, {"q": "برند 3"}).json()
+        self.assertIn("برند 3", data["html"])
+        self.assertNotIn("برند 4", data["html"])
+
+    def test_view_pages_by_default_size(self):
+        extra = [
+            Brand.objects.create(name=f"برند اضافه {i}")
+            for i in range(DEFAULT_PAGE_SIZE + 1 - len(self.brands))
+        ]
+        self.client.force_login(self.staff)
+        url = reverse("accounts:staff_panel", args=["brands"])
+        first = self.client.get(url).json()
+        self.assertIn(extra[-1].name, first["html"])
+        self.assertEqual(first["next"], str(self.expected[-2]))
+        last = self.client.get(url, {"cursor": first["next"]}).json()
+        self.assertIsNone(last["next"])
+        self.assertIn(f"<td>{self.expected[-1]}</td>", last["html"])
+        self.assertNotIn(f"<td>{self.expected[-2]}</td>", last["html"])
+
+    def test_view_errors(self):
+        url = reverse("accounts:staff_panel", args=["brands"])
+        self.client.force_login(self.customer)
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_login(self.staff)
+        response = self.client.get(url, {"cursor": "abc"})
+        self.assertEqual(response.status_code, 400)
+        missing = reverse("accounts:staff_panel", args=["nope"])
+        self.assertEqual(self.client.get(missing).status_code, 404)
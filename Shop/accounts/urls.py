@@ -18,6 +18,7 @@ urlpatterns = [
         name="password_change",
     ),
     path("ajax/cities/", views.cities_by_province, name="ajax_cities"),
+    path("staff/panel/<str:name>/", views.staff_panel, name="staff_panel"),
     path(
         "orders/<int:order_id>/status/",
         views.staff_set_order_status,
@@ -2,24 +2,28 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout, get_user_model
 from django.contrib.auth import views as auth_views
 from django.urls import reverse
-from django.http import JsonResponse, HttpResponseForbidden
-from django.db.models import Prefetch
-from django.forms import modelform_factory
+from django.http import Http404, JsonResponse, HttpResponseForbidden
+from django.template.loader import render_to_string
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_POST
 from django.contrib import messages
 from django.utils.translation import gettext_lazy as _
+from Shop.conditional import catalog_condition
 from .forms import *
+from .stats import get_dashboard_counts, invalidate_dashboard_counts
 from .models import City
 
 User = get_user_model()
 
 try:
     from orders.models import Order, OrderItem, Coupon
+    from orders.history import order_history_page
+    from orders.stats import user_order_stats
 except Exception:
     Order = None
     OrderItem = None
     Coupon = None
+    order_history_page = user_order_stats = None
 
 try:
     from products.models import Product, ProductVariation, Color, Size, Category, Brand
@@ -31,6 +35,12 @@ try:
 except Exception:
     Profile = Address = Province = None
 
+try:
+    from .staff import PANELS, order_status_choices, panel_page
+except Exception:
+    PANELS = {}
+    order_status_choices = panel_page = None
+
 
 
 
@@ -97,90 +107,18 @@ def _build_profile_context(request):
         profile_form = ProfileExtrasForm(instance=user.profile)
         formset = AddressFormSet(instance=user)
 
-    orders_qs = []
+    orders = []
+    orders_next_cursor = None
     order_counts = {}
-    recent_orders = []
-    status_steps = {}
     if Order is not None:
-        STATUS_ORDER = ["PENDING", "PAID", "PROCESSING", "SHIPPED", "DELIVERED"]
-        step_index = {s: i for i, s in enumerate(STATUS_ORDER, start=1)}
-        status_steps = step_index
-
-        orders_qs = (
-            Order.objects.filter(user=user)
-            .prefetch_related(
-                Prefetch(
-                    "items",
-                    queryset=OrderItem.objects.select_related(
-                        "variation", "variation__product"
-                    ),
-                )
-            )
-            .order_by("-created_at")
-        )
-        order_counts = {
-            "all": orders_qs.count(),
-            "pending": orders_qs.filter(status__iexact="pending").count(),
-            "paid": orders_qs.filter(status__iexact="paid").count(),
-            "processing": orders_qs.filter(status__iexact="processing").count(),
-            "shipped": orders_qs.filter(status__iexact="shipped").count(),
-            "delivered": orders_qs.filter(status__iexact="delivered").count(),
-            "canceled": orders_qs.filter(status__iexact="canceled").count(),
-        }
-        recent_orders = list(orders_qs[:5])
-        for o in list(orders_qs) + recent_orders:
-            o.step = step_index.get(str(getattr(o, "status", "")).upper(), 1)
+        # فقط صفحهٔ اول (keyset)؛ صفحه‌های بعد از orders:history و اقلام هر سفارش
+        # هنگام باز کردن ردیف از orders:history_items می‌آیند
+        orders, orders_next_cursor = order_history_page(user)
+        # همهٔ شمارنده‌ها + مجموع خرید + آخرین سفارش در یک کوئری
+        order_counts = user_order_stats(user)
 
     staff_ctx = {}
     if user.is_staff and Product is not None:
-        ProductForm = modelform_factory(
-            Product,
-            fields=[
-                "category",
-                "brand",
-                "name",
-                "slug",
-                "price",
-                "discount_price",
-                "is_active",
-                "image",
-                "description",
-            ],
-        )
-        VariationForm = modelform_factory(
-            ProductVariation,
-            fields=[
-                "product",
-                "color",
-                "size",
-                "sku",
-                "barcode",
-                "price_override",
-                "stock",
-                "is_active",
-                "image",
-            ],
-        )
-        ColorForm = modelform_factory(Color, fields=["name", "hex_code", "code"])
-        SizeForm = modelform_factory(Size, fields=["name", "sort_order", "code"])
-        BrandForm = modelform_factory(
-            Brand,
-            fields=[
-                f.name
-                for f in Brand._meta.fields
-                if f.name in {"name", "slug", "is_active"} or f.name in {"name", "slug"}
-            ],
-        )  # تحمل مدل بدون is_active
-        CategoryForm = modelform_factory(
-            Category,
-            fields=[
-                f.name
-                for f in Category._meta.fields
-                if f.name in {"name", "slug", "parent", "is_active"}
-                or f.name in {"name", "slug", "parent"}
-            ],
-        )
-
         product_qf = ProductForm()
         color_qf = ColorForm()
         size_qf = SizeForm()
@@ -189,6 +127,8 @@ def _build_profile_context(request):
 
         if request.method == "POST" and request.POST.get("context") == "staff":
             action = request.POST.get("action")
+            # افزودن/حذف شمارنده‌ها را عوض می‌کند
+            invalidate_dashboard_counts()
             try:
                 if action == "add_color":
                     f = ColorForm(request.POST)
@@ -269,60 +209,10 @@ def _build_profile_context(request):
                 messages.error(request, _("خطای غیرمنتظره: ") + str(e))
                 return {"redirect": True, "redirect_to": reverse("accounts:profile")}
 
-        staff_products = Product.objects.select_related("brand", "category").order_by(
-            "-id"
-        )[:50]
-        staff_variations = ProductVariation.objects.select_related(
-            "product", "color", "size"
-        ).order_by("-id")[:50]
-        staff_colors = Color.objects.order_by("name")
-        staff_sizes = Size.objects.order_by("sort_order", "name")
-        staff_brands = Brand.objects.order_by("name")
-        staff_cats = Category.objects.select_related("parent").order_by("name")
-
-        admin_orders = []
-        if Order is not None:
-            admin_orders = (
-                Order.objects.select_related("user")
-                .prefetch_related(
-                    Prefetch(
-                        "items",
-                        queryset=OrderItem.objects.select_related(
-                            "variation", "variation__product"
-                        ),
-                    )
-                )
-                .order_by("-created_at")[:50]
-            )
-
-        def _order_status_choices():
-            if Order is None:
-                return []
-            try:
-                field = Order._meta.get_field("status")
-                return list(field.choices)
-            except Exception:
-                return []
-
-        account_counts = {
-            "profiles": Profile.objects.count() if Profile else 0,
-            "addresses": Address.objects.count() if Address else 0,
-            "provinces": Province.objects.count() if Province else 0,
-            "cities": City.objects.count() if City else 0,
-            "users": User.objects.count(),
-        }
-        product_counts = {
-            "brands": Brand.objects.count() if Brand else 0,
-            "categories": Category.objects.count() if Category else 0,
-            "colors": Color.objects.count() if Color else 0,
-            "sizes": Size.objects.count() if Size else 0,
-            "products": Product.objects.count() if Product else 0,
-            "variations": ProductVariation.objects.count() if ProductVariation else 0,
-        }
-        order_counts_admin = {
-            "orders": Order.objects.count() if Order else 0,
-            "coupons": Coupon.objects.count() if Coupon else 0,
-        }
+        # یک کوئری (یا هیچ، از کش)؛ ?refresh_stats=1 مقدار تازه می‌گیرد
+        sidebar_counts = get_dashboard_counts(
+            refresh=request.GET.get("refresh_stats") == "1"
+        )
 
         latest_users = User.objects.order_by("-date_joined")[:10]
         latest_addresses = (
@@ -345,19 +235,8 @@ def _build_profile_context(request):
             "size_qf": size_qf,
             "brand_qf": brand_qf,
             "category_qf": category_qf,
-            "staff_products": staff_products,
-            "staff_variations": staff_variations,
-            "staff_colors": staff_colors,
-            "staff_sizes": staff_sizes,
-            "staff_brands": staff_brands,
-            "staff_categories": staff_cats,
-            "admin_orders": admin_orders,
-            "order_status_choices": _order_status_choices(),
-            "sidebar_counts": {
-                "accounts": account_counts,
-                "products": product_counts,
-                "orders": order_counts_admin,
-            },
+            # لیست‌ها با باز شدن هر پنل از accounts:staff_panel می‌آیند
+            "sidebar_counts": sidebar_counts,
             "latest_users": latest_users,
             "latest_addresses": latest_addresses,
         }
@@ -367,10 +246,9 @@ def _build_profile_context(request):
         "profile_form": profile_form,
         "formset": formset,
         "show_password_changed": show_password_changed,
-        "orders": orders_qs,
+        "orders": orders,
+        "orders_next_cursor": orders_next_cursor,
         "order_counts": order_counts,
-        "recent_orders": recent_orders,
-        "status_steps": status_steps,
         "is_staff": user.is_staff,
         **staff_ctx,
     }
@@ -422,7 +300,13 @@ class CustomPasswordChangeView(auth_views.PasswordChangeView):
 
 
 
+def _cities_key(request):
+    # خود province_id در querystring است و در ETag می‌آید
+    return "cities", None
+
+
 @login_required
+@catalog_condition(_cities_key, personal=False)
 def cities_by_province(request):
     prov_id = request.GET.get("province_id")
     qs = (
@@ -436,6 +320,30 @@ def cities_by_province(request):
 
 
 
+@login_required
+def staff_panel(request, name: str):
+    """
+    یک صفحه از پنل لیست داشبورد staff (HTML ردیف‌ها + cursor بعدی).
+    ?q=جست‌وجو&cursor=<next قبلی>
+    """
+    if not request.user.is_staff or panel_page is None:
+        return HttpResponseForbidden()
+    if name not in PANELS:
+        raise Http404
+    try:
+        rows, next_cursor = panel_page(
+            name, request.GET.get("q", ""), request.GET.get("cursor") or None
+        )
+    except ValueError:
+        return JsonResponse({"error": "invalid cursor"}, status=400)
+    html = render_to_string(
+        PANELS[name]["template"],
+        {"rows": rows, "order_status_choices": order_status_choices()},
+        request=request,
+    )
+    return JsonResponse({"html": html, "next": next_cursor})
+
+
 @login_required
 @require_POST
 def staff_set_order_status(request, order_id: int):
@@ -6,14 +6,16 @@ CART_SESSION_ID = "cart"
 
 class Cart:
     def __init__(self, request):
+        self.request = request
         self.session = request.session
-        cart = self.session.get(CART_SESSION_ID)
-        if cart is None:
-            cart = self.session[CART_SESSION_ID] = {}
-        self.cart = cart
+        # سبد خالی در session نوشته نمی‌شود تا برای مهمان‌ها session ساخته نشود
+        self.cart = self.session.get(CART_SESSION_ID) or {}
 
     def save(self):
+        self.session[CART_SESSION_ID] = self.cart
         self.session.modified = True
+        # CartSummaryCookieMiddleware کوکی خلاصهٔ سبد را به‌روز می‌کند
+        self.request._cart_changed = True
 
     def add(self, variation_id: int, quantity: int = 1, replace: bool = False):
         vid = str(variation_id)
@@ -33,7 +35,7 @@ class Cart:
             self.save()
 
     def clear(self):
-        self.session[CART_SESSION_ID] = {}
+        self.cart = {}
         self.save()
 
     def __iter__(self):
@@ -64,3 +66,6 @@ class Cart:
         for row in self:
             total += row["total"]
         return total
+
+    def summary(self) -> dict:
+        return {"count": self.total_quantity(), "total": str(self.total_price())}
@@ -0,0 +1,33 @@
+from django.conf import settings
+
+from .cart import Cart
+
+SUMMARY_COOKIE = "cart_summary"
+
+
+def set_summary_cookie(response, summary: dict):
+    """
+    کوکی قابل‌خواندن با JS («تعداد|جمع») برای نشان سبد در nav؛
+    صفحه‌های کاتالوگ این‌طور به session دست نمی‌زنند و در CDN کش می‌شوند.
+    """
+    if not summary["count"]:
+        response.delete_cookie(SUMMARY_COOKIE, samesite="Lax")
+        return
+    response.set_cookie(
+        SUMMARY_COOKIE,
+        f"{summary['count']}|{summary['total']}",
+        max_age=settings.SESSION_COOKIE_AGE,
+        samesite="Lax",
+        httponly=False,
+    )
+
+
+class CartSummaryCookieMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if getattr(request, "_cart_changed", False):
+            set_summary_cookie(response, Cart(request).summary())
+        return response
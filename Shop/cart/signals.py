@@ -0,0 +1,9 @@
+from django.contrib.auth.signals import user_logged_out
+from django.dispatch import receiver
+
+
+@receiver(user_logged_out)
+def reset_cart_summary(sender, request, **kwargs):
+    # session پاک شده؛ کوکی نشان سبد هم باید پاک شود
+    if request is not None:
+        request._cart_changed = True
@@ -1,2 +1,97 @@
-from django.test import TestCase
+from decimal import Decimal
+from urllib.parse import parse_qs, urlsplit
 
+from django.conf import settings
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from cart.middleware import SUMMARY_COOKIE
+from products.models import Brand, Category, Product, ProductVariation
+
+PLAIN_STATIC = {
+    **settings.STORAGES,
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+
+@override_settings(STORAGES=PLAIN_STATIC)
+class CartTests(TestCase):
+    """
+    سبد مهمان روی صفحه‌های کش‌شده: cart/summary/ (نشان nav + کوکی csrftoken)،
+    کوکی cart_summary بعد از تغییر سبد، و مسیر بدون JS افزودن به سبد.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        product = Product.objects.create(
+            category=Category.objects.create(name="تیشرت"),
+            brand=Brand.objects.create(name="برند"),
+            name="تیشرت ساده",
+            price=Decimal("100000"),
+        )
+        cls.variation = ProductVariation.objects.create(
+            product=product, sku="TS-1", stock=5
+        )
+
+    def setUp(self):
+        self.client = Client(enforce_csrf_checks=True)
+        self.add_url = reverse("cart:add")
+
+    def token(self):
+        self.client.get(reverse("cart:summary"))
+        return self.client.cookies[settings.CSRF_COOKIE_NAME].value
+
+    def add(self, quantity=1, token=None):
+        data = {"variation_id": self.variation.pk, "quantity": quantity}
+        if token:
+            data["csrfmiddlewaretoken"] = token
+        return self.client.post(self.add_url, data)
+
+    def test_summary_sets_csrf_cookie_without_session(self):
+        response = self.client.get(reverse("cart:summary"))
+        self.assertEqual(response.json(), {"count": 0, "total": "0"})
+        self.assertIn(settings.CSRF_COOKIE_NAME, response.cookies)
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        self.assertIn("no-cache", response["Cache-Control"])
+
+    def test_add_sets_summary_cookie(self):
+        response = self.add(2, token=self.token())
+        self.assertRedirects(response, reverse("cart:detail"))
+        self.assertEqual(response.cookies[SUMMARY_COOKIE].value, "2|200000.00")
+        summary = self.client.get(reverse("cart:summary")).json()
+        self.assertEqual(summary, {"count": 2, "total": "200000.00"})
+
+    def test_remove_deletes_summary_cookie(self):
+        self.add(1, token=self.token())
+        response = self.client.get(reverse("cart:remove", args=[self.variation.pk]))
+        self.assertEqual(response.cookies[SUMMARY_COOKIE].value, "")
+
+    def test_post_without_token_goes_to_confirm_page(self):
+        response = self.add(2)
+        self.assertEqual(response.status_code, 302)
+        url = urlsplit(response["Location"])
+        self.assertEqual(url.path, self.add_url)
+        self.assertEqual(
+            parse_qs(url.query),
+            {"variation_id": [str(self.variation.pk)], "quantity": ["2"]},
+        )
+
+        page = self.client.get(response["Location"])
+        self.assertEqual(page.status_code, 200)
+        self.assertIn("no-cache", page["Cache-Control"])
+        token = page.context["csrf_token"]
+        self.assertContains(page, f'value="{token}"')
+        self.assertRedirects(self.add(2, token=token), reverse("cart:detail"))
+        self.assertEqual(self.client.get(reverse("cart:summary")).json()["count"], 2)
+
+    def test_other_forms_still_fail_csrf(self):
+        response = self.client.post(
+            reverse("cart:update", args=[self.variation.pk]), {"quantity": 1}
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_more_than_stock_returns_to_product(self):
+        response = self.add(9, token=self.token())
+        url = urlsplit(response["Location"])
+        self.assertEqual(url.path, self.variation.product.get_absolute_url())
+        self.assertEqual(parse_qs(url.query)["available"], ["5"])
@@ -1,22 +1,44 @@
 from urllib.parse import urlencode
 
+from django.http import JsonResponse
+from django.middleware.csrf import get_token
 from django.shortcuts import render, redirect, get_object_or_404
-from django.views.decorators.http import require_POST
+from django.urls import reverse
+from django.views import csrf
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_http_methods
 from django.contrib import messages
 from django.utils.translation import gettext as _
 
 from .cart import Cart
+from .middleware import set_summary_cookie
 from .forms import AddToCartForm
 from products.models import ProductVariation
 
 
-@require_POST
+def csrf_failure(request, reason=""):
+    """
+    CSRF_FAILURE_VIEW: صفحهٔ کش‌شدهٔ مهمان توکن را با JS پر می‌کند؛ اگر JS نبود
+    (یا هنوز اجرا نشده بود) افزودن به سبد به‌جای 403 به صفحهٔ تأیید cart:add
+    (GET، بدون کش، با توکن واقعی) می‌رود. بقیهٔ فرم‌ها همان 403 پیش‌فرض.
+    """
+    if request.method == "POST" and request.path == reverse("cart:add"):
+        form = AddToCartForm(request.POST)
+        if form.is_valid():
+            query = urlencode(form.cleaned_data)
+            return redirect(f"{reverse('cart:add')}?{query}")
+    return csrf.csrf_failure(request, reason)
+
+
+@never_cache
+@require_http_methods(["GET", "POST"])
 def add_to_cart(request):
     """
     اگر تعداد درخواستی > موجودی باشد، به صفحه محصول ریدایرکت می‌کنیم و
     پارامترهای لازم را برای نمایش هشدار در همان صفحه می‌فرستیم.
+    GET (از csrf_failure) فقط فرم تأیید با توکن CSRF را نشان می‌دهد.
     """
-    form = AddToCartForm(request.POST)
+    form = AddToCartForm(request.POST if request.method == "POST" else request.GET)
     if not form.is_valid():
         messages.error(request, _("اطلاعات نامعتبر سبد خرید."))
         return redirect(request.META.get("HTTP_REFERER", "/"))
@@ -25,6 +47,12 @@ def add_to_cart(request):
         ProductVariation, id=form.cleaned_data["variation_id"], is_active=True
     )
     qty = form.cleaned_data["quantity"]
+    if request.method == "GET":
+        return render(
+            request,
+            "cart/add_confirm.html",
+            {"form": form, "variation": variation, "quantity": qty},
+        )
 
     if variation.stock < qty:
         params = urlencode(
@@ -81,3 +109,16 @@ def update_cart(request, variation_id: int):
 def cart_detail(request):
     cart = Cart(request)
     return render(request, "cart/cart_detail.html", {"cart": cart})
+
+
+@never_cache
+def cart_summary(request):
+    """
+    خلاصهٔ سبد برای نشان nav در صفحه‌های کش‌شده؛ هم‌زمان کوکی csrftoken را
+    برای فرم‌های همان صفحه تنظیم می‌کند.
+    """
+    get_token(request)
+    summary = Cart(request).summary()
+    response = JsonResponse(summary)
+    set_summary_cookie(response, summary)
+    return response
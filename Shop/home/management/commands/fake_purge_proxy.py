@@ -0,0 +1,50 @@
+import json
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "پروکسی ساختگی برای تست purge: درخواست‌های HttpPurgeBackend را می‌گیرد و "
+        "کلیدها را چاپ می‌کند (SURROGATE_PURGE_URL=http://127.0.0.1:8089/purge)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8089)
+        parser.add_argument(
+            "--status", type=int, default=200, help="کد پاسخ (برای تست خطا)"
+        )
+
+    def handle(self, *args, **opts):
+        command = self
+        status = opts["status"]
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length).decode("utf-8")
+                try:
+                    keys = json.loads(body or "{}").get("keys", [])
+                except ValueError:
+                    keys = (self.headers.get("Surrogate-Key") or "").split()
+                command.stdout.write(
+                    f"PURGE {self.path} ({len(keys)}): {' '.join(keys)}"
+                )
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(json.dumps({"purged": len(keys)}).encode())
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer((opts["host"], opts["port"]), Handler)
+        self.stdout.write(f"fake purge proxy on http://{opts['host']}:{opts['port']}/")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
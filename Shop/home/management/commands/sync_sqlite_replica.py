@@ -0,0 +1,47 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        "کپی primary در replica محلی SQLite (جایگزین replication برای آزمایش router)؛ "
+        "با --interval به‌صورت دوره‌ای تکرار می‌شود تا تأخیر replication شبیه‌سازی شود."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--replica", default="replica")
+        parser.add_argument(
+            "--interval", type=float, default=0, help="ثانیه؛ 0 یعنی یک‌بار"
+        )
+
+    def handle(self, *args, **opts):
+        alias = opts["replica"]
+        conf = settings.DATABASES.get(alias)
+        primary = settings.DATABASES[DEFAULT_DB_ALIAS]
+        if conf is None:
+            raise CommandError(
+                f"alias «{alias}» در DATABASES نیست (SHOP_SQLITE_REPLICA=1؟)"
+            )
+        for c in (conf, primary):
+            if not c["ENGINE"].endswith("sqlite3"):
+                raise CommandError("این دستور فقط برای SQLite است.")
+
+        while True:
+            started = time.monotonic()
+            source = connections[DEFAULT_DB_ALIAS]
+            source.ensure_connection()
+            target = sqlite3.connect(str(conf["NAME"]))
+            try:
+                source.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(
+                f"{conf['NAME']} به‌روز شد ({time.monotonic() - started:.2f} ثانیه)"
+            )
+            if not opts["interval"]:
+                break
+            time.sleep(opts["interval"])
@@ -1,2 +1,214 @@
-from django.test import TestCase
+import time
+from unittest import mock
 
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, connections, router
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from orders.models import Order
+from products.models import (
+    CatalogVersion,
+    ImageJob,
+    NeighborBuild,
+    Product,
+    ProductNeighbor,
+)
+from Shop.admin_tools import EstimatedCountPaginator, estimated_row_count
+from Shop.db_routers import request_scope, use_primary
+from Shop.middleware import ReplicaPinningMiddleware
+
+REPLICA = "replica_under_test"
+PLAIN_STATIC = {
+    **settings.STORAGES,
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA], REPLICA_PIN_SECONDS=5)
+class ReplicaPinningTests(SimpleTestCase):
+    """
+    مسیریابی Shop.db_routers از دید یک درخواست: router فقط نام alias را
+    برمی‌گرداند، پس برای replica اتصال واقعی لازم نیست.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        # replica_aliases فقط aliasهای موجود در DATABASES را قبول می‌کند
+        connections.settings[REPLICA] = {
+            **connections.settings[DEFAULT_DB_ALIAS],
+            "TEST": {"MIRROR": DEFAULT_DB_ALIAS},
+        }
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        del connections.settings[REPLICA]
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.reads = []
+
+    def view(self, write=False):
+        def view(request):
+            self.reads.append(router.db_for_read(Product))
+            if write:
+                # همان چیزی که save() روی یک مدل کاتالوگ صدا می‌زند
+                router.db_for_write(Product)
+            self.reads.append(router.db_for_read(Product))
+            return HttpResponse()
+
+        return ReplicaPinningMiddleware(view)
+
+    def test_catalog_reads_go_to_replica(self):
+        with request_scope():
+            self.assertEqual(router.db_for_read(Product), REPLICA)
+            # مدل‌های غیر کاتالوگ و صف تصویر همیشه primary
+            self.assertEqual(router.db_for_read(Order), DEFAULT_DB_ALIAS)
+            self.assertEqual(router.db_for_read(ImageJob), DEFAULT_DB_ALIAS)
+            with use_primary():
+                self.assertEqual(router.db_for_read(Product), DEFAULT_DB_ALIAS)
+
+    def test_write_pins_rest_of_request_and_sets_cookie(self):
+        response = self.view(write=True)(self.factory.get("/"))
+        self.assertEqual(self.reads, [REPLICA, DEFAULT_DB_ALIAS])
+        self.assertIn(ReplicaPinningMiddleware.cookie_name, response.cookies)
+
+    def test_read_only_request_sets_no_cookie(self):
+        response = self.view()(self.factory.get("/"))
+        self.assertEqual(self.reads, [REPLICA, REPLICA])
+        self.assertNotIn(ReplicaPinningMiddleware.cookie_name, response.cookies)
+
+    def test_unsafe_request_reads_from_primary(self):
+        response = self.view()(self.factory.post("/"))
+        self.assertEqual(self.reads, [DEFAULT_DB_ALIAS, DEFAULT_DB_ALIAS])
+        self.assertIn(ReplicaPinningMiddleware.cookie_name, response.cookies)
+
+    def test_pin_cookie_keeps_next_requests_on_primary(self):
+        cookie = self.view(write=True)(self.factory.get("/")).cookies[
+            ReplicaPinningMiddleware.cookie_name
+        ]
+        self.reads.clear()
+        request = self.factory.get("/")
+        request.COOKIES[cookie.key] = cookie.value
+        self.view()(request)
+        self.assertEqual(self.reads, [DEFAULT_DB_ALIAS, DEFAULT_DB_ALIAS])
+
+        # بدون کوکی یا با کوکی منقضی دوباره replica
+        self.reads.clear()
+        request = self.factory.get("/")
+        request.COOKIES[cookie.key] = str(int(time.time()) - 1)
+        self.view()(request)
+        self.assertEqual(self.reads, [REPLICA, REPLICA])
+
+    def test_write_outside_request_does_not_pin(self):
+        # مثل ورکر یا management command طولانی: نوشتن بعدی را برای همیشه pin نکند
+        router.db_for_write(Product)
+        self.assertEqual(router.db_for_read(Product), REPLICA)
+        with use_primary():
+            self.assertEqual(router.db_for_read(Product), DEFAULT_DB_ALIAS)
+        self.assertEqual(router.db_for_read(Product), REPLICA)
+
+    def test_build_state_models_stay_on_primary(self):
+        for model in (CatalogVersion, NeighborBuild, ProductNeighbor):
+            with self.subTest(model=model.__name__), request_scope():
+                self.assertEqual(router.db_for_read(model), DEFAULT_DB_ALIAS)
+
+    def test_pinning_does_not_leak_between_requests(self):
+        self.view(write=True)(self.factory.get("/"))
+        with request_scope():
+            self.assertEqual(router.db_for_read(Product), REPLICA)
+
+
+class AdminToolsTests(TestCase):
+    """
+    Shop.admin_tools: تعداد تقریبی فقط برای changelist بدون فیلتر و بالای
+    آستانه؛ جست‌وجو فقط با برابری/پیشوند روی lookupهای search_fields.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.admin = User.objects.create_superuser("root@example.com", "root", "x")
+        cls.buyer = User.objects.create_user("sara@example.com", "sara", "x")
+        cls.orders = [
+            Order.objects.create(
+                user=cls.buyer,
+                full_name=name,
+                phone=phone,
+                province="تهران",
+                city="تهران",
+                address_exact="-",
+            )
+            for name, phone in (
+                ("سارا احمدی", "09120000001"),
+                ("علی سارایی", "09120000002"),
+            )
+        ]
+
+    def setUp(self):
+        self.request = RequestFactory().get("/")
+        self.request.user = self.admin
+        self.order_admin = admin.site._registry[Order]
+
+    def search(self, term, model_admin=None):
+        model_admin = model_admin or self.order_admin
+        qs, may_have_duplicates = model_admin.get_search_results(
+            self.request, model_admin.model.objects.all(), term
+        )
+        self.assertFalse(may_have_duplicates)
+        return qs
+
+    def test_estimated_count_only_for_unfiltered_large_tables(self):
+        with mock.patch("Shop.admin_tools.estimated_row_count", return_value=50_000):
+            with override_settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=10_000):
+                self.assertEqual(
+                    EstimatedCountPaginator(Order.objects.all(), 20).count, 50_000
+                )
+                filtered = Order.objects.filter(phone="09120000001")
+                self.assertEqual(EstimatedCountPaginator(filtered, 20).count, 1)
+            with override_settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=100_000):
+                self.assertEqual(
+                    EstimatedCountPaginator(Order.objects.all(), 20).count, 2
+                )
+        with mock.patch("Shop.admin_tools.estimated_row_count", return_value=None):
+            self.assertEqual(EstimatedCountPaginator(Order.objects.all(), 20).count, 2)
+
+    def test_no_statistics_on_sqlite(self):
+        if connections[DEFAULT_DB_ALIAS].vendor != "sqlite":
+            self.skipTest("آمار جدول فقط در PostgreSQL/MySQL")
+        self.assertIsNone(estimated_row_count(Order))
+
+    def test_search_uses_prefix_and_exact_lookups(self):
+        first, second = self.orders
+        self.assertEqual(list(self.search("سارا")), [first])
+        self.assertEqual(list(self.search("ارا")), [])
+        self.assertEqual(list(self.search("09120000002")), [second])
+        self.assertEqual(list(self.search(str(second.pk))), [second])
+        self.assertEqual(set(self.search("sara@example.com")), set(self.orders))
+        self.assertEqual(list(self.search("0912")), [])
+
+    def test_search_skips_lookups_of_other_types(self):
+        # «abc» برای id عدد نیست؛ فقط بقیهٔ lookupها در WHERE می‌آیند
+        qs = self.search("abc")
+        self.assertNotIn('"id" =', str(qs.query))
+        self.assertEqual(list(qs), [])
+        self.assertEqual(list(self.search("   ")), list(Order.objects.all()))
+
+    def test_user_search_by_email_prefix(self):
+        user_admin = admin.site._registry[get_user_model()]
+        self.assertEqual(list(self.search("sara@", user_admin)), [self.buyer])
+        self.assertEqual(list(self.search("example.com", user_admin)), [])
+
+    def test_changelist_search(self):
+        self.client.force_login(self.admin)
+        with override_settings(STORAGES=PLAIN_STATIC):
+            response = self.client.get(
+                reverse("admin:orders_order_changelist"), {"q": "علی"}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context["cl"].result_list), [self.orders[1]])
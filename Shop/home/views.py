@@ -3,7 +3,11 @@ from django.db.models import Prefetch, Sum
 from django.utils import timezone
 from datetime import timedelta
 from products.models import Product, ProductImage
+from Shop.page_cache import anonymous_page_cache
+from Shop.surrogate import CATALOG_KEY, product_key, tag_response
 
+
+@anonymous_page_cache("home")
 def home(request):
     # جدیدترین‌ها
     newest = (
@@ -47,7 +51,7 @@ def home(request):
         # اگر اپ orders یا روابط موجود نباشه، جدیدترین‌ها رو نشون بده
         bestsellers = newest
 
-    return render(
+    response = render(
         request,
         "home/index.html",
         {
@@ -56,6 +60,9 @@ def home(request):
             "bestsellers": bestsellers,
         },
     )
+    # querysetها در قالب ارزیابی و کش شده‌اند؛ کوئری اضافه‌ای نیست
+    shown = {p.pk for qs in (newest, discounted, bestsellers) for p in qs}
+    return tag_response(response, [CATALOG_KEY, *map(product_key, sorted(shown))])
 
 
 def about(request):
@@ -1,15 +1,51 @@
-from django.contrib import admin
-from .models import Order, OrderItem, Coupon
+import tempfile
+
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.http import FileResponse, StreamingHttpResponse
+from django.shortcuts import redirect
+from django.utils import timezone
+from django.utils.html import format_html, format_html_join
+from django.utils.translation import gettext_lazy as _
+from .archive import as_order
+from .export import HAS_XLSXWRITER, XLSX_MISSING, filter_orders, stream_csv, write_xlsx
+from .models import ArchivedOrder, Order, OrderItem, Coupon
+from Shop.admin_tools import ScalableAdminMixin
 
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 0
     readonly_fields = ("product_name", "sku", "price", "quantity", "line_total")
+    raw_id_fields = ("variation",)
+
+
+class OrderExportActionForm(ActionForm):
+    """فیلترهای خروجی حسابداری کنار منوی actionها (تاریخ‌ها شامل‌اند)."""
+
+    date_from = forms.DateField(
+        label=_("از تاریخ"),
+        required=False,
+        widget=forms.DateInput(attrs={"type": "date"}),
+    )
+    date_to = forms.DateField(
+        label=_("تا تاریخ"),
+        required=False,
+        widget=forms.DateInput(attrs={"type": "date"}),
+    )
+    status = forms.ChoiceField(
+        label=_("وضعیت"),
+        required=False,
+        choices=[("", _("همه"))] + Order.Status.choices,
+    )
+    include_archived = forms.BooleanField(
+        label=_("با سفارش‌های بایگانی‌شده"), required=False
+    )
 
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = (
         "id",
         "user",
@@ -21,16 +57,149 @@ class OrderAdmin(admin.ModelAdmin):
         "created_at",
     )
     list_filter = ("status", "created_at")
+    list_select_related = ("user",)
+    # فقط ستون‌های ایندکس‌دار، با برابری دقیق یا پیشوند (full_name)
     search_fields = (
         "id",
-        "user__username",
-        "user__email",
-        "full_name",
         "phone",
+        "full_name__startswith",
         "coupon_code",
+        "user__email",
+        "user__username",
     )
+    search_help_text = _(
+        "شمارهٔ سفارش، تلفن، ابتدای نام، کد کوپن، ایمیل یا نام کاربری دقیق"
+    )
+    raw_id_fields = ("user",)
     inlines = [OrderItemInline]
     readonly_fields = ("created_at",)
+    # با «انتخاب همه» خروجی کل نتایج فیلترشدهٔ changelist را می‌گیرد
+    actions = ["export_csv", "export_xlsx"]
+    action_form = OrderExportActionForm
+
+    def change_view(self, request, object_id, form_url="", extra_context=None):
+        # لینک‌های قدیمی سفارش‌های بایگانی‌شده به نمای بایگانی می‌روند
+        if (
+            str(object_id).isdigit()
+            and not Order.objects.filter(pk=object_id).exists()
+            and ArchivedOrder.objects.filter(pk=object_id).exists()
+        ):
+            return redirect("admin:orders_archivedorder_change", object_id)
+        return super().change_view(request, object_id, form_url, extra_context)
+
+    def _export_name(self, ext):
+        return f"orders-{timezone.localtime():%Y%m%d-%H%M}.{ext}"
+
+    def _export_querysets(self, request, queryset):
+        """
+        (سفارش‌ها، بایگانی یا None) با فیلترهای فرم action.
+        ردیف‌های انتخاب‌شده فقط سفارش‌های زنده‌اند؛ بایگانی فقط با فیلترهای فرم محدود می‌شود.
+        """
+        form = self.action_form(request.POST)
+        form.fields["action"].choices = self.get_action_choices(request)
+        # response_action همین فرم را پیش از اجرای action اعتبارسنجی کرده است
+        form.full_clean()
+        data = form.cleaned_data
+        filters = {
+            "date_from": data["date_from"],
+            "date_to": data["date_to"],
+            "statuses": [data["status"]] if data["status"] else None,
+        }
+        archived = (
+            filter_orders(ArchivedOrder.objects.all(), **filters)
+            if data["include_archived"]
+            else None
+        )
+        return filter_orders(queryset, **filters), archived
+
+    @admin.action(description=_("خروجی CSV برای حسابداری"))
+    def export_csv(self, request, queryset):
+        qs, archived = self._export_querysets(request, queryset)
+        response = StreamingHttpResponse(
+            stream_csv(qs, archived=archived), content_type="text/csv; charset=utf-8"
+        )
+        filename = self._export_name("csv")
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+    @admin.action(description=_("خروجی XLSX برای حسابداری"))
+    def export_xlsx(self, request, queryset):
+        if not HAS_XLSXWRITER:
+            self.message_user(request, XLSX_MISSING, level=messages.ERROR)
+            return None
+        qs, archived = self._export_querysets(request, queryset)
+        # ردیف‌ها روی دیسک نوشته می‌شوند و FileResponse تکه‌تکه می‌فرستد
+        tmp = tempfile.TemporaryFile()
+        write_xlsx(qs, tmp, archived=archived)
+        tmp.seek(0)
+        return FileResponse(
+            tmp,
+            as_attachment=True,
+            filename=self._export_name("xlsx"),
+            content_type=(
+                "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            ),
+        )
+
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ("id", "user", "status", "total", "created_at", "archived_at")
+    list_filter = ("status",)
+    list_select_related = ("user",)
+    search_fields = ("id", "phone", "user__email", "user__username")
+    search_help_text = _("شمارهٔ سفارش، تلفن، ایمیل یا نام کاربری دقیق")
+    date_hierarchy = "created_at"
+    fields = ("id", "user", "status", "total", "created_at", "archived_at", "details")
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description=_("جزئیات سفارش"))
+    def details(self, obj: ArchivedOrder):
+        order = as_order(obj)
+        rows = format_html_join(
+            "",
+            "<tr><td><code>{}</code></td><td>{}</td><td>{}</td><td>{}</td>"
+            "<td>{}</td></tr>",
+            (
+                (i.sku, i.product_name, i.price, i.quantity, i.line_total)
+                for i in order.archived_items
+            ),
+        )
+        payment = order.archived_payment
+        return format_html(
+            "<p>{} — {}، {}، {} {}</p>"
+            "<table><thead><tr><th>SKU</th><th>{}</th><th>{}</th><th>{}</th>"
+            "<th>{}</th></tr></thead><tbody>{}</tbody></table>"
+            "<p>{}: {} / {}: {} / {}: {}</p><p>{}: {}</p>",
+            order.full_name,
+            order.phone,
+            order.province,
+            order.city,
+            order.address_exact,
+            _("محصول"),
+            _("قیمت واحد"),
+            _("تعداد"),
+            _("جمع خط"),
+            rows,
+            _("جمع جزء"),
+            order.subtotal,
+            _("تخفیف"),
+            order.discount_amount,
+            _("هزینه ارسال"),
+            order.shipping_cost,
+            _("پرداخت"),
+            (
+                f"{payment.get_status_display()} {payment.ref_id}".strip()
+                if payment
+                else "—"
+            ),
+        )
 
 
 @admin.register(Coupon)
@@ -0,0 +1,186 @@
+"""
+بایگانی زمانی سفارش‌ها.
+
+- سفارش‌های قدیمی‌تر از ORDER_ARCHIVE_MONTHS ماه، دسته‌دسته (هر دسته یک
+  تراکنش) با اقلام و پرداختشان به ArchivedOrder منتقل و از جدول‌های اصلی حذف
+  می‌شوند؛ جدول Order فقط سفارش‌های اخیر را نگه می‌دارد.
+- فقط وضعیت‌های پایانی (ORDER_ARCHIVE_STATUSES) بایگانی می‌شوند؛ سفارش در
+  انتظار پرداخت یا پرداخت‌شده‌ای که هنوز ارسال نشده، هر چقدر قدیمی، در Order
+  می‌ماند تا درگاه/پنل staff بتواند وضعیتش را عوض کند.
+- payload = zlib(JSON) از همهٔ ستون‌های Order، OrderItem‌ها و Payment.
+- get_order_or_404 اول Order و بعد بایگانی را می‌گردد و برای سفارش بایگانی‌شده
+  یک Order ذخیره‌نشده با is_archived=True (و archived_items/archived_payment)
+  برمی‌گرداند؛ صفحهٔ موفقیت و ادمین همین را می‌خوانند.
+"""
+
+import calendar
+import json
+import zlib
+from dataclasses import dataclass
+
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.http import Http404
+from django.utils import timezone
+
+from .models import ArchivedOrder, Order, OrderItem
+
+DEFAULT_MONTHS = 12
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_STATUSES = ("shipped", "delivered", "canceled")
+
+
+def archive_statuses():
+    return tuple(getattr(settings, "ORDER_ARCHIVE_STATUSES", DEFAULT_STATUSES))
+
+
+def _payment_model():
+    try:
+        return apps.get_model("payments", "Payment")
+    except LookupError:
+        return None
+
+
+def archive_cutoff(months: int | None = None, now=None):
+    """همان روز/ساعت، months ماه قبل (روز آخر ماه اگر آن روز وجود نداشته باشد)."""
+    if months is None:
+        months = getattr(settings, "ORDER_ARCHIVE_MONTHS", DEFAULT_MONTHS)
+    now = now or timezone.now()
+    year, month = divmod(now.month - 1 - months, 12)
+    year, month = now.year + year, month + 1
+    day = min(now.day, calendar.monthrange(year, month)[1])
+    return now.replace(year=year, month=month, day=day)
+
+
+def _fields(obj) -> dict:
+    return {f.attname: getattr(obj, f.attname) for f in obj._meta.concrete_fields}
+
+
+def _instance(model, data: dict):
+    values = {}
+    for f in model._meta.concrete_fields:
+        if f.attname in data:
+            values[f.attname] = f.to_python(data[f.attname])
+    return model(**values)
+
+
+def pack_order(order, items, payment=None) -> bytes:
+    data = {
+        "order": _fields(order),
+        "items": [_fields(item) for item in items],
+        "payment": _fields(payment) if payment is not None else None,
+    }
+    raw = json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)
+    return zlib.compress(raw.encode("utf-8"), 6)
+
+
+def unpack(archived: ArchivedOrder) -> dict:
+    return json.loads(zlib.decompress(bytes(archived.payload)).decode("utf-8"))
+
+
+def as_order(archived: ArchivedOrder) -> Order:
+    """Order ذخیره‌نشده از بایگانی؛ items/payment در archived_items و archived_payment."""
+    data = unpack(archived)
+    order = _instance(Order, data["order"])
+    # JSON زمان را تا میلی‌ثانیه نگه می‌دارد؛ ستون بایگانی دقیق است (ترتیب keyset)
+    order.created_at = archived.created_at
+    order.is_archived = True
+    order.archived_at = archived.archived_at
+    order.archived_items = [_instance(OrderItem, item) for item in data["items"]]
+    Payment = _payment_model()
+    order.archived_payment = (
+        _instance(Payment, data["payment"])
+        if Payment is not None and data.get("payment")
+        else None
+    )
+    return order
+
+
+def get_order_or_404(order_id, user=None):
+    """سفارش زنده یا بایگانی‌شده؛ با user فقط سفارش‌های همان کاربر."""
+    filters = {"id": order_id}
+    if user is not None:
+        filters["user"] = user
+    order = Order.objects.filter(**filters).first()
+    if order is not None:
+        return order
+    archived = ArchivedOrder.objects.filter(**filters).first()
+    if archived is None:
+        raise Http404("No order matches the given query.")
+    return as_order(archived)
+
+
+@dataclass
+class ArchiveResult:
+    cutoff: object
+    orders: int = 0
+    items: int = 0
+    payments: int = 0
+    batches: int = 0
+    dry_run: bool = False
+
+
+def _lock(qs):
+    # روی PostgreSQL ردیف‌هایی که checkout/درگاه قفل کرده‌اند دور بعد می‌آیند
+    if connection.features.has_select_for_update_skip_locked:
+        return qs.select_for_update(skip_locked=True)
+    return qs
+
+
+def archive_orders(
+    cutoff=None, batch_size: int = DEFAULT_BATCH_SIZE, dry_run: bool = False
+) -> ArchiveResult:
+    """
+    انتقال سفارش‌های پایانی با created_at < cutoff به بایگانی، batch_size سفارش
+    در هر تراکنش. ایندکس (status, created_at) برای هر وضعیت فقط ابتدای بازه را می‌خواند.
+    """
+    cutoff = cutoff or archive_cutoff()
+    result = ArchiveResult(cutoff=cutoff, dry_run=dry_run)
+    old = Order.objects.filter(
+        created_at__lt=cutoff, status__in=archive_statuses()
+    ).order_by("created_at", "id")
+    if dry_run:
+        result.orders = old.count()
+        return result
+
+    Payment = _payment_model()
+    while True:
+        with transaction.atomic():
+            batch = list(_lock(old)[:batch_size])
+            if not batch:
+                break
+            ids = [o.pk for o in batch]
+            items = {}
+            for item in OrderItem.objects.filter(order_id__in=ids).order_by("id"):
+                items.setdefault(item.order_id, []).append(item)
+            payments = (
+                {p.order_id: p for p in Payment.objects.filter(order_id__in=ids)}
+                if Payment is not None
+                else {}
+            )
+            ArchivedOrder.objects.bulk_create(
+                [
+                    ArchivedOrder(
+                        id=o.pk,
+                        user_id=o.user_id,
+                        status=o.status,
+                        phone=o.phone,
+                        total=o.total,
+                        created_at=o.created_at,
+                        payload=pack_order(o, items.get(o.pk, []), payments.get(o.pk)),
+                    )
+                    for o in batch
+                ]
+            )
+            if payments:
+                Payment.objects.filter(order_id__in=ids).delete()
+            OrderItem.objects.filter(order_id__in=ids).delete()
+            Order.objects.filter(id__in=ids).delete()
+
+        result.batches += 1
+        result.orders += len(batch)
+        result.items += sum(len(v) for v in items.values())
+        result.payments += len(payments)
+    return result
@@ -0,0 +1,240 @@
+"""
+خروجی سفارش‌ها برای حسابداری (CSV یا XLSX)، یک ردیف برای هر قلم سفارش.
+
+- سفارش‌ها با keyset روی (created_at, id) دسته‌دسته خوانده می‌شوند و اقلام هر
+  دسته با iterator(chunk_size) می‌آیند؛ کل سفارش‌ها هیچ‌وقت در حافظه نیستند.
+- فیلتر بازهٔ تاریخ و وضعیت روی ایندکس‌های (created_at, id) و
+  (status, created_at) می‌نشیند.
+- CSV تکه‌تکه برای StreamingHttpResponse تولید می‌شود؛ XLSX با xlsxwriter در
+  حالت constant_memory (هر ردیف بلافاصله روی دیسک) در یک فایل نوشته می‌شود.
+- سفارش‌های بایگانی‌شده (orders.archive) با archived=... قبل از سفارش‌های زنده
+  می‌آیند (قدیمی‌ترند)؛ اقلامشان از payload خوانده می‌شود.
+- وابستگی اختیاری: pip install xlsxwriter؛ بدون آن فقط CSV در دسترس است.
+"""
+
+import csv
+import io
+from datetime import datetime, time, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .archive import as_order
+from .models import Order, OrderItem
+
+try:
+    import xlsxwriter
+
+    HAS_XLSXWRITER = True
+except Exception:
+    xlsxwriter = None
+    HAS_XLSXWRITER = False
+
+EXPORT_FORMATS = ("csv", "xlsx")
+XLSX_MISSING = "برای خروجی XLSX بستهٔ xlsxwriter لازم است (pip install xlsxwriter)."
+EXPORT_FIELDS = (
+    "order_id",
+    "created_at",
+    "status",
+    "user_email",
+    "full_name",
+    "phone",
+    "province",
+    "city",
+    "postal_code",
+    "coupon_code",
+    "subtotal",
+    "discount_amount",
+    "shipping_cost",
+    "total",
+    # شمارهٔ قلم در سفارش؛ برای جمع مبالغ سفارش فقط item_no=1 را بشمارید
+    "item_no",
+    "sku",
+    "product_name",
+    "price",
+    "quantity",
+    "line_total",
+)
+ORDER_FIELDS = (
+    "id",
+    "created_at",
+    "status",
+    "full_name",
+    "phone",
+    "province",
+    "city",
+    "postal_code",
+    "coupon_code",
+    "subtotal",
+    "discount_amount",
+    "shipping_cost",
+    "total",
+    "user__email",
+)
+DEFAULT_BATCH_SIZE = 500
+
+
+def filter_orders(qs=None, date_from=None, date_to=None, statuses=None):
+    """
+    date_from/date_to تاریخ (date) و هر دو شامل‌اند؛ statuses لیست مقادیر choices.
+    qs می‌تواند ArchivedOrder هم باشد (همان ستون‌های created_at/status).
+    """
+    qs = Order.objects.all() if qs is None else qs
+    tz = timezone.get_current_timezone()
+    if date_from:
+        qs = qs.filter(
+            created_at__gte=timezone.make_aware(
+                datetime.combine(date_from, time.min), tz
+            )
+        )
+    if date_to:
+        end = datetime.combine(date_to + timedelta(days=1), time.min)
+        qs = qs.filter(created_at__lt=timezone.make_aware(end, tz))
+    if statuses:
+        qs = qs.filter(status__in=list(statuses))
+    return qs
+
+
+def _keyset_batches(qs, batch_size):
+    qs = qs.order_by("created_at", "id")
+    last = None
+    while True:
+        page = qs
+        if last is not None:
+            page = qs.filter(
+                Q(created_at__gt=last.created_at)
+                | Q(created_at=last.created_at, id__gt=last.pk)
+            )
+        batch = list(page[:batch_size])
+        if not batch:
+            return
+        last = batch[-1]
+        yield batch
+
+
+def order_batches(qs, batch_size: int = DEFAULT_BATCH_SIZE):
+    """
+    دسته‌های متوالی سفارش‌ها به ترتیب (created_at, id)؛ بدون OFFSET.
+    """
+    yield from _keyset_batches(
+        qs.select_related("user").only(*ORDER_FIELDS), batch_size
+    )
+
+
+def archived_batches(qs, batch_size: int = DEFAULT_BATCH_SIZE):
+    """
+    مثل order_batches برای ArchivedOrder؛ هر عضو Order ذخیره‌نشدهٔ as_order است.
+    """
+    for batch in _keyset_batches(qs.select_related("user"), batch_size):
+        orders = []
+        for archived in batch:
+            order = as_order(archived)
+            order.user = archived.user
+            orders.append(order)
+        yield orders
+
+
+def _items_by_order(order_ids):
+    grouped = {}
+    rows = (
+        OrderItem.objects.filter(order_id__in=order_ids)
+        .only("order_id", "sku", "product_name", "price", "quantity", "line_total")
+        .order_by("order_id", "id")
+        .iterator(chunk_size=2000)
+    )
+    for item in rows:
+        grouped.setdefault(item.order_id, []).append(item)
+    return grouped
+
+
+def order_rows(order, items):
+    """ردیف‌های یک سفارش؛ سفارش بدون قلم هم یک ردیف (با ستون‌های قلم خالی) دارد."""
+    common = {
+        "order_id": order.pk,
+        "created_at": timezone.localtime(order.created_at).strftime(
+            "%Y-%m-%d %H:%M:%S"
+        ),
+        "status": order.status,
+        "user_email": order.user.email if order.user_id else "",
+        "full_name": order.full_name,
+        "phone": order.phone,
+        "province": order.province,
+        "city": order.city,
+        "postal_code": order.postal_code,
+        "coupon_code": order.coupon_code,
+        "subtotal": order.subtotal,
+        "discount_amount": order.discount_amount,
+        "shipping_cost": order.shipping_cost,
+        "total": order.total,
+    }
+    if not items:
+        return [{**common, "item_no": ""}]
+    return [
+        {
+            **common,
+            "item_no": no,
+            "sku": item.sku,
+            "product_name": item.product_name,
+            "price": item.price,
+            "quantity": item.quantity,
+            "line_total": item.line_total,
+        }
+        for no, item in enumerate(items, 1)
+    ]
+
+
+def _export_batches(qs, archived, batch_size):
+    """[(order, items)] هر دسته؛ اول بایگانی، بعد سفارش‌های زنده."""
+    if archived is not None:
+        for batch in archived_batches(archived, batch_size):
+            yield [(order, order.archived_items) for order in batch]
+    for batch in order_batches(qs, batch_size):
+        items = _items_by_order([o.pk for o in batch])
+        yield [(order, items.get(order.pk, [])) for order in batch]
+
+
+def iter_export_rows(qs, batch_size: int = DEFAULT_BATCH_SIZE, archived=None):
+    for batch in _export_batches(qs, archived, batch_size):
+        for order, items in batch:
+            yield from order_rows(order, items)
+
+
+def stream_csv(qs, batch_size: int = DEFAULT_BATCH_SIZE, archived=None):
+    """
+    ژنراتور رشته‌ها برای StreamingHttpResponse؛ هر دستهٔ سفارش یک تکه.
+    BOM اول فایل برای اینکه Excel متن فارسی را درست باز کند.
+    """
+    buf = io.StringIO()
+    writer = csv.DictWriter(
+        buf, fieldnames=EXPORT_FIELDS, lineterminator="\n", restval=""
+    )
+    buf.write("\ufeff")
+    writer.writeheader()
+    for batch in _export_batches(qs, archived, batch_size):
+        for order, items in batch:
+            writer.writerows(order_rows(order, items))
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+def write_xlsx(qs, target, batch_size: int = DEFAULT_BATCH_SIZE, archived=None) -> int:
+    """
+    XLSX در target (مسیر یا فایل باینری)؛ تعداد ردیف‌های داده را برمی‌گرداند.
+    """
+    if not HAS_XLSXWRITER:
+        raise RuntimeError(XLSX_MISSING)
+    workbook = xlsxwriter.Workbook(
+        target, {"constant_memory": True, "in_memory": False}
+    )
+    try:
+        sheet = workbook.add_worksheet("orders")
+        sheet.write_row(0, 0, EXPORT_FIELDS)
+        count = 0
+        for count, row in enumerate(iter_export_rows(qs, batch_size, archived), 1):
+            sheet.write_row(count, 0, [row.get(key, "") for key in EXPORT_FIELDS])
+    finally:
+        workbook.close()
+    return count
@@ -0,0 +1,89 @@
+"""
+تاریخچهٔ سفارش‌های کاربر با صفحه‌بندی keyset روی (created_at, id).
+
+- هر صفحه یک کوئری با LIMIT است (بدون OFFSET و بدون COUNT)؛ با ایندکس
+  (user, -created_at, -id) هزینه به تعداد کل سفارش‌ها بستگی ندارد.
+- اقلام سفارش در لیست بارگذاری نمی‌شوند؛ با باز کردن هر ردیف جداگانه می‌آیند.
+- cursor رشته‌ای opaque (base64 از «created_at|id» آخرین ردیف صفحه) است.
+- سفارش‌های بایگانی‌شده (ArchivedOrder، ایندکس (user, -created_at)) با همان
+  keyset خوانده و با سفارش‌های زنده ادغام می‌شوند؛ is_archived=True دارند.
+"""
+
+import base64
+import binascii
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from .models import ArchivedOrder, Order
+
+DEFAULT_PAGE_SIZE = 10
+# ترتیب مراحل نوار پیشرفت پروفایل
+STATUS_STEPS = ("pending", "paid", "processing", "shipped", "delivered")
+LIST_FIELDS = ("id", "status", "total", "created_at")
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def page_size() -> int:
+    return getattr(settings, "ORDER_HISTORY_PAGE_SIZE", DEFAULT_PAGE_SIZE)
+
+
+def order_step(status) -> int:
+    status = str(status or "").lower()
+    return STATUS_STEPS.index(status) + 1 if status in STATUS_STEPS else 1
+
+
+def encode_cursor(order) -> str:
+    raw = f"{order.created_at.isoformat()}|{order.pk}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created, pk = base64.urlsafe_b64decode(padded).decode("utf-8").split("|")
+        created_at = parse_datetime(created)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise InvalidCursor(cursor) from exc
+    if created_at is None:
+        raise InvalidCursor(cursor)
+    return created_at, pk
+
+
+def order_history_page(user, cursor: str | None = None, size: int | None = None):
+    """
+    (سفارش‌ها، cursor صفحهٔ بعد یا None). فقط ستون‌های لازم برای جدول خوانده می‌شوند.
+    """
+    size = size or page_size()
+    after = None
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        after = Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+
+    orders = []
+    for model in (Order, ArchivedOrder):
+        qs = (
+            model.objects.filter(user=user)
+            .only(*LIST_FIELDS)
+            .order_by("-created_at", "-id")
+        )
+        if after is not None:
+            qs = qs.filter(after)
+        # یک ردیف اضافه فقط برای فهمیدن اینکه صفحهٔ بعدی هست یا نه
+        rows = list(qs[: size + 1])
+        for o in rows:
+            o.is_archived = model is ArchivedOrder
+        orders.extend(rows)
+
+    orders.sort(key=lambda o: (o.created_at, o.pk), reverse=True)
+    orders = orders[: size + 1]
+    has_next = len(orders) > size
+    orders = orders[:size]
+    for o in orders:
+        o.step = order_step(o.status)
+    return orders, (encode_cursor(orders[-1]) if has_next else None)
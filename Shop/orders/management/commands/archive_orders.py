@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from orders.archive import DEFAULT_BATCH_SIZE, archive_cutoff, archive_orders
+
+
+class Command(BaseCommand):
+    help = (
+        "انتقال سفارش‌های قدیمیِ پایان‌یافته (با اقلام و پرداخت) به جدول بایگانی، "
+        "دسته‌دسته و هر دسته در یک تراکنش."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--months",
+            type=int,
+            default=None,
+            help="قدیمی‌تر از این تعداد ماه؛ پیش‌فرض ORDER_ARCHIVE_MONTHS",
+        )
+        parser.add_argument("--batch", type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument(
+            "--dry-run", action="store_true", help="فقط شمارش، بدون انتقال"
+        )
+
+    def handle(self, *args, **opts):
+        cutoff = archive_cutoff(opts["months"])
+        started = time.monotonic()
+        result = archive_orders(
+            cutoff, batch_size=opts["batch"], dry_run=opts["dry_run"]
+        )
+        if result.dry_run:
+            self.stdout.write(
+                f"{result.orders} سفارش قبل از {cutoff:%Y-%m-%d} بایگانی می‌شود."
+            )
+            return
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"قبل از {cutoff:%Y-%m-%d}: {result.orders} سفارش، "
+                f"{result.items} قلم، {result.payments} پرداخت در "
+                f"{result.batches} دسته؛ {time.monotonic() - started:.1f} ثانیه"
+            )
+        )
@@ -0,0 +1,171 @@
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import (
+    DEFAULT_DB_ALIAS,
+    OperationalError,
+    connections,
+    models,
+    transaction,
+)
+
+from orders.models import Order, OrderItem
+from products.models import ProductVariation
+
+# پیش‌فرض‌های Django برای SQLite: rollback journal، تراکنش DEFERRED
+BASELINE_OPTIONS = {"init_command": "PRAGMA journal_mode=DELETE;"}
+
+
+def tuned_options():
+    """
+    پروفایل DATABASES['default']['OPTIONS']؛ روی کپی موقت WAL همیشه روشن است
+    (در settings فقط با SHOP_SQLITE_WAL=1).
+    """
+    options = dict(settings.DATABASES[DEFAULT_DB_ALIAS].get("OPTIONS", {}))
+    init = options.get("init_command", "")
+    if "journal_mode=WAL" not in init:
+        options["init_command"] = settings.SQLITE_WAL_INIT + init
+    return options
+
+
+class Command(BaseCommand):
+    help = (
+        "مقایسهٔ توان ثبت سفارش هم‌زمان روی SQLite: پیش‌فرض Django در برابر "
+        "پروفایل DATABASES['default']['OPTIONS'] (روی کپی موقت دیتابیس)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument(
+            "--orders", type=int, default=100, help="سفارش برای هر thread"
+        )
+
+    def handle(self, *args, **opts):
+        primary = settings.DATABASES[DEFAULT_DB_ALIAS]
+        if not primary["ENGINE"].endswith("sqlite3"):
+            raise CommandError("این بنچمارک فقط برای SQLite است.")
+
+        workdir = tempfile.mkdtemp(prefix="bench_checkout_")
+        try:
+            source = os.path.join(workdir, "source.sqlite3")
+            self.snapshot(source)
+            profiles = [("baseline", BASELINE_OPTIONS), ("tuned", tuned_options())]
+            for name, options in profiles:
+                path = os.path.join(workdir, f"{name}.sqlite3")
+                shutil.copyfile(source, path)
+                stats = self.run_profile(
+                    name, path, options, opts["threads"], opts["orders"]
+                )
+                self.stdout.write(
+                    f"{name:8s} سفارش موفق: {stats['ok']:5d}  "
+                    f"خطای قفل: {stats['locked']:5d}  "
+                    f"زمان: {stats['elapsed']:6.2f}s  "
+                    f"توان: {stats['ok'] / stats['elapsed']:8.1f} سفارش/ثانیه"
+                )
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def snapshot(self, target_path):
+        conn = connections[DEFAULT_DB_ALIAS]
+        conn.ensure_connection()
+        target = sqlite3.connect(target_path)
+        try:
+            conn.connection.backup(target)
+            # کپی را به حالت پیش‌فرض برمی‌گردانیم؛ هر پروفایل حالت خودش را تنظیم می‌کند
+            target.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            target.close()
+
+    def run_profile(self, name, path, options, threads, per_thread) -> dict:
+        """
+        threads × per_thread ثبت سفارش هم‌زمان روی path؛
+        {"ok", "locked", "elapsed", "stock"} (stock = موجودی کل واریانت‌ها در پایان).
+        """
+        alias = f"bench_{name}"
+        # تنظیمات کامل (با پیش‌فرض‌ها) از alias اصلی کپی می‌شود
+        connections.settings[alias] = {
+            **connections.settings[DEFAULT_DB_ALIAS],
+            "NAME": path,
+            "OPTIONS": dict(options),
+            "CONN_MAX_AGE": 0,
+        }
+        # اتصال قبلی همین alias (اجرای قبلی) تنظیمات کهنه دارد
+        try:
+            del connections[alias]
+        except AttributeError:
+            pass
+
+        variation_ids = list(
+            ProductVariation.objects.using(alias).values_list("id", flat=True)
+        )
+        if not variation_ids:
+            raise CommandError("هیچ واریانتی برای شبیه‌سازی سفارش نیست.")
+        ProductVariation.objects.using(alias).update(stock=10**6)
+
+        stats = {"ok": 0, "locked": 0}
+        lock = threading.Lock()
+
+        def worker():
+            try:
+                for _ in range(per_thread):
+                    try:
+                        self._checkout(alias, random.choice(variation_ids))
+                        key = "ok"
+                    except OperationalError as exc:
+                        if "locked" not in str(exc) and "busy" not in str(exc):
+                            raise
+                        key = "locked"
+                    with lock:
+                        stats[key] += 1
+            finally:
+                connections[alias].close()
+
+        started = time.monotonic()
+        pool = [threading.Thread(target=worker) for _ in range(threads)]
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        stats["elapsed"] = time.monotonic() - started
+        stats["stock"] = ProductVariation.objects.using(alias).aggregate(
+            total=models.Sum("stock")
+        )["total"]
+        connections[alias].close()
+        return stats
+
+    def _checkout(self, alias, variation_id):
+        # همان الگوی orders.views.checkout: خواندن، ساخت سفارش، کم کردن موجودی
+        with transaction.atomic(using=alias):
+            v = (
+                ProductVariation.objects.using(alias)
+                .select_related("product")
+                .get(pk=variation_id)
+            )
+            price = v.price_override or v.product.price
+            order = Order.objects.using(alias).create(
+                full_name="bench",
+                province="-",
+                city="-",
+                address_exact="-",
+                subtotal=price,
+                total=price,
+            )
+            OrderItem.objects.using(alias).create(
+                order=order,
+                variation_id=v.pk,
+                product_name=v.product.name,
+                sku=v.sku,
+                price=price,
+                quantity=1,
+                line_total=price,
+            )
+            ProductVariation.objects.using(alias).filter(pk=v.pk).update(
+                stock=models.F("stock") - 1
+            )
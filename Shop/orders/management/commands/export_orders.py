@@ -0,0 +1,101 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from orders.export import (
+    DEFAULT_BATCH_SIZE,
+    EXPORT_FORMATS,
+    HAS_XLSXWRITER,
+    XLSX_MISSING,
+    filter_orders,
+    stream_csv,
+    write_xlsx,
+)
+from orders.models import ArchivedOrder, Order
+
+
+def _date(value):
+    parsed = parse_date(value)
+    if parsed is None:
+        raise CommandError(f"تاریخ نامعتبر: {value} (قالب YYYY-MM-DD)")
+    return parsed
+
+
+class Command(BaseCommand):
+    help = (
+        "خروجی سفارش‌ها (با بایگانی) و اقلامشان برای حسابداری (CSV/XLSX)، "
+        "بدون بارگذاری کل جدول."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+        parser.add_argument(
+            "--output", default=None, help="مسیر فایل؛ برای CSV پیش‌فرض stdout"
+        )
+        parser.add_argument(
+            "--from", dest="date_from", type=_date, help="از تاریخ (شامل)"
+        )
+        parser.add_argument("--to", dest="date_to", type=_date, help="تا تاریخ (شامل)")
+        parser.add_argument(
+            "--status",
+            action="append",
+            dest="statuses",
+            choices=Order.Status.values,
+            help="قابل تکرار؛ پیش‌فرض همهٔ وضعیت‌ها",
+        )
+        parser.add_argument(
+            "--no-archive",
+            action="store_true",
+            help="بدون سفارش‌های بایگانی‌شده (ArchivedOrder)",
+        )
+        parser.add_argument("--batch", type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **opts):
+        filters = {
+            "date_from": opts["date_from"],
+            "date_to": opts["date_to"],
+            "statuses": opts["statuses"],
+        }
+        qs = filter_orders(**filters)
+        archived = (
+            None
+            if opts["no_archive"]
+            else filter_orders(ArchivedOrder.objects.all(), **filters)
+        )
+        started = time.monotonic()
+
+        if opts["format"] == "xlsx":
+            if not HAS_XLSXWRITER:
+                raise CommandError(XLSX_MISSING)
+            if not opts["output"]:
+                raise CommandError("خروجی XLSX به --output نیاز دارد.")
+            rows = write_xlsx(
+                qs, opts["output"], batch_size=opts["batch"], archived=archived
+            )
+            self.stderr.write(
+                self.style.SUCCESS(
+                    f"{opts['output']}: {rows} ردیف، "
+                    f"{time.monotonic() - started:.1f} ثانیه"
+                )
+            )
+            return
+
+        out = (
+            open(opts["output"], "w", encoding="utf-8", newline="")
+            if opts["output"]
+            else sys.stdout
+        )
+        try:
+            for chunk in stream_csv(qs, batch_size=opts["batch"], archived=archived):
+                out.write(chunk)
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        if opts["output"]:
+            self.stderr.write(
+                self.style.SUCCESS(
+                    f"{opts['output']}: {time.monotonic() - started:.1f} ثانیه"
+                )
+            )
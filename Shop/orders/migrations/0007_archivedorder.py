@@ -0,0 +1,82 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0006_order_export_idx"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedOrder",
+            fields=[
+                (
+                    "id",
+                    models.BigIntegerField(
+                        primary_key=True, serialize=False, verbose_name="شماره سفارش"
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "در انتظار پرداخت"),
+                            ("paid", "پرداخت شده"),
+                            ("canceled", "لغو شده"),
+                            ("shipped", "ارسال شده"),
+                        ],
+                        max_length=16,
+                        verbose_name="وضعیت",
+                    ),
+                ),
+                (
+                    "phone",
+                    models.CharField(blank=True, max_length=20, verbose_name="تلفن"),
+                ),
+                (
+                    "total",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=12,
+                        verbose_name="مبلغ نهایی",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(verbose_name="تاریخ ایجاد")),
+                (
+                    "archived_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, verbose_name="تاریخ بایگانی"
+                    ),
+                ),
+                ("payload", models.BinaryField(verbose_name="دادهٔ فشرده")),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="archived_orders",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="کاربر",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "سفارش بایگانی\u200cشده",
+                "verbose_name_plural": "سفارش\u200cهای بایگانی\u200cشده",
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["user", "-created_at"], name="archived_order_user_idx"
+                    ),
+                    models.Index(fields=["phone"], name="archived_order_phone_idx"),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0007_archivedorder"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="order",
+            name="coupon_code",
+            field=models.CharField(
+                blank=True, db_index=True, max_length=40, verbose_name="کد کوپن"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="order",
+            name="full_name",
+            field=models.CharField(
+                db_index=True, max_length=100, verbose_name="نام و نام\u200cخانوادگی"
+            ),
+        ),
+    ]
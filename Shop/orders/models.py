@@ -136,7 +136,8 @@ class Order(models.Model):
         _("وضعیت"), max_length=16, choices=Status.choices, default=Status.PENDING
     )
 
-    full_name = models.CharField(_("نام و نام‌خانوادگی"), max_length=100)
+    # db_index نه Meta.indexes؛ جست‌وجوی پیشوند ادمین (ن.ک. Shop.admin_tools)
+    full_name = models.CharField(_("نام و نام‌خانوادگی"), max_length=100, db_index=True)
     phone = models.CharField(_("تلفن"), max_length=20, blank=True)
     province = models.CharField(_("استان"), max_length=100)
     city = models.CharField(_("شهر"), max_length=100)
@@ -157,7 +158,9 @@ class Order(models.Model):
     total = models.DecimalField(
         _("مبلغ نهایی"), max_digits=12, decimal_places=2, default=0
     )
-    coupon_code = models.CharField(_("کد کوپن"), max_length=40, blank=True)
+    coupon_code = models.CharField(
+        _("کد کوپن"), max_length=40, blank=True, db_index=True
+    )
 
     created_at = models.DateTimeField(_("تاریخ ایجاد"), default=timezone.now)
 
@@ -165,6 +168,25 @@ class Order(models.Model):
         ordering = ["-created_at"]
         verbose_name = _("سفارش")
         verbose_name_plural = _("سفارش‌ها")
+        indexes = [
+            # آمار و تاریخچهٔ سفارش‌های هر کاربر (orders.stats)
+            models.Index(
+                fields=["user", "status", "-created_at"],
+                name="order_user_status_created_idx",
+            ),
+            # صفحه‌بندی keyset تاریخچه (orders.history)
+            models.Index(
+                fields=["user", "-created_at", "-id"],
+                name="order_user_created_idx",
+            ),
+            # جست‌وجوی سفارش با تلفن در داشبورد staff
+            models.Index(fields=["phone"], name="order_phone_idx"),
+            # خروجی حسابداری (orders.export): بازهٔ تاریخ + keyset، و وضعیت
+            models.Index(fields=["created_at", "id"], name="order_created_id_idx"),
+            models.Index(
+                fields=["status", "created_at"], name="order_status_created_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"Order #{self.id} - {self.get_status_display()}"
@@ -183,3 +205,47 @@ class OrderItem(models.Model):
 
     def __str__(self):
         return f"{self.product_name} x{self.quantity}"
+
+
+class ArchivedOrder(models.Model):
+    """
+    سفارش بایگانی‌شده (orders.archive). ستون‌ها فقط برای لیست/جست‌وجو هستند؛
+    خود سفارش با اقلام و پرداختش به‌صورت JSON فشرده (zlib) در payload است.
+    شناسه همان شناسهٔ سفارش اصلی است تا لینک‌های قدیمی کار کنند.
+    """
+
+    id = models.BigIntegerField(_("شماره سفارش"), primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="archived_orders",
+        verbose_name=_("کاربر"),
+    )
+    status = models.CharField(_("وضعیت"), max_length=16, choices=Order.Status.choices)
+    phone = models.CharField(_("تلفن"), max_length=20, blank=True)
+    total = models.DecimalField(
+        _("مبلغ نهایی"), max_digits=12, decimal_places=2, default=0
+    )
+    created_at = models.DateTimeField(_("تاریخ ایجاد"))
+    archived_at = models.DateTimeField(_("تاریخ بایگانی"), default=timezone.now)
+    payload = models.BinaryField(_("دادهٔ فشرده"))
+
+    class Meta:
+        ordering = ["-created_at"]
+        verbose_name = _("سفارش بایگانی‌شده")
+        verbose_name_plural = _("سفارش‌های بایگانی‌شده")
+        indexes = [
+            models.Index(
+                fields=["user", "-created_at"], name="archived_order_user_idx"
+            ),
+            models.Index(fields=["phone"], name="archived_order_phone_idx"),
+            # خروجی حسابداری (orders.export): بازهٔ تاریخ + keyset
+            models.Index(
+                fields=["created_at", "id"], name="archived_order_created_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"Archived order #{self.id} - {self.get_status_display()}"
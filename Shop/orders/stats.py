@@ -0,0 +1,40 @@
+"""
+آمار سفارش‌های یک کاربر با یک aggregate (Count/Sum/Max با filter).
+
+با ایندکس (user, status, created_at) فقط ردیف‌های همان کاربر خوانده می‌شوند؛
+مقایسهٔ وضعیت دقیق است (مقادیر choices حروف کوچک‌اند)، نه iexact.
+سفارش‌های بایگانی‌شده با aggregate دوم روی ArchivedOrder جمع زده می‌شوند.
+"""
+
+from django.db.models import Count, DecimalField, Max, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import ArchivedOrder, Order
+
+# کلیدهایی که قالب پروفایل نمایش می‌دهد؛ وضعیت‌های بیرون از choices صفر می‌مانند
+STATUS_KEYS = ("pending", "paid", "processing", "shipped", "delivered", "canceled")
+# سفارش‌هایی که در «مجموع خرید» حساب می‌شوند
+SPENT_STATUSES = ("paid", "processing", "shipped", "delivered")
+
+
+def user_order_stats(user) -> dict:
+    """
+    {"all", <status>..., "spent", "last_order_at"} برای داشبورد کاربر
+    (یک کوئری روی سفارش‌ها + یکی روی بایگانی).
+    """
+    aggregates = {
+        "all": Count("id"),
+        **{key: Count("id", filter=Q(status=key)) for key in STATUS_KEYS},
+        "spent": Coalesce(
+            Sum("total", filter=Q(status__in=SPENT_STATUSES)),
+            Value(0),
+            output_field=DecimalField(max_digits=14, decimal_places=2),
+        ),
+        "last_order_at": Max("created_at"),
+    }
+    live = Order.objects.filter(user=user).aggregate(**aggregates)
+    archived = ArchivedOrder.objects.filter(user=user).aggregate(**aggregates)
+    stats = {key: live[key] + archived[key] for key in live if key != "last_order_at"}
+    dates = [d for d in (live["last_order_at"], archived["last_order_at"]) if d]
+    stats["last_order_at"] = max(dates, default=None)
+    return stats
@@ -1,2 +1,636 @@
-from django.test import TestCase
+import csv
+import io
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
 
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.contrib.messages import get_messages
+from django.core.management import call_command
+from django.db import connection, connections
+from django.http import Http404
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from orders.archive import archive_orders, get_order_or_404
+from orders.export import (
+    EXPORT_FIELDS,
+    HAS_XLSXWRITER,
+    XLSX_MISSING,
+    filter_orders,
+    stream_csv,
+    write_xlsx,
+)
+from orders.history import InvalidCursor, decode_cursor, order_history_page
+from orders.management.commands.bench_checkout import (
+    BASELINE_OPTIONS,
+    Command as BenchCheckout,
+    tuned_options,
+)
+from orders.models import ArchivedOrder, Order, OrderItem
+from orders.stats import STATUS_KEYS, user_order_stats
+from products.models import (
+    Brand,
+    Category,
+    Product,
+    ProductNeighbor,
+    ProductVariation,
+)
+from products.recommendations import build_bought_together, neighbors_for
+
+
+def make_variations(count=3, stock=10):
+    category = Category.objects.create(name="تیشرت")
+    brand = Brand.objects.create(name="برند")
+    product = Product.objects.create(
+        category=category, brand=brand, name="تیشرت ساده", price=Decimal("100000")
+    )
+    return [
+        ProductVariation.objects.create(product=product, sku=f"TS-{i}", stock=stock)
+        for i in range(count)
+    ]
+
+
+@skipUnless(connection.vendor == "sqlite", "bench_checkout فقط برای SQLite است")
+class CheckoutConcurrencyTests(TransactionTestCase):
+    """
+    همان بار bench_checkout روی دو کپی فایل SQLite: پروفایل tuned نباید هیچ
+    خطای قفل بدهد و موجودی باید دقیقاً به اندازهٔ سفارش‌های موفق کم شود.
+    """
+
+    # aliasهای bench_checkout قبل از setUpClass ثبت می‌شوند تا "__all__" شاملشان
+    # شود (اتصال threadها به aliasهای اعلام‌نشده در تست ممنوع است)
+    databases = "__all__"
+    bench_aliases = ("bench_baseline", "bench_tuned")
+    threads = 6
+    per_thread = 15
+
+    @classmethod
+    def setUpClass(cls):
+        cls.workdir = tempfile.mkdtemp(prefix="test_checkout_")
+        for alias in cls.bench_aliases:
+            connections.settings[alias] = {
+                **connections.settings["default"],
+                "NAME": os.path.join(cls.workdir, f"{alias}.sqlite3"),
+            }
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        for alias in cls.bench_aliases:
+            connections[alias].close()
+            del connections[alias]
+            del connections.settings[alias]
+        shutil.rmtree(cls.workdir, ignore_errors=True)
+
+    def setUp(self):
+        make_variations()
+        self.bench = BenchCheckout()
+        self.source = os.path.join(self.workdir, "source.sqlite3")
+        self.bench.snapshot(self.source)
+
+    def run_profile(self, name, options):
+        path = connections.settings[f"bench_{name}"]["NAME"]
+        shutil.copyfile(self.source, path)
+        return self.bench.run_profile(
+            name, path, options, self.threads, self.per_thread
+        )
+
+    def test_tuned_profile_has_no_lock_errors(self):
+        stats = self.run_profile("tuned", tuned_options())
+        total = self.threads * self.per_thread
+        self.assertEqual(stats["locked"], 0)
+        self.assertEqual(stats["ok"], total)
+        self.assertEqual(stats["stock"], 3 * 10**6 - total)
+
+    def test_baseline_loses_no_stock_updates(self):
+        # پیش‌فرض Django ممکن است خطای قفل بدهد، ولی هر سفارش موفق دقیقاً یک‌بار کم می‌کند
+        stats = self.run_profile("baseline", BASELINE_OPTIONS)
+        self.assertEqual(stats["ok"] + stats["locked"], self.threads * self.per_thread)
+        self.assertEqual(stats["stock"], 3 * 10**6 - stats["ok"])
+
+
+def make_order(user, variations, days_ago=0, status=Order.Status.PAID, total=100):
+    order = Order.objects.create(
+        user=user,
+        status=status,
+        full_name="کاربر آزمایشی",
+        phone="09120000000",
+        province="تهران",
+        city="تهران",
+        address_exact="خیابان آزمایش",
+        total=Decimal(total),
+        created_at=timezone.now() - timedelta(days=days_ago),
+    )
+    for v in variations:
+        OrderItem.objects.create(
+            order=order,
+            variation=v,
+            product_name=v.product.name,
+            sku=v.sku,
+            price=Decimal(total),
+            quantity=1,
+            line_total=Decimal(total),
+        )
+    return order
+
+
+class ArchiveFallbackTests(TestCase):
+    """
+    سفارش بایگانی‌شده باید برای صاحبش همچنان در جزئیات، تاریخچه، آمار و
+    همسایه‌های خریدی دیده شود.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create_user("a@example.com", "buyer", "x")
+        cls.other = User.objects.create_user("b@example.com", "other", "x")
+        cls.variations = make_variations()
+        cls.old = make_order(
+            cls.user,
+            cls.variations[:2],
+            days_ago=400,
+            status=Order.Status.SHIPPED,
+            total=300,
+        )
+        cls.unpaid = make_order(
+            cls.user, cls.variations[:1], days_ago=400, status=Order.Status.PENDING
+        )
+        cls.unshipped = make_order(cls.user, cls.variations[:1], days_ago=400)
+        cls.recent = make_order(cls.user, cls.variations[:1], days_ago=1)
+        archive_orders()
+
+    def test_old_order_moves_to_archive(self):
+        self.assertFalse(Order.objects.filter(pk=self.old.pk).exists())
+        self.assertTrue(ArchivedOrder.objects.filter(pk=self.old.pk).exists())
+        self.assertFalse(OrderItem.objects.filter(order_id=self.old.pk).exists())
+        self.assertTrue(Order.objects.filter(pk=self.recent.pk).exists())
+
+    def test_unsettled_orders_stay_live(self):
+        # در انتظار پرداخت / پرداخت‌شدهٔ ارسال‌نشده هنوز ممکن است عوض شوند
+        for order in (self.unpaid, self.unshipped):
+            self.assertTrue(Order.objects.filter(pk=order.pk).exists())
+            self.assertFalse(ArchivedOrder.objects.filter(pk=order.pk).exists())
+        self.assertEqual(archive_orders(dry_run=True).orders, 0)
+        Order.objects.filter(pk=self.unshipped.pk).update(status=Order.Status.CANCELED)
+        self.assertEqual(archive_orders().orders, 1)
+        self.assertEqual(
+            ArchivedOrder.objects.get(pk=self.unshipped.pk).status,
+            Order.Status.CANCELED,
+        )
+
+    def test_success_page_of_archived_order(self):
+        url = reverse("orders:success", args=[self.old.pk])
+        self.client.force_login(self.user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context["order"].is_archived)
+        self.assertContains(response, f"#{self.old.pk}")
+        # دکمهٔ پرداخت فقط برای سفارش زندهٔ در انتظار پرداخت
+        self.assertNotContains(
+            response, reverse("payments:zarinpal_start", args=[self.old.pk])
+        )
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.other.is_staff = True
+        self.other.save(update_fields=["is_staff"])
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_admin_change_link_redirects_to_archive(self):
+        admin = get_user_model().objects.create_superuser(
+            "root@example.com", "root", "x"
+        )
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse("admin:orders_order_change", args=[self.old.pk])
+        )
+        self.assertRedirects(
+            response,
+            reverse("admin:orders_archivedorder_change", args=[self.old.pk]),
+            fetch_redirect_response=False,
+        )
+
+    def test_get_order_or_404_round_trip(self):
+        order = get_order_or_404(self.old.pk, user=self.user)
+        self.assertTrue(order.is_archived)
+        self.assertEqual(order.total, Decimal(300))
+        self.assertEqual(order.full_name, self.old.full_name)
+        self.assertEqual(order.created_at, self.old.created_at)
+        self.assertEqual(
+            [it.sku for it in order.archived_items],
+            [v.sku for v in self.variations[:2]],
+        )
+        live = get_order_or_404(self.recent.pk, user=self.user)
+        self.assertFalse(getattr(live, "is_archived", False))
+        with self.assertRaises(Http404):
+            get_order_or_404(self.old.pk, user=self.other)
+
+    def test_history_includes_archived_orders(self):
+        seen, cursor = [], None
+        while True:
+            orders, cursor = order_history_page(self.user, cursor, size=1)
+            seen += [(o.pk, o.is_archived) for o in orders]
+            if cursor is None:
+                break
+        self.assertEqual(
+            seen,
+            [
+                (self.recent.pk, False),
+                (self.unshipped.pk, False),
+                (self.unpaid.pk, False),
+                (self.old.pk, True),
+            ],
+        )
+
+    def test_history_items_of_archived_order(self):
+        self.client.force_login(self.user)
+        url = reverse("orders:history_items", args=[self.old.pk])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        for v in self.variations[:2]:
+            self.assertContains(response, v.sku)
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_stats_count_archived_orders(self):
+        stats = user_order_stats(self.user)
+        self.assertEqual(stats["all"], 4)
+        self.assertEqual(stats["shipped"], 1)
+        self.assertEqual(stats["paid"], 2)
+        self.assertEqual(stats["pending"], 1)
+        self.assertEqual(stats["spent"], Decimal(500))
+        self.assertEqual(stats["last_order_at"], self.recent.created_at)
+
+    def test_full_neighbor_build_counts_archived_orders(self):
+        # دو سبد یکسان از دو محصول، فقط در بایگانی (حداقل دو سفارش مشترک لازم است)
+        first = self.variations[0]
+        second = ProductVariation.objects.create(
+            product=Product.objects.create(
+                category=first.product.category,
+                brand=first.product.brand,
+                name="شلوار",
+                price=Decimal("200000"),
+            ),
+            sku="PT-1",
+            stock=10,
+        )
+        make_order(self.user, [first, second], days_ago=500, status="shipped")
+        make_order(self.other, [first, second], days_ago=450, status="shipped")
+        archive_orders()
+        # فقط بایگانی می‌ماند (سفارش اخیر شناسهٔ کوچک‌تری دارد و هنوز settle نشده)
+        Order.objects.all().delete()
+
+        result = build_bought_together(full=True)
+        self.assertEqual(result.orders, 3)
+        neighbors = neighbors_for(first.product_id)[
+            ProductNeighbor.Kind.BOUGHT_TOGETHER
+        ]
+        self.assertEqual([p.pk for p in neighbors], [second.product_id])
+
+
+class BoughtTogetherBuildTests(TestCase):
+    """
+    build_bought_together: ترتیب lift/jaccard، حد min_pair_orders، و برابری
+    ساخت افزایشی با --full.
+    سبدها: A+B ×۴، A+C ×۲، A+D ×۱، B تنها ×۱ => n_A=7، n_B=5، n_C=2.
+    lift: C (2N/14) > B (4N/35)؛ jaccard: B (4/8) > C (2/7).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("n@example.com", "n", "x")
+        category = Category.objects.create(name="تیشرت")
+        brand = Brand.objects.create(name="برند")
+        cls.v = {}
+        for name in "ABCDE":
+            product = Product.objects.create(
+                category=category, brand=brand, name=name, price=Decimal("1000")
+            )
+            cls.v[name] = ProductVariation.objects.create(
+                product=product, sku=f"BT-{name}", stock=10
+            )
+        for basket, times in (("AB", 4), ("AC", 2), ("AD", 1), ("B", 1)):
+            cls.buy(basket, times)
+
+    @classmethod
+    def buy(cls, basket, times, days_ago=5):
+        # بیرون از پنجرهٔ settle_hours
+        for _ in range(times):
+            make_order(cls.user, [cls.v[n] for n in basket], days_ago=days_ago)
+
+    def neighbors(self, name):
+        kind = ProductNeighbor.Kind.BOUGHT_TOGETHER
+        products = neighbors_for(self.v[name].product_id, [kind])[kind]
+        return "".join(p.name for p in products)
+
+    def lists(self):
+        return {name: self.neighbors(name) for name in "ABCDE"}
+
+    def test_lift_and_jaccard_rank_differently(self):
+        build_bought_together(full=True, metric="lift")
+        self.assertEqual(self.neighbors("A"), "CB")
+        build_bought_together(full=True, metric="jaccard")
+        self.assertEqual(self.neighbors("A"), "BC")
+
+    def test_min_pair_orders(self):
+        build_bought_together(full=True, metric="lift")
+        self.assertNotIn("D", self.neighbors("A"))
+        self.assertEqual(self.neighbors("D"), "")
+        build_bought_together(full=True, metric="lift", min_pair_orders=1)
+        # lift(A,D) = lift(A,C) = N/7؛ تساوی با تعداد سفارش مشترک شکسته می‌شود
+        self.assertEqual(self.neighbors("A"), "CDB")
+        self.assertEqual(self.neighbors("D"), "A")
+
+    def test_incremental_matches_full(self):
+        # A سفارش جدیدی ندارد ولی n_B بزرگ می‌شود و B از top-1 لیست A بیرون می‌رود
+        build = dict(metric="jaccard", top_k=1)
+        build_bought_together(full=True, **build)
+        self.assertEqual(self.neighbors("A"), "B")
+        self.buy("BE", 7, days_ago=3)
+
+        result = build_bought_together(**build)
+        self.assertFalse(result.full)
+        self.assertEqual(result.orders, 7)
+        incremental = self.lists()
+        self.assertEqual(incremental["A"], "C")
+        self.assertEqual(incremental["E"], "B")
+
+        build_bought_together(full=True, **build)
+        self.assertEqual(incremental, self.lists())
+
+    def test_unsettled_orders_wait_for_next_build(self):
+        build_bought_together(full=True)
+        self.buy("DE", 2, days_ago=0)
+        self.assertEqual(build_bought_together().orders, 0)
+        self.assertEqual(self.neighbors("E"), "")
+
+
+class OrderHistoryKeysetTests(TestCase):
+    """
+    مرز صفحه‌های keyset تاریخچه: سفارش‌های هم‌زمان (created_at یکسان) با id
+    از هم جدا می‌شوند و هیچ سفارشی تکرار یا جا نمی‌افتد.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create_user("k@example.com", "keyset", "x")
+        other = User.objects.create_user("o@example.com", "someone", "x")
+        variations = make_variations(count=1)
+        moment = timezone.now() - timedelta(days=3)
+        orders = [make_order(cls.user, variations, days_ago=d) for d in (1, 2)]
+        # سه سفارش با زمان دقیقاً یکسان روی مرز صفحه
+        for _ in range(3):
+            orders.append(make_order(cls.user, variations))
+            Order.objects.filter(pk=orders[-1].pk).update(created_at=moment)
+        orders.append(make_order(cls.user, variations, days_ago=4))
+        make_order(other, variations)
+        cls.expected = list(
+            Order.objects.filter(user=cls.user)
+            .order_by("-created_at", "-id")
+            .values_list("id", flat=True)
+        )
+
+    def walk(self, size):
+        pages, cursor = [], None
+        # cursor خراب ممکن است دور بزند؛ بیشتر از تعداد سفارش‌ها صفحه نداریم
+        for _ in range(len(self.expected) + 1):
+            orders, cursor = order_history_page(self.user, cursor, size=size)
+            pages.append([o.pk for o in orders])
+            if cursor is None:
+                return pages
+        self.fail("history cursor never reached the last page")
+
+    def test_pages_cover_every_order_once(self):
+        for size in (1, 2, 3, 4, 6, 10):
+            with self.subTest(size=size):
+                pages = self.walk(size)
+                self.assertEqual(sum(pages, []), self.expected)
+                self.assertTrue(all(len(p) == size for p in pages[:-1]))
+
+    def test_exact_multiple_has_no_empty_last_page(self):
+        pages = self.walk(3)
+        self.assertEqual([len(p) for p in pages], [3, 3])
+
+    def test_cursor_points_at_last_row(self):
+        orders, cursor = order_history_page(self.user, size=3)
+        created_at, pk = decode_cursor(cursor)
+        self.assertEqual((created_at, pk), (orders[-1].created_at, orders[-1].pk))
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(InvalidCursor):
+            order_history_page(self.user, "not-a-cursor")
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("orders:history"), {"cursor": "%%%"})
+        self.assertEqual(response.status_code, 400)
+
+
+class OrderStatsTests(TestCase):
+    """
+    آمار داشبورد کاربر: یک aggregate روی سفارش‌ها و یکی روی بایگانی، مقایسهٔ
+    دقیق وضعیت و «مجموع خرید» فقط از وضعیت‌های SPENT_STATUSES.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create_user("st@example.com", "stats", "x")
+        cls.other = User.objects.create_user("so@example.com", "stats2", "x")
+        variations = make_variations(count=1)
+        make_order(cls.user, variations, days_ago=5, total=100)
+        make_order(cls.user, variations, days_ago=4, status=Order.Status.SHIPPED)
+        make_order(cls.user, variations, days_ago=3, status=Order.Status.PENDING)
+        make_order(cls.user, variations, days_ago=2, status=Order.Status.CANCELED)
+        cls.last = make_order(cls.user, variations, days_ago=1, total=50)
+        make_order(cls.other, variations, total=1000)
+
+    def test_counts_and_spent(self):
+        with self.assertNumQueries(2):
+            stats = user_order_stats(self.user)
+        self.assertEqual(stats["all"], 5)
+        self.assertEqual(
+            {key: stats[key] for key in STATUS_KEYS},
+            {
+                "pending": 1,
+                "paid": 2,
+                "processing": 0,
+                "shipped": 1,
+                "delivered": 0,
+                "canceled": 1,
+            },
+        )
+        # pending و canceled در مجموع خرید نیستند؛ سفارش کاربر دیگر هم نه
+        self.assertEqual(stats["spent"], Decimal(250))
+        self.assertEqual(stats["last_order_at"], self.last.created_at)
+
+    def test_status_match_is_exact(self):
+        Order.objects.filter(pk=self.last.pk).update(status="PAID")
+        stats = user_order_stats(self.user)
+        self.assertEqual(stats["all"], 5)
+        self.assertEqual(stats["paid"], 1)
+        self.assertEqual(stats["spent"], Decimal(200))
+
+    def test_user_without_orders(self):
+        User = get_user_model()
+        user = User.objects.create_user("n@example.com", "nobody", "x")
+        stats = user_order_stats(user)
+        self.assertEqual(stats["all"], 0)
+        self.assertTrue(all(stats[key] == 0 for key in STATUS_KEYS))
+        self.assertEqual(stats["spent"], 0)
+        self.assertIsNone(stats["last_order_at"])
+
+
+def read_csv(chunks):
+    text = "".join(chunks)
+    return text, list(csv.DictReader(io.StringIO(text.lstrip("﻿"))))
+
+
+class OrderExportTests(TestCase):
+    """
+    خروجی حسابداری: CSV تکه‌تکه، فیلتر تاریخ/وضعیت، سفارش‌های بایگانی‌شده
+    و actionهای ادمین با فرم فیلتر.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create_user("e@example.com", "export", "x")
+        cls.admin = User.objects.create_superuser("admin@example.com", "admin", "x")
+        cls.variations = make_variations()
+        cls.archived = make_order(
+            cls.user, cls.variations[:2], days_ago=400, status=Order.Status.SHIPPED
+        )
+        archive_orders()
+        cls.paid = make_order(cls.user, cls.variations[:2], days_ago=3, total=200)
+        cls.pending = make_order(
+            None, cls.variations[:1], days_ago=1, status=Order.Status.PENDING
+        )
+        cls.empty = make_order(cls.user, [], days_ago=0)
+
+    def test_stream_csv_one_chunk_per_batch(self):
+        chunks = list(stream_csv(Order.objects.all(), batch_size=1))
+        self.assertEqual(len(chunks), 3)
+        self.assertTrue(chunks[0].startswith("﻿" + ",".join(EXPORT_FIELDS)))
+        _, rows = read_csv(chunks)
+        self.assertEqual(
+            [(r["order_id"], r["item_no"], r["sku"]) for r in rows],
+            [
+                (str(self.paid.pk), "1", "TS-0"),
+                (str(self.paid.pk), "2", "TS-1"),
+                (str(self.pending.pk), "1", "TS-0"),
+                (str(self.empty.pk), "", ""),
+            ],
+        )
+        self.assertEqual(rows[0]["user_email"], "e@example.com")
+        self.assertEqual(rows[2]["user_email"], "")
+
+    def test_batches_issue_constant_queries(self):
+        for _ in range(5):
+            make_order(self.user, self.variations, days_ago=2)
+        # هر دسته: سفارش‌ها (با user) + اقلام؛ و یک کوئری خالی در پایان
+        with self.assertNumQueries(2 * 3 + 1):
+            list(stream_csv(Order.objects.all(), batch_size=3))
+
+    def test_filters_by_date_and_status(self):
+        today = timezone.localdate()
+        qs = filter_orders(date_from=today - timedelta(days=2), statuses=["paid"])
+        self.assertEqual(list(qs), [self.empty])
+        qs = filter_orders(date_to=today - timedelta(days=1))
+        self.assertEqual({o.pk for o in qs}, {self.paid.pk, self.pending.pk})
+
+    def test_archived_orders_come_first(self):
+        _, rows = read_csv(
+            stream_csv(
+                filter_orders(statuses=["paid"]),
+                archived=filter_orders(ArchivedOrder.objects.all()),
+            )
+        )
+        self.assertEqual(
+            [(r["order_id"], r["item_no"]) for r in rows],
+            [
+                (str(self.archived.pk), "1"),
+                (str(self.archived.pk), "2"),
+                (str(self.paid.pk), "1"),
+                (str(self.paid.pk), "2"),
+                (str(self.empty.pk), ""),
+            ],
+        )
+        self.assertEqual(rows[0]["full_name"], self.archived.full_name)
+        self.assertEqual(rows[0]["user_email"], "e@example.com")
+
+    def test_command_includes_archive_unless_disabled(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        path = os.path.join(tmp, "orders.csv")
+        ids = lambda: {row["order_id"] for row in read_csv([open(path).read()])[1]}
+
+        call_command("export_orders", "--output", path, stderr=io.StringIO())
+        self.assertIn(str(self.archived.pk), ids())
+        call_command(
+            "export_orders",
+            "--output",
+            path,
+            "--no-archive",
+            "--status",
+            "pending",
+            stderr=io.StringIO(),
+        )
+        self.assertEqual(ids(), {str(self.pending.pk)})
+
+    @skipUnless(HAS_XLSXWRITER, "xlsxwriter نصب نیست")
+    def test_write_xlsx(self):
+        out = io.BytesIO()
+        rows = write_xlsx(
+            Order.objects.all(), out, archived=ArchivedOrder.objects.all()
+        )
+        self.assertEqual(rows, 6)
+        self.assertTrue(out.getvalue().startswith(b"PK"))
+
+    def export(self, action, **data):
+        self.client.force_login(self.admin)
+        pks = [self.paid.pk, self.pending.pk, self.empty.pk]
+        return self.client.post(
+            reverse("admin:orders_order_changelist"),
+            {"action": action, "_selected_action": pks, **data},
+        )
+
+    def test_admin_csv_action_applies_form_filters(self):
+        response = self.export(
+            "export_csv", status="shipped", include_archived="on", date_from=""
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("attachment;", response["Content-Disposition"])
+        _, rows = read_csv(b"".join(response.streaming_content).decode("utf-8"))
+        self.assertEqual(
+            [r["order_id"] for r in rows],
+            [str(self.archived.pk)] * 2,
+        )
+
+        response = self.export(
+            "export_csv", date_to=str(timezone.localdate() - timedelta(days=2))
+        )
+        _, rows = read_csv(b"".join(response.streaming_content).decode("utf-8"))
+        self.assertEqual({r["order_id"] for r in rows}, {str(self.paid.pk)})
+
+    def test_admin_action_rejects_bad_dates(self):
+        # فرم action نامعتبر => ادمین اصلاً action را اجرا نمی‌کند
+        response = self.export("export_csv", date_from="not-a-date")
+        self.assertRedirects(
+            response,
+            reverse("admin:orders_order_changelist"),
+            fetch_redirect_response=False,
+        )
+
+    def test_admin_xlsx_action_without_xlsxwriter(self):
+        with mock.patch("orders.admin.HAS_XLSXWRITER", False):
+            response = self.export("export_xlsx")
+        self.assertEqual(response.status_code, 302)
+        messages = [str(m) for m in get_messages(response.wsgi_request)]
+        self.assertEqual(messages, [XLSX_MISSING])
@@ -8,4 +8,6 @@ urlpatterns = [
     path("success/<int:order_id>/", views.order_success, name="success"),
     path("payment-failed/<int:order_id>/", views.payment_failed, name="payment_failed_with_id"),
     path("payment-failed/", views.payment_failed, name="payment_failed"),
+    path("history/", views.order_history, name="history"),
+    path("history/<int:order_id>/items/", views.order_history_items, name="history_items"),
 ]
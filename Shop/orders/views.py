@@ -1,16 +1,23 @@
 from decimal import Decimal
 from django.db import transaction, models
 from django.contrib.auth.decorators import login_required
-from django.shortcuts import render, redirect, get_object_or_404
+from django.shortcuts import render, redirect
 from django.contrib import messages
+from django.http import JsonResponse
+from django.template.loader import render_to_string
+from django.urls import reverse
 from django.utils.translation import gettext as _
+from django.views.decorators.http import require_GET
 
 from cart.cart import Cart
+from .archive import get_order_or_404
 from .forms import CheckoutForm
+from .history import InvalidCursor, order_history_page
 from .models import Order, OrderItem, Coupon
 from .utils import calc_shipping
 from accounts.forms import AddressForm
 from accounts.models import Address
+from products.models import ProductVariation
 
 
 @login_required
@@ -135,7 +142,7 @@ def checkout(request):
                     line_total=row["total"],
                 )
                 v.stock -= qty
-                v.save(update_fields=["stock"])
+                v.save(update_fields=["stock", "updated_at"])
 
             # افزایش دفعات استفاده از کوپن
             if coupon_obj and applied_code:
@@ -172,11 +179,11 @@ def order_success(request, order_id: int):
     نمایش صفحه موفقیت ثبت/پرداخت سفارش.
     - کاربر عادی فقط سفارش خودش را می‌بیند.
     - کارکنان (staff) می‌توانند هر سفارشی را ببینند.
+    - سفارش بایگانی‌شده هم (فقط خواندنی) نمایش داده می‌شود.
     """
-    if request.user.is_staff:
-        order = get_object_or_404(Order, id=order_id)
-    else:
-        order = get_object_or_404(Order, id=order_id, user=request.user)
+    order = get_order_or_404(
+        order_id, user=None if request.user.is_staff else request.user
+    )
 
     return render(request, "orders/success.html", {"order": order})
 
@@ -189,10 +196,68 @@ def payment_failed(request, order_id: int | None = None):
     """
     order = None
     if order_id is not None:
-        if request.user.is_staff:
-            order = get_object_or_404(Order, id=order_id)
-        else:
-            order = get_object_or_404(Order, id=order_id, user=request.user)
+        order = get_order_or_404(
+            order_id, user=None if request.user.is_staff else request.user
+        )
 
     messages.error(request, _("پرداخت ناموفق بود یا توسط کاربر لغو شد."))
     return render(request, "orders/payment_failed.html", {"order": order})
+
+
+@login_required
+@require_GET
+def order_history(request):
+    """
+    صفحهٔ بعدی تاریخچهٔ سفارش‌ها (دکمهٔ «نمایش بیشتر» پروفایل).
+    ?cursor=<next قبلی>؛ خروجی {"html", "next"} یا با ?format=json فهرست سفارش‌ها.
+    """
+    try:
+        orders, next_cursor = order_history_page(
+            request.user, request.GET.get("cursor") or None
+        )
+    except InvalidCursor:
+        return JsonResponse({"error": "invalid cursor"}, status=400)
+
+    if request.GET.get("format") == "json":
+        results = [
+            {
+                "id": o.id,
+                "status": o.status,
+                "status_display": o.get_status_display(),
+                "total": str(o.total),
+                "created_at": o.created_at.isoformat(),
+                "step": o.step,
+                "items_url": reverse("orders:history_items", args=[o.id]),
+            }
+            for o in orders
+        ]
+        return JsonResponse({"results": results, "next": next_cursor})
+
+    html = render_to_string(
+        "orders/_history_rows.html", {"orders": orders}, request=request
+    )
+    return JsonResponse({"html": html, "next": next_cursor})
+
+
+@login_required
+@require_GET
+def order_history_items(request, order_id: int):
+    """اقلام یک سفارش (HTML) هنگام باز کردن ردیف در تاریخچه."""
+    order = get_order_or_404(order_id, user=request.user)
+    if getattr(order, "is_archived", False):
+        # اقلام بایگانی از payload؛ variationها (اگر هنوز هستند) یک‌جا خوانده می‌شوند
+        items = order.archived_items
+        variations = ProductVariation.objects.select_related("product").in_bulk(
+            {it.variation_id for it in items}
+        )
+        for it in items:
+            it.variation = variations.get(it.variation_id)
+    else:
+        items = (
+            OrderItem.objects.filter(order=order)
+            .select_related("variation__product")
+            .order_by("id")
+        )
+    return render(
+        request, "orders/_history_items.html", {"order": order, "items": items}
+    )
@@ -1,4 +1,6 @@
 from django.contrib import admin
+from django.db.models import Count, Prefetch
+from django.utils import timezone
 from django.utils.html import format_html, format_html_join
 from django.utils.translation import gettext_lazy as _
 from .models import (
@@ -9,7 +11,10 @@ from .models import (
     Product,
     ProductImage,
     ProductVariation,
+    ImageJob,
 )
+from Shop.admin_tools import EstimatedCountPaginator, ScalableAdminMixin
+from .imaging import claimable
 
 
 @admin.register(Color)
@@ -39,6 +44,20 @@ class ProductVariationInline(admin.TabularInline):
     autocomplete_fields = ("color", "size")
     show_change_link = True
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("product", "color", "size")
+
+
+@admin.register(ProductVariation)
+class ProductVariationAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ("sku", "product", "color", "size", "stock", "is_active")
+    list_filter = ("is_active",)
+    list_select_related = ("product", "color", "size")
+    search_fields = ("id", "sku__startswith", "barcode")
+    search_help_text = _("شناسه، ابتدای SKU یا بارکد دقیق")
+    raw_id_fields = ("product",)
+    autocomplete_fields = ("color", "size")
+
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
@@ -52,7 +71,11 @@ class ProductAdmin(admin.ModelAdmin):
         "variation_count",
     )
     list_filter = ("is_active", "brand", "category")
+    list_select_related = ("brand", "category")
     search_fields = ("name", "brand__name", "category__name")
+    autocomplete_fields = ("brand", "category")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     inlines = [ProductImageInline, ProductVariationInline]
     readonly_fields = ("variation_matrix_html",)
     fieldsets = (
@@ -64,18 +87,39 @@ class ProductAdmin(admin.ModelAdmin):
         (_("خلاصه تنوع‌ها"), {"fields": ("variation_matrix_html",)}),
     )
 
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        match = request.resolver_match
+        if not (match and match.url_name.endswith("_changelist")):
+            return qs
+        # ستون‌های لیست: شمارش با annotate و رنگ‌ها با یک prefetch برای کل صفحه
+        active_colors = (
+            ProductVariation.objects.filter(is_active=True, color__isnull=False)
+            .select_related("color")
+            .only("product_id", "color__name")
+            .order_by("color__name")
+        )
+        return qs.annotate(num_variations=Count("variations")).prefetch_related(
+            Prefetch("variations", queryset=active_colors, to_attr="active_colors")
+        )
+
     @admin.display(description=_("رنگ‌های موجود"))
     def available_colors(self, obj: Product):
-        qs = (
-            obj.variations.filter(is_active=True, color__isnull=False)
-            .values_list("color__name", flat=True)
-            .distinct()
-        )
-        return ", ".join(qs) or "—"
+        variations = getattr(obj, "active_colors", None)
+        if variations is None:
+            names = (
+                obj.variations.filter(is_active=True, color__isnull=False)
+                .values_list("color__name", flat=True)
+                .distinct()
+            )
+        else:
+            names = dict.fromkeys(v.color.name for v in variations)
+        return ", ".join(names) or "—"
 
-    @admin.display(description=_("تعداد واریانت‌ها"))
+    @admin.display(description=_("تعداد واریانت‌ها"), ordering="num_variations")
     def variation_count(self, obj: Product):
-        return obj.variations.count()
+        count = getattr(obj, "num_variations", None)
+        return obj.variations.count() if count is None else count
 
     @admin.display(description=_("ماتریس رنگ × سایز"), ordering=None)
     def variation_matrix_html(self, obj: Product):
@@ -132,6 +176,7 @@ class ProductAdmin(admin.ModelAdmin):
 @admin.register(Brand)
 class BrandAdmin(admin.ModelAdmin):
     list_display = ("name", "slug")
+    search_fields = ("name",)
     prepopulated_fields = {"slug": ("name",)}
 
 
@@ -139,5 +184,45 @@ class BrandAdmin(admin.ModelAdmin):
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ("name", "slug", "parent", "is_active")
     list_filter = ("is_active", "parent")
+    list_select_related = ("parent",)
     search_fields = ("name",)
     prepopulated_fields = {"slug": ("name",)}
+
+
+@admin.register(ImageJob)
+class ImageJobAdmin(admin.ModelAdmin):
+    list_display = (
+        "source",
+        "content_type",
+        "object_id",
+        "status",
+        "progress",
+        "attempts",
+        "updated_at",
+    )
+    list_filter = ("status", "content_type")
+    search_fields = ("source",)
+    readonly_fields = (
+        "derivatives",
+        "error",
+        "started_at",
+        "created_at",
+        "updated_at",
+    )
+    actions = ["retry_jobs"]
+
+    @admin.action(description=_("تلاش دوباره"))
+    def retry_jobs(self, request, queryset):
+        # کار RUNNING فقط وقتی lease آن تمام شده (ورکرش مرده) دوباره صف می‌شود
+        live = list(
+            queryset.filter(status=ImageJob.Status.RUNNING)
+            .exclude(claimable())
+            .values_list("pk", flat=True)
+        )
+        n = queryset.exclude(pk__in=live).update(
+            status=ImageJob.Status.PENDING,
+            attempts=0,
+            error="",
+            run_after=timezone.now(),
+        )
+        self.message_user(request, _("%(n)s کار دوباره در صف قرار گرفت.") % {"n": n})
@@ -0,0 +1,516 @@
+"""
+ورود انبوه کاتالوگ (CSV / JSONL) — استفاده در manage.py import_catalog.
+
+هر ردیف = یک واریانت؛ ردیف‌هایی که نام/برند (یا product_slug) یکسان دارند
+زیر یک محصول قرار می‌گیرند. ستون‌ها:
+  product_name, product_slug, brand, category (مسیر با " > " مثل "مردانه > تیشرت"),
+  price, discount_price, description, product_is_active,
+  sku, barcode, color, color_code, color_hex, size, size_code, size_order,
+  stock, price_override, is_active
+
+- مقادیر سطح محصول را آخرین ردیف آن محصول در هر تکه تعیین می‌کند؛ جز فعال بودن:
+  is_active مال واریانت است و محصول را product_is_active (آخرین مقدار غیرخالی)
+  تعیین می‌کند. بدون آن ستون، محصول فعال است مگر همهٔ ردیف‌هایش در تکه غیرفعال
+  باشند (فایل‌های قدیمی که کل محصول را با is_active=0 خاموش می‌کردند).
+
+- برند/دسته/رنگ/سایز یک‌بار در حافظه نگاشت می‌شوند (بدون کوئری به‌ازای ردیف).
+- اسلاگ و SKU به‌صورت دسته‌ای تخصیص داده می‌شوند.
+- نوشتن با bulk_create / bulk_update در تراکنش‌های تکه‌ای.
+- updated_at ردیف‌های تغییرکرده جلو می‌رود و بعد از commit هر تکه یک سیگنال
+  catalog_changed ارسال می‌شود (کش صفحه، ETag و purge کلیدهای CDN).
+"""
+
+import csv
+import io
+import json
+import sys
+import time
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from Shop.surrogate import CATALOG_KEY, brand_key, category_key
+
+from .models import (
+    Brand,
+    Category,
+    Color,
+    Product,
+    ProductVariation,
+    Size,
+)
+from .signals import catalog_changed
+from .slugs import SlugAllocator
+
+CATEGORY_SEP = " > "
+PRODUCT_UPDATE_FIELDS = [
+    "category",
+    "brand",
+    "price",
+    "discount_price",
+    "description",
+    "is_active",
+]
+VARIATION_UPDATE_FIELDS = [
+    "product",
+    "color",
+    "size",
+    "barcode",
+    "price_override",
+    "stock",
+    "is_active",
+]
+
+
+def iter_rows(path: str, fmt: str | None = None):
+    """
+    ردیف‌ها را جریانی (بدون بارگذاری کل فایل) برمی‌گرداند. path="-" یعنی stdin.
+    """
+    if fmt is None:
+        fmt = "jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv"
+
+    fh = (
+        io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8-sig")
+        if path == "-"
+        else open(path, encoding="utf-8-sig", newline="")
+    )
+    try:
+        if fmt == "jsonl":
+            for line in fh:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(fh)
+    finally:
+        if path != "-":
+            fh.close()
+
+
+def _str(row, key) -> str:
+    return str(row.get(key) or "").strip()
+
+
+def _decimal(row, key):
+    raw = _str(row, key).replace(",", "")
+    if not raw:
+        return None
+    try:
+        return Decimal(raw)
+    except InvalidOperation:
+        raise ValueError(f"مقدار نامعتبر برای {key}: {raw!r}")
+
+
+def _int(row, key, default=0) -> int:
+    raw = _str(row, key)
+    return int(raw) if raw else default
+
+
+def _bool(row, key, default=True) -> bool:
+    raw = _str(row, key).lower()
+    if not raw:
+        return default
+    return raw in {"1", "true", "yes", "y", "بله", "فعال"}
+
+
+def _only_changed(model, objs, fields):
+    """
+    فقط ردیف‌هایی که واقعاً تغییر کرده‌اند (ورود دوبارهٔ همان فایل تقریباً رایگان است).
+    """
+    if not objs:
+        return objs
+    attnames = [model._meta.get_field(f).attname for f in fields]
+    current = {
+        row[0]: row[1:]
+        for row in model._default_manager.filter(
+            pk__in=[o.pk for o in objs]
+        ).values_list("pk", *attnames)
+    }
+    return [
+        o for o in objs if current.get(o.pk) != tuple(getattr(o, a) for a in attnames)
+    ]
+
+
+def _product_active(rows) -> bool:
+    """فعال بودن محصول از ردیف‌های (parsed) خودش در تکه؛ قاعده در docstring ماژول."""
+    for p in reversed(rows):
+        if _str(p["row"], "product_is_active"):
+            return _bool(p["row"], "product_is_active")
+    return any(_bool(p["row"], "is_active") for p in rows)
+
+
+def _update_rows(model, objs, fields):
+    """
+    معادل bulk_update با executemany (UPDATE ... WHERE id=%s).
+    bulk_update برای هزاران ردیف بیشتر وقت را در ساخت عبارت‌های CASE در پایتون
+    می‌گذراند؛ اینجا هر ردیف یک پارامترست ساده است.
+    """
+    connection = connections[router.db_for_write(model)]
+    meta = model._meta
+    concrete = [meta.get_field(f) for f in fields]
+    qn = connection.ops.quote_name
+    sql = "UPDATE {} SET {} WHERE {} = %s".format(
+        qn(meta.db_table),
+        ", ".join(f"{qn(f.column)} = %s" for f in concrete),
+        qn(meta.pk.column),
+    )
+    params = [
+        [f.get_db_prep_save(getattr(o, f.attname), connection) for f in concrete]
+        + [o.pk]
+        for o in objs
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+@dataclass
+class ImportStats:
+    rows: int = 0
+    products_created: int = 0
+    products_updated: int = 0
+    variations_created: int = 0
+    variations_updated: int = 0
+    errors: list = field(default_factory=list)
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        return max(time.monotonic() - self.started, 1e-6)
+
+    @property
+    def rate(self) -> float:
+        return self.rows / self.elapsed
+
+
+class CatalogImporter:
+    def __init__(self, batch_size: int = 1000, dry_run: bool = False, log=None):
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.log = log or (lambda msg: None)
+        self.stats = ImportStats()
+        # همان دیتابیسی که _update_rows و bulk_* رویش می‌نویسند
+        self.using = router.db_for_write(Product)
+
+        self._load_maps()
+
+    def _load_maps(self):
+        """
+        نگاشت‌های درون‌حافظه‌ای (یک کوئری برای هر جدول کوچک).
+        بعد از rollback دوباره صدا زده می‌شود چون idهای ساخته‌شده دیگر معتبر نیستند.
+        """
+        self.brands = {
+            name.casefold(): pk for name, pk in Brand.objects.values_list("name", "id")
+        }
+        self.categories = {
+            (parent_id, name.casefold()): pk
+            for pk, name, parent_id in Category.objects.values_list(
+                "id", "name", "parent_id"
+            )
+        }
+        self.colors = {}
+        for pk, name, code in Color.objects.values_list("id", "name", "code"):
+            self.colors[name.casefold()] = pk
+            if code:
+                self.colors[code.casefold()] = pk
+        self.sizes = {}
+        for pk, name, code in Size.objects.values_list("id", "name", "code"):
+            self.sizes[name.casefold()] = pk
+            if code:
+                self.sizes[code.casefold()] = pk
+
+        # محصول‌هایی که در همین اجرا دیده/ساخته شده‌اند: key => id
+        self.products: dict = {}
+        self.brand_slugs = SlugAllocator(Brand)
+        self.category_slugs = SlugAllocator(Category)
+        self.product_slugs = SlugAllocator(Product)
+
+    # ---------- نگاشت مراجع ----------
+    def _brand_id(self, name: str) -> int:
+        key = name.casefold()
+        if key not in self.brands:
+            obj = Brand(name=name, slug=self.brand_slugs.allocate(name))
+            Brand.objects.bulk_create([obj])
+            self.brands[key] = obj.pk
+            self._keys.add(CATALOG_KEY)
+        return self.brands[key]
+
+    def _category_id(self, path: str) -> int:
+        parent_id = None
+        for part in (p.strip() for p in path.split(CATEGORY_SEP)):
+            if not part:
+                continue
+            key = (parent_id, part.casefold())
+            if key not in self.categories:
+                obj = Category(
+                    name=part,
+                    parent_id=parent_id,
+                    slug=self.category_slugs.allocate(part),
+                )
+                Category.objects.bulk_create([obj])
+                self.categories[key] = obj.pk
+                self._keys.add(CATALOG_KEY)
+            parent_id = self.categories[key]
+        if parent_id is None:
+            raise ValueError("دسته خالی است")
+        return parent_id
+
+    def _color_id(self, row):
+        name, code = _str(row, "color"), _str(row, "color_code")
+        if not name and not code:
+            return None
+        for k in (code, name):
+            if k and k.casefold() in self.colors:
+                return self.colors[k.casefold()]
+        obj = Color.objects.create(
+            name=name or code, code=code or None, hex_code=_str(row, "color_hex")
+        )
+        for k in (code, name):
+            if k:
+                self.colors[k.casefold()] = obj.pk
+        return obj.pk
+
+    def _size_id(self, row):
+        name, code = _str(row, "size"), _str(row, "size_code")
+        if not name and not code:
+            return None
+        for k in (code, name):
+            if k and k.casefold() in self.sizes:
+                return self.sizes[k.casefold()]
+        obj = Size.objects.create(
+            name=name or code, code=code or None, sort_order=_int(row, "size_order")
+        )
+        for k in (code, name):
+            if k:
+                self.sizes[k.casefold()] = obj.pk
+        return obj.pk
+
+    # ---------- اجرای اصلی ----------
+    def run(self, rows):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+        if batch:
+            self._flush(batch)
+        return self.stats
+
+    def _flush(self, rows):
+        try:
+            with transaction.atomic(using=self.using):
+                changed, keys = self._write_batch(rows)
+                if self.dry_run:
+                    transaction.set_rollback(True, using=self.using)
+                elif changed or keys:
+                    transaction.on_commit(
+                        lambda: catalog_changed.send(
+                            sender=Product,
+                            product_ids=sorted(changed),
+                            keys=sorted(keys),
+                            reason="import",
+                        ),
+                        using=self.using,
+                    )
+            if self.dry_run:
+                self._load_maps()
+        except Exception as exc:
+            first = self.stats.rows + 1
+            self.stats.errors.append(f"ردیف‌های {first}-{first + len(rows) - 1}: {exc}")
+            self._load_maps()
+        self.stats.rows += len(rows)
+        self.log(f"{self.stats.rows} ردیف — {self.stats.rate:,.0f} ردیف/ثانیه")
+
+    def _product_key(self, row, brand_id):
+        slug = _str(row, "product_slug")
+        return ("slug", slug) if slug else ("name", brand_id, _str(row, "product_name"))
+
+    def _write_batch(self, rows):
+        """
+        (id محصولات تغییرکرده، کلیدهای surrogate صفحه‌های برند/دستهٔ آن‌ها).
+        """
+        self._now = timezone.now()
+        self._changed, self._keys = set(), set()
+        parsed = []
+        for row in rows:
+            name = _str(row, "product_name") or _str(row, "name")
+            if not name:
+                raise ValueError("product_name خالی است")
+            row["product_name"] = name
+            brand_id = self._brand_id(_str(row, "brand") or "—")
+            parsed.append(
+                {
+                    "row": row,
+                    "key": self._product_key(row, brand_id),
+                    "brand_id": brand_id,
+                    "category_id": self._category_id(_str(row, "category")),
+                    "color_id": self._color_id(row),
+                    "size_id": self._size_id(row),
+                }
+            )
+
+        product_ids = self._upsert_products(parsed)
+        self._upsert_variations(parsed, product_ids)
+
+        # محصولاتی که فقط واریانتشان عوض شده هم updated_at تازه می‌گیرند (مثل stock)
+        if self._changed:
+            Product.objects.filter(id__in=self._changed).update(updated_at=self._now)
+        for p in parsed:
+            if product_ids[p["key"]] in self._changed:
+                self._keys.add(brand_key(p["brand_id"]))
+                self._keys.add(category_key(p["category_id"]))
+        return self._changed, self._keys
+
+    def _upsert_products(self, parsed) -> dict:
+        # آخرین ردیف هر محصول مقادیر سطح محصول را تعیین می‌کند (جز is_active)
+        grouped = {}
+        for p in parsed:
+            grouped.setdefault(p["key"], []).append(p)
+        latest = {key: rows[-1] for key, rows in grouped.items()}
+
+        unknown = [k for k in latest if k not in self.products]
+        slugs = [k[1] for k in unknown if k[0] == "slug"]
+        names = [k[2] for k in unknown if k[0] == "name"]
+        if slugs:
+            for pk, slug in Product.objects.filter(slug__in=slugs).values_list(
+                "id", "slug"
+            ):
+                self.products[("slug", slug)] = pk
+        if names:
+            for pk, brand_id, name in Product.objects.filter(
+                name__in=names
+            ).values_list("id", "brand_id", "name"):
+                self.products.setdefault(("name", brand_id, name), pk)
+
+        to_create, to_update = [], []
+        for key, p in latest.items():
+            row = p["row"]
+            obj = Product(
+                pk=self.products.get(key),
+                name=row["product_name"],
+                brand_id=p["brand_id"],
+                category_id=p["category_id"],
+                price=_decimal(row, "price") or Decimal("0"),
+                discount_price=_decimal(row, "discount_price"),
+                description=_str(row, "description"),
+                is_active=_product_active(grouped[key]),
+            )
+            if obj.pk:
+                to_update.append(obj)
+            else:
+                obj.slug = (
+                    key[1]
+                    if key[0] == "slug"
+                    else self.product_slugs.allocate(obj.name)
+                )
+                to_create.append((key, obj))
+
+        if to_create:
+            Product.objects.bulk_create([o for _, o in to_create])
+            for key, obj in to_create:
+                self.products[key] = obj.pk
+                self._changed.add(obj.pk)
+            self.stats.products_created += len(to_create)
+            # محصول جدید در صفحهٔ اصلی و لیست کلی هم دیده می‌شود
+            self._keys.add(CATALOG_KEY)
+        to_update = _only_changed(Product, to_update, PRODUCT_UPDATE_FIELDS)
+        if to_update:
+            # bulk_update مثل save فیلد auto_now را پر نمی‌کند
+            for obj in to_update:
+                obj.updated_at = self._now
+                self._changed.add(obj.pk)
+            Product.objects.bulk_update(
+                to_update, [*PRODUCT_UPDATE_FIELDS, "updated_at"], batch_size=100
+            )
+            self.stats.products_updated += len(to_update)
+
+        return {key: self.products[key] for key in latest}
+
+    def _upsert_variations(self, parsed, product_ids):
+        rows_by_sku = {}
+        pending_generated = []
+        for p in parsed:
+            row = p["row"]
+            product_id = product_ids[p["key"]]
+            obj = ProductVariation(
+                product_id=product_id,
+                color_id=p["color_id"],
+                size_id=p["size_id"],
+                sku=_str(row, "sku"),
+                barcode=_str(row, "barcode"),
+                price_override=_decimal(row, "price_override"),
+                stock=_int(row, "stock"),
+                is_active=_bool(row, "is_active"),
+            )
+            if obj.sku:
+                rows_by_sku[obj.sku] = obj
+            else:
+                pending_generated.append(obj)
+
+        if pending_generated:
+            self._allocate_skus(pending_generated, rows_by_sku)
+
+        existing = dict(
+            ProductVariation.objects.filter(sku__in=list(rows_by_sku)).values_list(
+                "sku", "id"
+            )
+        )
+        to_create, to_update = [], []
+        for sku, obj in rows_by_sku.items():
+            if sku in existing:
+                obj.pk = existing[sku]
+                to_update.append(obj)
+            else:
+                to_create.append(obj)
+
+        if to_create:
+            ProductVariation.objects.bulk_create(to_create, batch_size=500)
+            self._changed.update(o.product_id for o in to_create)
+            self.stats.variations_created += len(to_create)
+        to_update = _only_changed(ProductVariation, to_update, VARIATION_UPDATE_FIELDS)
+        if to_update:
+            for obj in to_update:
+                obj.updated_at = self._now
+                self._changed.add(obj.product_id)
+            _update_rows(
+                ProductVariation, to_update, [*VARIATION_UPDATE_FIELDS, "updated_at"]
+            )
+            self.stats.variations_updated += len(to_update)
+
+    def _allocate_skus(self, variations, rows_by_sku):
+        """
+        SKU خودکار: P<product>-<color>-<size>؛ تداخل‌ها با یک کوئری بررسی می‌شوند.
+        اگر ترکیب (محصول، رنگ، سایز) از قبل واریانت دارد، همان SKU به‌روزرسانی می‌شود.
+        """
+        combos = {(v.product_id, v.color_id, v.size_id) for v in variations}
+        known = {}
+        for pid, cid, sid, sku in ProductVariation.objects.filter(
+            product_id__in={c[0] for c in combos}
+        ).values_list("product_id", "color_id", "size_id", "sku"):
+            known[(pid, cid, sid)] = sku
+
+        candidates = {}
+        for v in variations:
+            combo = (v.product_id, v.color_id, v.size_id)
+            if combo in known:
+                v.sku = known[combo]
+            else:
+                v.sku = f"P{v.product_id}-{v.color_id or 0}-{v.size_id or 0}"[:40]
+                candidates[v.sku] = v
+
+        taken = set(
+            ProductVariation.objects.filter(sku__in=list(candidates)).values_list(
+                "sku", flat=True
+            )
+        )
+        for sku, v in candidates.items():
+            i = 2
+            while v.sku in taken or v.sku in rows_by_sku:
+                v.sku = f"{sku}-{i}"[:40]
+                i += 1
+            taken.add(v.sku)
+
+        for v in variations:
+            rows_by_sku[v.sku] = v
@@ -0,0 +1,465 @@
+"""
+فید محصولات برای مارکت‌پلیس‌ها و سایت‌های مقایسهٔ قیمت (CSV یا XML).
+
+- محصولات با keyset روی pk دسته‌دسته خوانده می‌شوند و واریانت‌های هر دسته
+  با iterator(chunk_size) می‌آیند؛ کل کاتالوگ هیچ‌وقت در حافظه نیست.
+- خروجی تکه‌تکه تولید می‌شود: یا مستقیم در StreamingHttpResponse
+  یا در فایل gzip که اتمیک (tmp + os.replace) جایگزین می‌شود.
+- حالت افزایشی: متن سریال‌شدهٔ هر محصول در یک فایل state کنار فید نگه داشته
+  می‌شود و فقط محصولاتی که updated_at خودشان یا یکی از واریانت‌هایشان (موجودی،
+  قیمت اختصاصی) بعد از ساخت قبلی است دوباره ساخته می‌شوند. Brand/Category
+  updated_at ندارند؛ نام‌هایشان در state ذخیره می‌شود و محصولات برند/دستهٔ
+  تغییرنام‌یافته هم دوباره ساخته می‌شوند.
+- ادغام افزایشی سه جریان مرتب بر اساس id است (محصولات فعال، state قبلی،
+  محصولات تغییرکرده)؛ حافظه به اندازهٔ یک دسته است، نه تعداد تغییرات.
+- فایل‌ها در PRODUCT_FEED_ROOT (بیرون از MEDIA_ROOT) ساخته می‌شوند؛ فقط خود
+  فید از products:feed سرو می‌شود، نه state و فایل‌های موقت.
+"""
+
+import csv
+import gzip
+import io
+import json
+import os
+from dataclasses import dataclass
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Brand, Category, Product, ProductVariation
+
+FEED_FORMATS = ("csv", "xml")
+FEED_FIELDS = (
+    "id",
+    "item_group_id",
+    "title",
+    "description",
+    "link",
+    "image_link",
+    "brand",
+    "product_type",
+    "price",
+    "sale_price",
+    "currency",
+    "availability",
+    "quantity",
+    "gtin",
+    "color",
+    "size",
+)
+DEFAULT_BATCH_SIZE = 500
+STATE_SUFFIX = ".state.jsonl.gz"
+
+
+def feed_root() -> str:
+    return str(
+        getattr(settings, "PRODUCT_FEED_ROOT", None)
+        or settings.BASE_DIR / "var" / "feeds"
+    )
+
+
+def feed_path(fmt: str) -> str:
+    """مسیر پیش‌فرض فایل gzip ساخته‌شدهٔ هر قالب."""
+    return os.path.join(feed_root(), f"products.{fmt}.gz")
+
+
+def _taxonomy() -> dict:
+    # نام‌هایی که در متن فید هستند؛ جدول‌های کوچک، کامل خوانده می‌شوند
+    return {
+        "brands": {
+            str(pk): name for pk, name in Brand.objects.values_list("id", "name")
+        },
+        "categories": {
+            str(pk): name for pk, name in Category.objects.values_list("id", "name")
+        },
+    }
+
+
+def _renamed(previous: dict, current: dict) -> list:
+    return [int(pk) for pk, name in current.items() if previous.get(pk) != name]
+
+
+def keyset_batches(qs, batch_size: int = DEFAULT_BATCH_SIZE):
+    """
+    دسته‌های متوالی qs به ترتیب pk؛ بدون OFFSET تا صفحه‌های آخر هم ارزان باشند.
+    """
+    last_pk = 0
+    while True:
+        batch = list(qs.filter(pk__gt=last_pk).order_by("pk")[:batch_size])
+        if not batch:
+            return
+        last_pk = batch[-1].pk
+        yield batch
+
+
+def _feed_queryset():
+    return (
+        Product.objects.filter(is_active=True)
+        .select_related("brand", "category")
+        .only(
+            "id",
+            "name",
+            "slug",
+            "description",
+            "price",
+            "discount_price",
+            "image",
+            "updated_at",
+            "brand__name",
+            "category__name",
+        )
+    )
+
+
+def _variations_by_product(product_ids):
+    grouped = {}
+    rows = (
+        ProductVariation.objects.filter(product_id__in=product_ids, is_active=True)
+        .select_related("color", "size")
+        .only(
+            "id",
+            "product_id",
+            "sku",
+            "barcode",
+            "price_override",
+            "stock",
+            "image",
+            "color__name",
+            "size__name",
+        )
+        .order_by("product_id", "id")
+        .iterator(chunk_size=2000)
+    )
+    for v in rows:
+        grouped.setdefault(v.product_id, []).append(v)
+    return grouped
+
+
+def _absolute(base_url: str, path: str) -> str:
+    if not path:
+        return ""
+    if path.startswith(("http://", "https://")):
+        return path
+    return base_url.rstrip("/") + path
+
+
+def product_rows(product, variations, base_url: str):
+    """
+    ردیف‌های فید یک محصول: به‌ازای هر واریانت یکی (item_group_id = محصول)،
+    یا یک ردیف برای محصول بدون واریانت.
+    """
+    currency = getattr(settings, "PRODUCT_FEED_CURRENCY", "IRT")
+    link = _absolute(base_url, product.get_absolute_url())
+    main_image = _absolute(base_url, product.image.url) if product.image else ""
+    common = {
+        "item_group_id": product.pk,
+        "title": product.name,
+        "description": product.description,
+        "link": link,
+        "brand": product.brand.name,
+        "product_type": product.category.name,
+        "currency": currency,
+    }
+
+    if not variations:
+        return [
+            {
+                **common,
+                "id": f"P{product.pk}",
+                "image_link": main_image,
+                "price": product.price,
+                "sale_price": product.discount_price or "",
+                # بدون واریانت، موجودی معنایی ندارد
+                "availability": "out_of_stock",
+                "quantity": 0,
+                "gtin": "",
+                "color": "",
+                "size": "",
+            }
+        ]
+
+    rows = []
+    for v in variations:
+        price = v.price_override or product.price
+        sale = "" if v.price_override else (product.discount_price or "")
+        rows.append(
+            {
+                **common,
+                "id": v.sku,
+                "link": f"{link}?vid={v.pk}",
+                "image_link": (
+                    _absolute(base_url, v.image.url) if v.image else main_image
+                ),
+                "price": price,
+                "sale_price": sale,
+                "availability": "in_stock" if v.stock > 0 else "out_of_stock",
+                "quantity": v.stock,
+                "gtin": v.barcode,
+                "color": v.color.name if v.color else "",
+                "size": v.size.name if v.size else "",
+            }
+        )
+    return rows
+
+
+class CsvFeed:
+    content_type = "text/csv; charset=utf-8"
+    extension = "csv"
+
+    def header(self) -> str:
+        return self._line(FEED_FIELDS)
+
+    def footer(self) -> str:
+        return ""
+
+    def render(self, rows) -> str:
+        buf = io.StringIO()
+        writer = csv.DictWriter(buf, fieldnames=FEED_FIELDS, lineterminator="\n")
+        writer.writerows(rows)
+        return buf.getvalue()
+
+    def _line(self, values) -> str:
+        buf = io.StringIO()
+        csv.writer(buf, lineterminator="\n").writerow(values)
+        return buf.getvalue()
+
+
+class XmlFeed:
+    """RSS 2.0 با فضای نام g: (قالب رایج Google Merchant)."""
+
+    content_type = "application/xml; charset=utf-8"
+    extension = "xml"
+
+    def header(self) -> str:
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<rss version="2.0" xmlns:g="http://base.google.com/ns/1.0">\n'
+            "<channel>\n"
+        )
+
+    def footer(self) -> str:
+        return "</channel>\n</rss>\n"
+
+    def render(self, rows) -> str:
+        parts = []
+        for row in rows:
+            parts.append("<item>")
+            for key in FEED_FIELDS:
+                value = row.get(key, "")
+                if value == "" or value is None:
+                    continue
+                parts.append(f"<g:{key}>{escape(str(value))}</g:{key}>")
+            parts.append("</item>\n")
+        return "".join(parts)
+
+
+def get_serializer(fmt: str):
+    if fmt == "csv":
+        return CsvFeed()
+    if fmt == "xml":
+        return XmlFeed()
+    raise ValueError(f"unknown feed format: {fmt}")
+
+
+def iter_product_chunks(
+    serializer, base_url: str, batch_size: int = DEFAULT_BATCH_SIZE, qs=None
+):
+    """
+    (product_id, updated_at, متن سریال‌شده) برای هر محصول فعال، به ترتیب id.
+    """
+    qs = _feed_queryset() if qs is None else qs
+    for batch in keyset_batches(qs, batch_size):
+        variations = _variations_by_product([p.pk for p in batch])
+        for product in batch:
+            rows = product_rows(product, variations.get(product.pk, []), base_url)
+            yield product.pk, product.updated_at, serializer.render(rows)
+
+
+def stream_feed(fmt: str, base_url: str, batch_size: int = DEFAULT_BATCH_SIZE):
+    """
+    ژنراتور رشته‌ها برای StreamingHttpResponse؛ هر دسته یک تکهٔ خروجی است.
+    """
+    serializer = get_serializer(fmt)
+    yield serializer.header()
+    buffer = []
+    for i, (_pk, _updated, text) in enumerate(
+        iter_product_chunks(serializer, base_url, batch_size), 1
+    ):
+        buffer.append(text)
+        if i % batch_size == 0:
+            yield "".join(buffer)
+            buffer = []
+    if buffer:
+        yield "".join(buffer)
+    yield serializer.footer()
+
+
+@dataclass
+class FeedBuildResult:
+    path: str
+    products: int = 0
+    rendered: int = 0
+    reused: int = 0
+    incremental: bool = False
+
+
+def _read_state(state_path: str, fmt: str, base_url: str):
+    """
+    state قبلی: خط اول متادیتا، بقیه {"id", "text"} به ترتیب id.
+    (متادیتا، فایل باز)؛ اگر نباشد یا با تنظیمات فعلی نخواند، (None, None) => ساخت کامل.
+    """
+    if not os.path.exists(state_path):
+        return None, None
+    fh = gzip.open(state_path, "rt", encoding="utf-8")
+    try:
+        meta = json.loads(fh.readline() or "{}")
+    except ValueError:
+        fh.close()
+        return None, None
+    if (
+        meta.get("fmt") != fmt
+        or meta.get("base_url") != base_url
+        or "taxonomy" not in meta
+        or parse_datetime(meta.get("generated_at") or "") is None
+    ):
+        fh.close()
+        return None, None
+    return meta, fh
+
+
+def _iter_state(fh):
+    with fh:
+        for line in fh:
+            entry = json.loads(line)
+            yield entry["id"], entry["text"]
+
+
+def build_feed_file(
+    path: str,
+    fmt: str,
+    base_url: str,
+    incremental: bool = True,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> FeedBuildResult:
+    """
+    فید را در path (gzip) می‌نویسد. با incremental=True فقط محصولات تغییرکرده
+    دوباره سریال می‌شوند و بقیه از state قبلی خوانده می‌شوند.
+    """
+    serializer = get_serializer(fmt)
+    state_path = path + STATE_SUFFIX
+    # زمان شروع، نه پایان؛ تا تغییرات هم‌زمان با ساخت در دور بعد دیده شوند
+    started = timezone.now()
+    taxonomy = _taxonomy()
+    meta, state_fh = (
+        _read_state(state_path, fmt, base_url) if incremental else (None, None)
+    )
+    result = FeedBuildResult(path=path, incremental=meta is not None)
+
+    if meta is None:
+        fresh = iter_product_chunks(serializer, base_url, batch_size)
+        merged = ((pk, text, True) for pk, _u, text in fresh)
+    else:
+        since = parse_datetime(meta["generated_at"])
+        previous = meta["taxonomy"]
+        changed_qs = (
+            _feed_queryset()
+            .filter(
+                Q(updated_at__gt=since)
+                | Q(variations__updated_at__gt=since)
+                | Q(brand_id__in=_renamed(previous["brands"], taxonomy["brands"]))
+                | Q(
+                    category_id__in=_renamed(
+                        previous["categories"], taxonomy["categories"]
+                    )
+                )
+            )
+            .distinct()
+        )
+        changed = (
+            (pk, text)
+            for pk, _u, text in iter_product_chunks(
+                serializer, base_url, batch_size, qs=changed_qs
+            )
+        )
+        active_ids = Product.objects.filter(is_active=True).values_list("id", flat=True)
+
+        def render_missing(pk):
+            qs = _feed_queryset().filter(pk=pk)
+            for _pk, _u, text in iter_product_chunks(serializer, base_url, 1, qs=qs):
+                return text
+            return None
+
+        merged = _merge(
+            active_ids.order_by("id").iterator(chunk_size=5000),
+            _iter_state(state_fh),
+            changed,
+            render_missing,
+        )
+
+    tmp_feed = path + ".tmp"
+    tmp_state = state_path + ".tmp"
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    try:
+        with gzip.open(
+            tmp_feed, "wt", encoding="utf-8", compresslevel=6
+        ) as out, gzip.open(
+            tmp_state, "wt", encoding="utf-8", compresslevel=6
+        ) as state:
+            state.write(
+                json.dumps(
+                    {
+                        "fmt": fmt,
+                        "base_url": base_url,
+                        "generated_at": started.isoformat(),
+                        "taxonomy": taxonomy,
+                    }
+                )
+                + "\n"
+            )
+            out.write(serializer.header())
+            for pk, text, rendered in merged:
+                out.write(text)
+                state.write(
+                    json.dumps({"id": pk, "text": text}, ensure_ascii=False) + "\n"
+                )
+                result.products += 1
+                if rendered:
+                    result.rendered += 1
+                else:
+                    result.reused += 1
+            out.write(serializer.footer())
+        os.replace(tmp_feed, path)
+        os.replace(tmp_state, state_path)
+    finally:
+        for tmp in (tmp_feed, tmp_state):
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    return result
+
+
+def _merge(active_ids, previous, changed, render_missing):
+    """
+    ادغام مرتب: محصولات فعال فعلی به ترتیب id؛ متن از changed (تازه) یا state قبلی.
+    previous و changed هر دو (id, text) به ترتیب id هستند.
+    محصولات حذف/غیرفعال‌شده خودبه‌خود کنار می‌روند.
+    """
+    prev_pk, prev_text = next(previous, (None, None))
+    new_pk, new_text = next(changed, (None, None))
+    for pk in active_ids:
+        while prev_pk is not None and prev_pk < pk:
+            prev_pk, prev_text = next(previous, (None, None))
+        # محصول تغییرکرده‌ای که بین دو کوئری غیرفعال شده رد می‌شود
+        while new_pk is not None and new_pk < pk:
+            new_pk, new_text = next(changed, (None, None))
+        if new_pk == pk:
+            yield pk, new_text, True
+        elif prev_pk == pk:
+            yield pk, prev_text, False
+        else:
+            # فعال است ولی نه در state و نه تغییرکرده (مثلاً دوباره فعال شده)
+            text = render_missing(pk)
+            if text is not None:
+                yield pk, text, True
@@ -0,0 +1,362 @@
+"""
+پردازش پس‌زمینهٔ تصاویر محصول.
+
+- درخواست آپلود فقط فایل اصلی را ذخیره می‌کند و یک ImageJob در صف می‌گذارد.
+- ورکر (run_image_worker) کارها را برمی‌دارد و decode/resize/encode را
+  در ProcessPoolExecutor اجرا می‌کند؛ هر نسخه به‌محض آماده شدن ذخیره می‌شود.
+- خطاها با backoff دوباره تلاش می‌شوند تا سقف max_attempts.
+- برداشتن کار یک lease است: کار RUNNING که started_at آن از
+  IMAGE_JOB_LEASE_SECONDS گذشته (ورکرش مرده) دوباره برداشته می‌شود.
+- در پایان، نسخه‌ها روی خود رکورد (IMAGE_VARIANTS_FIELD) نوشته می‌شوند تا
+  قالب‌ها بدون کوئری اضافه srcset بسازند (products.templatetags.product_images).
+"""
+
+import base64
+import io
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import timedelta
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ImageJob
+
+# Pillow اختیاری است؛ بدون آن کارها با خطای واضح ناموفق می‌شوند
+try:
+    from PIL import Image, ImageOps
+
+    HAS_PIL = True
+except Exception:
+    Image = ImageOps = None
+    HAS_PIL = False
+
+logger = logging.getLogger(__name__)
+
+# نام نسخه => حداکثر عرض (پیکسل)
+DEFAULT_DERIVATIVES = {"thumb": 320, "card": 640, "large": 1280}
+DEFAULT_FORMAT = "WEBP"
+DEFAULT_QUALITY = 82
+PLACEHOLDER_SIZE = 16
+PLACEHOLDER_KEY = "placeholder"
+RETRY_BACKOFF_SECONDS = 30
+DEFAULT_LEASE_SECONDS = 600
+
+
+def _derivative_specs() -> dict:
+    return getattr(settings, "PRODUCT_IMAGE_DERIVATIVES", DEFAULT_DERIVATIVES)
+
+
+def _lease_seconds() -> int:
+    return getattr(settings, "IMAGE_JOB_LEASE_SECONDS", DEFAULT_LEASE_SECONDS)
+
+
+def claimable(now=None) -> Q:
+    """کارهای آمادهٔ اجرا + کارهای RUNNING که lease آن‌ها تمام شده."""
+    now = now or timezone.now()
+    expired = now - timedelta(seconds=_lease_seconds())
+    running = Q(status=ImageJob.Status.RUNNING)
+    return (
+        Q(status=ImageJob.Status.PENDING, run_after__lte=now)
+        | (running & Q(started_at__lt=expired))
+        # کارهای RUNNING قدیمی‌تر از افزودن started_at
+        | (running & Q(started_at__isnull=True, updated_at__lt=expired))
+    )
+
+
+def enqueue_image_job(instance, field_name: str = "image"):
+    """
+    یک کار پردازش برای فیلد تصویر instance در صف می‌گذارد.
+    اگر برای همین فایل کاری در صف/در حال اجرا/انجام‌شده باشد، کار تکراری ساخته نمی‌شود.
+    """
+    fieldfile = getattr(instance, field_name, None)
+    if not fieldfile or not fieldfile.name:
+        return None
+
+    ct = ContentType.objects.get_for_model(instance.__class__)
+    existing = ImageJob.objects.filter(
+        content_type=ct,
+        object_id=instance.pk,
+        field_name=field_name,
+        source=fieldfile.name,
+    ).exclude(status=ImageJob.Status.FAILED)
+    if existing.exists():
+        return None
+
+    # با storage محتوامحور، فایل یکسان نام یکسان دارد؛ نسخه‌های قبلی را دوباره نمی‌سازیم
+    done = (
+        ImageJob.objects.filter(source=fieldfile.name, status=ImageJob.Status.DONE)
+        .exclude(derivatives={})
+        .first()
+    )
+    if done is not None:
+        meta = done.derivatives.get(PLACEHOLDER_KEY)
+        if meta:
+            apply_image_metadata(
+                instance.__class__,
+                instance.pk,
+                meta["width"],
+                meta["height"],
+                meta["data"],
+            )
+        apply_image_variants(instance.__class__, instance.pk, done.derivatives)
+        return ImageJob.objects.create(
+            content_type=ct,
+            object_id=instance.pk,
+            field_name=field_name,
+            source=fieldfile.name,
+            status=ImageJob.Status.DONE,
+            progress=100,
+            derivatives=done.derivatives,
+        )
+
+    return ImageJob.objects.create(
+        content_type=ct,
+        object_id=instance.pk,
+        field_name=field_name,
+        source=fieldfile.name,
+    )
+
+
+@dataclass(frozen=True)
+class Derivative:
+    """یک نسخهٔ تغییر اندازه‌یافته؛ از پروسهٔ فرزند برمی‌گردد (picklable)."""
+
+    label: str
+    payload: bytes
+    width: int
+    height: int
+
+
+@dataclass(frozen=True)
+class Placeholder:
+    """ابعاد واقعی تصویر + پیش‌نمایش LQIP به‌صورت data URI."""
+
+    width: int
+    height: int
+    data: str
+
+
+def render_derivative(data: bytes, label: str, max_width: int, fmt: str, quality: int):
+    """
+    داخل پروسهٔ جدا اجرا می‌شود (باید picklable و بدون وابستگی به ORM باشد).
+    خروجی: Derivative
+    """
+    if not HAS_PIL:
+        raise RuntimeError("Pillow نصب نیست.")
+
+    with Image.open(io.BytesIO(data)) as im:
+        im = ImageOps.exif_transpose(im)
+        if im.mode not in ("RGB", "RGBA"):
+            im = im.convert("RGBA" if "A" in im.getbands() else "RGB")
+        if im.width > max_width:
+            height = max(1, round(im.height * max_width / im.width))
+            im = im.resize((max_width, height), Image.LANCZOS)
+        out = io.BytesIO()
+        im.save(out, format=fmt, quality=quality, method=4)
+        return Derivative(label, out.getvalue(), im.width, im.height)
+
+
+def render_placeholder(data: bytes, size: int = PLACEHOLDER_SIZE):
+    """
+    ابعاد واقعی تصویر + یک پیش‌نمایش خیلی کوچک (LQIP) به‌صورت data URI.
+    خروجی: Placeholder
+    """
+    if not HAS_PIL:
+        raise RuntimeError("Pillow نصب نیست.")
+
+    with Image.open(io.BytesIO(data)) as im:
+        im = ImageOps.exif_transpose(im)
+        width, height = im.size
+        im = im.convert("RGB")
+        im.thumbnail((size, size))
+        out = io.BytesIO()
+        im.save(out, format="WEBP", quality=40)
+    encoded = base64.b64encode(out.getvalue()).decode("ascii")
+    return Placeholder(width, height, f"data:image/webp;base64,{encoded}")
+
+
+def apply_image_metadata(model, pk, width, height, placeholder):
+    """
+    ابعاد/placeholder را مستقیم با update می‌نویسد (بدون save و سیگنال‌ها).
+    """
+    fields = getattr(model, "IMAGE_META_FIELDS", None)
+    if not fields:
+        return
+    w_field, h_field, p_field = fields
+    model._default_manager.filter(pk=pk).update(
+        **{w_field: width, h_field: height, p_field: placeholder}
+    )
+
+
+def apply_image_variants(model, pk, derivatives):
+    """
+    {label: {"name", "width"}} نسخه‌ها (بدون placeholder) روی خود رکورد برای srcset.
+    """
+    field = getattr(model, "IMAGE_VARIANTS_FIELD", None)
+    if not field:
+        return
+    variants = {
+        label: {"name": d["name"], "width": d["width"]}
+        for label, d in derivatives.items()
+        if label != PLACEHOLDER_KEY and d.get("name")
+    }
+    model._default_manager.filter(pk=pk).update(**{field: variants})
+
+
+def _derivative_name(source: str, label: str, fmt: str) -> str:
+    src = PurePosixPath(source)
+    return str(src.parent / "derived" / f"{src.stem}-{label}.{fmt.lower()}")
+
+
+def _claim(job: ImageJob) -> bool:
+    """
+    برداشتن اتمیک کار؛ بدون select_for_update تا روی SQLite هم کار کند.
+    کار RUNNING با lease تمام‌شده هم برداشته می‌شود؛ started_at تازه باعث می‌شود
+    فقط یکی از ورکرهای هم‌زمان موفق شود.
+    """
+    now = timezone.now()
+    return (
+        ImageJob.objects.filter(claimable(now), pk=job.pk).update(
+            status=ImageJob.Status.RUNNING,
+            attempts=job.attempts + 1,
+            started_at=now,
+            updated_at=now,
+        )
+        == 1
+    )
+
+
+def _fail(job: ImageJob, exc: Exception):
+    job.refresh_from_db(fields=["attempts", "max_attempts"])
+    job.error = f"{exc.__class__.__name__}: {exc}"
+    if job.attempts >= job.max_attempts:
+        job.status = ImageJob.Status.FAILED
+    else:
+        job.status = ImageJob.Status.PENDING
+        job.run_after = timezone.now() + timedelta(
+            seconds=RETRY_BACKOFF_SECONDS * (2 ** (job.attempts - 1))
+        )
+    job.save(update_fields=["status", "error", "run_after", "updated_at"])
+    logger.warning("image job #%s failed: %s", job.pk, job.error)
+
+
+def process_job(job: ImageJob, executor):
+    """
+    نسخه‌های یک کار را به executor می‌سپارد و هر کدام را به‌محض آماده شدن ذخیره می‌کند.
+    """
+    model = job.content_type.model_class()
+    instance = model._default_manager.filter(pk=job.object_id).first()
+    fieldfile = getattr(instance, job.field_name, None) if instance else None
+    if not fieldfile or fieldfile.name != job.source:
+        # تصویر عوض شده یا رکورد حذف شده؛ این کار دیگر معنی ندارد
+        job.status = ImageJob.Status.DONE
+        job.error = "source changed"
+        job.save(update_fields=["status", "error", "updated_at"])
+        return
+
+    storage = fieldfile.storage
+    with storage.open(job.source, "rb") as fh:
+        data = fh.read()
+
+    specs = _derivative_specs()
+    fmt = getattr(settings, "PRODUCT_IMAGE_FORMAT", DEFAULT_FORMAT)
+    quality = getattr(settings, "PRODUCT_IMAGE_QUALITY", DEFAULT_QUALITY)
+    futures = [
+        executor.submit(render_derivative, data, label, width, fmt, quality)
+        for label, width in specs.items()
+    ]
+    if getattr(model, "IMAGE_META_FIELDS", None):
+        futures.append(executor.submit(render_placeholder, data))
+
+    derivatives = dict(job.derivatives or {})
+    done = 0
+    for fut in as_completed(futures):
+        result = fut.result()
+        if isinstance(result, Placeholder):
+            derivatives[PLACEHOLDER_KEY] = {
+                "width": result.width,
+                "height": result.height,
+                "data": result.data,
+            }
+            apply_image_metadata(
+                model, job.object_id, result.width, result.height, result.data
+            )
+        else:
+            name = storage.save(
+                _derivative_name(job.source, result.label, fmt),
+                ContentFile(result.payload),
+            )
+            derivatives[result.label] = {
+                "name": name,
+                "width": result.width,
+                "height": result.height,
+            }
+        done += 1
+        ImageJob.objects.filter(pk=job.pk).update(
+            derivatives=derivatives,
+            progress=int(done * 100 / len(futures)),
+            updated_at=timezone.now(),
+        )
+
+    apply_image_variants(model, job.object_id, derivatives)
+    ImageJob.objects.filter(pk=job.pk).update(
+        status=ImageJob.Status.DONE,
+        progress=100,
+        error="",
+        updated_at=timezone.now(),
+    )
+
+
+def run_worker(
+    max_workers: int | None = None,
+    batch_size: int = 20,
+    poll_interval: float = 2.0,
+    once: bool = False,
+):
+    """
+    حلقهٔ اصلی ورکر. با once=True فقط صف فعلی را خالی می‌کند و برمی‌گردد.
+    """
+    processed = 0
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        while True:
+            jobs = list(
+                ImageJob.objects.filter(claimable())
+                .select_related("content_type")
+                .order_by("run_after", "id")[:batch_size]
+            )
+            for job in jobs:
+                if not _claim(job):
+                    continue
+                job.refresh_from_db()
+                if job.attempts > job.max_attempts:
+                    # ورکرهای قبلی وسط همین کار مرده‌اند؛ دوباره امتحان نمی‌کنیم
+                    job.status = ImageJob.Status.FAILED
+                    job.error = "lease expired"
+                    job.save(update_fields=["status", "error", "updated_at"])
+                    continue
+                try:
+                    process_job(job, executor)
+                except Exception as exc:
+                    _fail(job, exc)
+                processed += 1
+
+            if not jobs:
+                if once:
+                    break
+                time.sleep(poll_interval)
+    return processed
+
+
+def schedule_image_job(instance, field_name: str = "image"):
+    """
+    صف کردن بعد از commit؛ تا ورکر رکوردی را که هنوز commit نشده نبیند.
+    """
+    transaction.on_commit(lambda: enqueue_image_job(instance, field_name))
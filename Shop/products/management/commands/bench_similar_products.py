@@ -0,0 +1,100 @@
+import os
+import random
+import time
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products import similarity
+
+
+class Command(BaseCommand):
+    help = (
+        "بنچمارک ساخت کامل «محصولات مشابه» روی کاتالوگ ساختگی (بدون دیتابیس): "
+        "یک هسته در برابر process pool."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=100_000)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="اندازهٔ pool (پیش‌فرض تعداد هسته‌ها)",
+        )
+        parser.add_argument("--batch", type=int, default=512)
+        parser.add_argument("--top-k", type=int, default=8)
+        parser.add_argument("--categories", type=int, default=400)
+        parser.add_argument("--brands", type=int, default=300)
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **opts):
+        if not similarity.HAS_NUMPY:
+            raise CommandError("این بنچمارک به NumPy نیاز دارد.")
+        if similarity.threadpool_limits is None:
+            self.stdout.write(
+                "threadpoolctl نصب نیست؛ برای اندازه‌گیری تک‌هسته‌ای واقعی "
+                "OMP_NUM_THREADS=1 OPENBLAS_NUM_THREADS=1 را تنظیم کنید."
+            )
+
+        started = time.monotonic()
+        vectors = self._catalog(opts)
+        matrix = similarity.build_matrix(vectors)
+        encode = time.monotonic() - started
+        self.stdout.write(
+            f"{len(vectors)} محصول، {matrix.shape[1]} ویژگی، "
+            f"{matrix.nbytes / 2**20:.0f} MiB؛ ساخت بردارها {encode:.1f} ثانیه"
+        )
+
+        rows = range(len(vectors))
+        runs = [("1 هسته", 1)]
+        if opts["workers"] > 1:
+            runs.append((f"pool × {opts['workers']}", opts["workers"]))
+        for label, workers in runs:
+            limit = (
+                similarity.threadpool_limits(1)
+                if similarity.threadpool_limits is not None and workers == 1
+                else nullcontext()
+            )
+            with limit:
+                started = time.monotonic()
+                pairs = sum(
+                    len(ranked)
+                    for _row, ranked in similarity.iter_top_k(
+                        matrix,
+                        rows,
+                        opts["top_k"],
+                        0.0,
+                        opts["batch"],
+                        workers=workers,
+                    )
+                )
+                elapsed = time.monotonic() - started
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{label}: {elapsed:.1f} ثانیه (+{encode:.1f} ساخت بردار)، "
+                    f"{len(vectors) / elapsed:,.0f} محصول/ثانیه، {pairs} همسایه"
+                )
+            )
+
+    def _catalog(self, opts):
+        rnd = random.Random(opts["seed"])
+        parents = max(opts["categories"] // 10, 1)
+        colors, sizes = list(range(30)), list(range(15))
+        vectors = []
+        for _i in range(opts["products"]):
+            category = rnd.randrange(opts["categories"])
+            vectors.append(
+                similarity.normalize(
+                    similarity.product_features(
+                        category + parents,
+                        category % parents,
+                        rnd.randrange(opts["brands"]),
+                        rnd.lognormvariate(13, 1),
+                        rnd.sample(colors, rnd.randint(1, 4)),
+                        rnd.sample(sizes, rnd.randint(1, 5)),
+                        similarity.DEFAULTS["price_band_ratio"],
+                    )
+                )
+            )
+        return vectors
@@ -0,0 +1,77 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from products.imaging import render_placeholder
+from products.models import Product, ProductImage
+
+
+def _read(fieldfile):
+    try:
+        with fieldfile.storage.open(fieldfile.name, "rb") as fh:
+            return fh.read()
+    except OSError:
+        return None
+
+
+def _placeholder_or_none(data):
+    if data is None:
+        return None
+    try:
+        return render_placeholder(data)
+    except Exception:
+        return None
+
+
+class Command(BaseCommand):
+    help = "ساخت دسته‌ای ابعاد و placeholder (LQIP) برای تصاویر محصول."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch", type=int, default=200)
+        parser.add_argument("--workers", type=int, default=None)
+        parser.add_argument(
+            "--force", action="store_true", help="ردیف‌های دارای placeholder را هم بازسازی کن"
+        )
+
+    def handle(self, *args, **opts):
+        started = time.monotonic()
+        total = 0
+        with ProcessPoolExecutor(max_workers=opts["workers"]) as executor:
+            for model in (Product, ProductImage):
+                total += self._build(model, executor, opts["batch"], opts["force"])
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(f"{total} تصویر در {elapsed:.1f} ثانیه به‌روزرسانی شد.")
+        )
+
+    def _build(self, model, executor, batch_size, force):
+        w_field, h_field, p_field = model.IMAGE_META_FIELDS
+        qs = model._default_manager.exclude(image="").exclude(image__isnull=True)
+        if not force:
+            qs = qs.filter(**{p_field: ""})
+
+        updated = 0
+        last_pk = 0
+        while True:
+            # keyset روی pk تا با بزرگ شدن جدول، صفحه‌ها کند نشوند
+            rows = list(qs.filter(pk__gt=last_pk).order_by("pk")[:batch_size])
+            if not rows:
+                break
+            last_pk = rows[-1].pk
+
+            payloads = [_read(r.image) for r in rows]
+            results = executor.map(_placeholder_or_none, payloads)
+            changed = []
+            for row, res in zip(rows, results):
+                if res is None:
+                    continue
+                setattr(row, w_field, res.width)
+                setattr(row, h_field, res.height)
+                setattr(row, p_field, res.data)
+                changed.append(row)
+            if changed:
+                model._default_manager.bulk_update(changed, [w_field, h_field, p_field])
+                updated += len(changed)
+            self.stdout.write(f"{model._meta.label}: {updated}")
+        return updated
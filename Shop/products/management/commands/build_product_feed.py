@@ -0,0 +1,54 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from products.feeds import DEFAULT_BATCH_SIZE, FEED_FORMATS, build_feed_file, feed_path
+
+
+class Command(BaseCommand):
+    help = "ساخت فایل gzip فید محصولات (CSV/XML)؛ پیش‌فرض افزایشی."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--format", choices=FEED_FORMATS, action="append", dest="formats"
+        )
+        parser.add_argument(
+            "--output",
+            default=None,
+            help="مسیر فایل خروجی (فقط با یک --format)؛ پیش‌فرض PRODUCT_FEED_ROOT",
+        )
+        parser.add_argument("--base-url", default=None)
+        parser.add_argument("--batch", type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="نادیده گرفتن state قبلی (مثلاً بعد از تغییر قالب ردیف‌ها)",
+        )
+
+    def handle(self, *args, **opts):
+        formats = opts["formats"] or list(FEED_FORMATS)
+        if opts["output"] and len(formats) > 1:
+            raise CommandError("--output فقط با یک --format معنی دارد.")
+        base_url = opts["base_url"] or getattr(settings, "PRODUCT_FEED_BASE_URL", "")
+        if not base_url:
+            raise CommandError("PRODUCT_FEED_BASE_URL یا --base-url لازم است.")
+
+        for fmt in formats:
+            path = opts["output"] or feed_path(fmt)
+            started = time.monotonic()
+            result = build_feed_file(
+                path,
+                fmt,
+                base_url,
+                incremental=not opts["full"],
+                batch_size=opts["batch"],
+            )
+            mode = "افزایشی" if result.incremental else "کامل"
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{result.path} ({mode}): {result.products} محصول، "
+                    f"{result.rendered} ساخته / {result.reused} از قبل، "
+                    f"{time.monotonic() - started:.1f} ثانیه"
+                )
+            )
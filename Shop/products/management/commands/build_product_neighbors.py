@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.recommendations import METRICS, build_bought_together
+
+
+class Command(BaseCommand):
+    help = (
+        "ساخت «معمولاً با هم خریده می‌شوند» از سفارش‌های پرداخت‌شده؛ "
+        "پیش‌فرض افزایشی (فقط سفارش‌های جدید)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full", action="store_true", help="شمارش دوباره از همهٔ سفارش‌ها"
+        )
+        parser.add_argument("--metric", choices=METRICS, default=None)
+        parser.add_argument("--top-k", type=int, default=None)
+        parser.add_argument(
+            "--min-count",
+            type=int,
+            default=None,
+            help="حداقل سفارش مشترک برای یک جفت محصول",
+        )
+        parser.add_argument("--batch", type=int, default=None)
+
+    def handle(self, *args, **opts):
+        started = time.monotonic()
+        try:
+            result = build_bought_together(
+                full=opts["full"],
+                metric=opts["metric"],
+                top_k=opts["top_k"],
+                min_pair_orders=opts["min_count"],
+                batch_size=opts["batch"],
+            )
+        except RuntimeError as exc:
+            raise CommandError(str(exc))
+        mode = "کامل" if result.full else "افزایشی"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"({mode}، {result.engine}) {result.orders} سفارش تا #{result.watermark}، "
+                f"{result.products} محصول، {result.neighbors} همسایه؛ "
+                f"{time.monotonic() - started:.1f} ثانیه"
+            )
+        )
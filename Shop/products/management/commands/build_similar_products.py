@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.similarity import HAS_NUMPY, build_similar
+
+
+class Command(BaseCommand):
+    help = (
+        "ساخت «محصولات مشابه» از دسته، برند، بازهٔ قیمت، رنگ و سایز؛ "
+        "پیش‌فرض افزایشی (فقط محصولات تغییرکرده و متأثرها)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="ساخت دوباره برای همه")
+        parser.add_argument("--top-k", type=int, default=None)
+        parser.add_argument(
+            "--workers", type=int, default=None, help="تعداد پروسه‌ها (پیش‌فرض تنظیمات)"
+        )
+        parser.add_argument("--batch", type=int, default=None)
+
+    def handle(self, *args, **opts):
+        if not HAS_NUMPY:
+            self.stderr.write(
+                self.style.WARNING(
+                    "NumPy نصب نیست (pip install numpy)؛ موتور پایتونی فقط برای "
+                    "کاتالوگ کوچک مناسب است."
+                )
+            )
+        started = time.monotonic()
+        result = build_similar(
+            full=opts["full"],
+            top_k=opts["top_k"],
+            workers=opts["workers"],
+            batch_size=opts["batch"],
+        )
+        mode = "کامل" if result.full else "افزایشی"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"({mode}، {result.engine}) {result.products} محصول فعال، "
+                f"{result.changed} تغییرکرده، {result.recomputed} بازمحاسبه، "
+                f"{result.neighbors} همسایه؛ {time.monotonic() - started:.1f} ثانیه"
+            )
+        )
@@ -0,0 +1,32 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from products.sitemaps import build_sitemaps
+
+
+class Command(BaseCommand):
+    help = "ساخت/به‌روزرسانی افزایشی سایت‌مپ‌های محصولات، دسته‌ها و برندها."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default=None)
+        parser.add_argument(
+            "--force", action="store_true", help="بازنویسی همهٔ shardها"
+        )
+
+    def handle(self, *args, **opts):
+        base_url = opts["base_url"] or getattr(settings, "SITEMAP_BASE_URL", "")
+        if not base_url:
+            raise CommandError("SITEMAP_BASE_URL یا --base-url لازم است.")
+
+        started = time.monotonic()
+        manifest = build_sitemaps(base_url, force=opts["force"])
+        urls = sum(s["urls"] for s in manifest["shards"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{len(manifest['shards'])} shard / {urls} آدرس — "
+                f"{manifest['written']} بازنویسی، {manifest['skipped']} بدون تغییر "
+                f"({time.monotonic() - started:.1f} ثانیه)"
+            )
+        )
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+
+from products.models import ImageJob
+from products.storage import (
+    cas_file_fields,
+    content_addressed_storage,
+    grace_seconds,
+    iter_blob_names,
+)
+
+
+class Command(BaseCommand):
+    help = "حذف blobهای بی‌ارجاع از storage محتوامحور (cas/)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace",
+            type=int,
+            default=None,
+            help="فایل‌های جدیدتر از این مقدار (ثانیه) دست نمی‌خورند؛ پیش‌فرض CAS_GRACE_SECONDS",
+        )
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **opts):
+        referenced = set()
+        for model, field in cas_file_fields():
+            referenced.update(
+                model._default_manager.exclude(**{field: ""})
+                .values_list(field, flat=True)
+                .iterator(chunk_size=2000)
+            )
+        for derivatives in (
+            ImageJob.objects.exclude(derivatives={})
+            .values_list("derivatives", flat=True)
+            .iterator(chunk_size=2000)
+        ):
+            referenced.update(d.get("name") for d in derivatives.values())
+
+        removed = 0
+        for name in iter_blob_names():
+            if name in referenced:
+                continue
+            if content_addressed_storage.is_recent(name, opts["grace"]):
+                continue
+            removed += 1
+            if not opts["dry_run"]:
+                content_addressed_storage.delete(name)
+
+        verb = "قابل حذف" if opts["dry_run"] else "حذف شد"
+        self.stdout.write(self.style.SUCCESS(f"{removed} فایل {verb}."))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from products.catalog_import import CatalogImporter, iter_rows
+from Shop.db_routers import use_primary
+
+
+class Command(BaseCommand):
+    help = "ورود انبوه محصولات/واریانت‌ها از CSV یا JSONL (جریانی و تکه‌ای)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help='مسیر فایل؛ "-" برای stdin')
+        parser.add_argument("--format", choices=["csv", "jsonl"], default=None)
+        parser.add_argument("--batch", type=int, default=1000, help="ردیف در هر تراکنش")
+        parser.add_argument(
+            "--dry-run", action="store_true", help="همه‌چیز اجرا و در پایان rollback شود"
+        )
+
+    def handle(self, *args, **opts):
+        importer = CatalogImporter(
+            batch_size=opts["batch"],
+            dry_run=opts["dry_run"],
+            log=lambda msg: self.stdout.write(msg),
+        )
+        try:
+            # تکه‌های بعدی محصولات/slugهای تکه‌های قبلی را می‌خوانند
+            with use_primary():
+                stats = importer.run(iter_rows(opts["path"], opts["format"]))
+        except FileNotFoundError as exc:
+            raise CommandError(str(exc))
+
+        for err in stats.errors:
+            self.stderr.write(self.style.ERROR(err))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{stats.rows} ردیف در {stats.elapsed:.1f} ثانیه "
+                f"({stats.rate:,.0f} ردیف/ثانیه) — "
+                f"محصول: {stats.products_created} جدید / {stats.products_updated} به‌روز، "
+                f"واریانت: {stats.variations_created} جدید / {stats.variations_updated} به‌روز"
+            )
+        )
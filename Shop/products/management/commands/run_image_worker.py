@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from products.imaging import run_worker
+from Shop.db_routers import use_primary
+
+
+class Command(BaseCommand):
+    help = "ورکر پس‌زمینهٔ پردازش تصاویر محصول (ProcessPoolExecutor)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=None, help="تعداد پروسه‌ها (پیش‌فرض: تعداد CPU)"
+        )
+        parser.add_argument("--batch", type=int, default=20)
+        parser.add_argument("--poll", type=float, default=2.0, help="فاصلهٔ بررسی صف (ثانیه)")
+        parser.add_argument(
+            "--once", action="store_true", help="فقط صف فعلی را پردازش کن و خارج شو"
+        )
+
+    def handle(self, *args, **opts):
+        # محصولی که تازه صف شده ممکن است هنوز به replica نرسیده باشد
+        with use_primary():
+            processed = run_worker(
+                max_workers=opts["workers"],
+                batch_size=opts["batch"],
+                poll_interval=opts["poll"],
+                once=opts["once"],
+            )
+        self.stdout.write(self.style.SUCCESS(f"{processed} کار پردازش شد."))
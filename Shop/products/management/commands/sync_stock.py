@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from products.catalog_import import iter_rows
+from products.stock import sync_stock
+from Shop.db_routers import use_primary
+
+
+class Command(BaseCommand):
+    help = "همگام‌سازی انبوه موجودی از خروجی انبار (sku/barcode + stock/delta)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help='مسیر فایل CSV/JSONL؛ "-" برای stdin')
+        parser.add_argument("--format", choices=["csv", "jsonl"], default=None)
+        parser.add_argument(
+            "--chunk",
+            type=int,
+            default=getattr(settings, "STOCK_SYNC_CHUNK_SIZE", 1000),
+            help="رکورد در هر UPDATE/تراکنش",
+        )
+
+    def handle(self, *args, **opts):
+        try:
+            # نگاشت SKU => واریانت باید واریانت‌های تازه (مثلاً import قبلی) را ببیند
+            with use_primary():
+                result = sync_stock(
+                    iter_rows(opts["path"], opts["format"]), chunk_size=opts["chunk"]
+                )
+        except (FileNotFoundError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        for key in result.unknown[:20]:
+            self.stderr.write(self.style.WARNING(f"SKU/بارکد ناشناخته: {key}"))
+        for key in result.errors[:20]:
+            self.stderr.write(self.style.ERROR(f"رکورد نامعتبر: {key}"))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{result.received} رکورد، {result.updated} واریانت به‌روز در "
+                f"{result.batches} دسته (ناشناخته: {len(result.unknown)}، "
+                f"نامعتبر: {len(result.errors)})"
+            )
+        )
@@ -0,0 +1,116 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        ("products", "0005_alter_brand_slug_alter_category_slug_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImageJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("object_id", models.PositiveBigIntegerField()),
+                (
+                    "field_name",
+                    models.CharField(max_length=64, verbose_name="فیلد تصویر"),
+                ),
+                ("source", models.CharField(max_length=255, verbose_name="فایل مبدأ")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "در صف"),
+                            ("running", "در حال پردازش"),
+                            ("done", "انجام شد"),
+                            ("failed", "ناموفق"),
+                        ],
+                        default="pending",
+                        max_length=16,
+                        verbose_name="وضعیت",
+                    ),
+                ),
+                (
+                    "progress",
+                    models.PositiveSmallIntegerField(
+                        default=0, verbose_name="پیشرفت (٪)"
+                    ),
+                ),
+                (
+                    "attempts",
+                    models.PositiveSmallIntegerField(
+                        default=0, verbose_name="تعداد تلاش"
+                    ),
+                ),
+                (
+                    "max_attempts",
+                    models.PositiveSmallIntegerField(
+                        default=3, verbose_name="حداکثر تلاش"
+                    ),
+                ),
+                (
+                    "derivatives",
+                    models.JSONField(
+                        blank=True,
+                        default=dict,
+                        verbose_name="نسخه\u200cهای ساخته\u200cشده",
+                    ),
+                ),
+                ("error", models.TextField(blank=True, verbose_name="خطا")),
+                (
+                    "run_after",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, verbose_name="اجرا پس از"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="ساخته\u200cشده"
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True, verbose_name="به\u200cروزرسانی"
+                    ),
+                ),
+                (
+                    "content_type",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="contenttypes.contenttype",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "کار پردازش تصویر",
+                "verbose_name_plural": "کارهای پردازش تصویر",
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["status", "run_after"],
+                        name="products_im_status_0eb031_idx",
+                    ),
+                    models.Index(
+                        fields=["content_type", "object_id"],
+                        name="products_im_content_05454e_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+import products.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        ("products", "0006_imagejob"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="product",
+            name="image",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=products.storage.product_media_storage,
+                upload_to="products/%Y/%m/",
+                verbose_name="تصویر اصلی",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="productimage",
+            name="image",
+            field=models.ImageField(
+                storage=products.storage.product_media_storage,
+                upload_to="products/gallery/%Y/%m/",
+                verbose_name="تصویر",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="productvariation",
+            name="image",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=products.storage.product_media_storage,
+                upload_to="products/variants/%Y/%m/",
+                verbose_name="تصویر واریانت (اختیاری)",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="imagejob",
+            index=models.Index(fields=["source"], name="products_im_source_8d2ebc_idx"),
+        ),
+    ]
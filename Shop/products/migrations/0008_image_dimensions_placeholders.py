@@ -0,0 +1,51 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0007_content_addressed_media"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="image_height",
+            field=models.PositiveIntegerField(
+                blank=True, null=True, verbose_name="ارتفاع تصویر"
+            ),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="image_placeholder",
+            field=models.TextField(
+                blank=True, verbose_name="پیش\u200cنمایش تصویر (LQIP)"
+            ),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="image_width",
+            field=models.PositiveIntegerField(
+                blank=True, null=True, verbose_name="عرض تصویر"
+            ),
+        ),
+        migrations.AddField(
+            model_name="productimage",
+            name="height",
+            field=models.PositiveIntegerField(
+                blank=True, null=True, verbose_name="ارتفاع"
+            ),
+        ),
+        migrations.AddField(
+            model_name="productimage",
+            name="placeholder",
+            field=models.TextField(blank=True, verbose_name="پیش\u200cنمایش (LQIP)"),
+        ),
+        migrations.AddField(
+            model_name="productimage",
+            name="width",
+            field=models.PositiveIntegerField(
+                blank=True, null=True, verbose_name="عرض"
+            ),
+        ),
+    ]
@@ -0,0 +1,51 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0008_image_dimensions_placeholders"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="category",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["parent", "name"],
+                name="category_active_parent_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["-created_at", "-id"],
+                name="product_active_new_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["category", "-created_at"],
+                name="product_active_category_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["brand", "-created_at"],
+                name="product_active_brand_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="productvariation",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["product", "price_override"],
+                name="variation_active_price_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,51 @@
+from django.db import migrations
+
+# فقط روی PostgreSQL: ایندکس GIN تری‌گرام روی UPPER(...) تا جست‌وجوی icontains
+# (که Django به UPPER(col::text) LIKE UPPER('%q%') تبدیل می‌کند) از ایندکس استفاده کند.
+TRIGRAM_INDEXES = [
+    ("product", "name", "product_name_trgm"),
+    ("product", "description", "product_description_trgm"),
+    ("brand", "name", "brand_name_trgm"),
+    ("category", "name", "category_name_trgm"),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        available = cursor.fetchone() is not None
+    if not available:
+        # بدون contrib جست‌وجو همچنان کار می‌کند، فقط بدون ایندکس
+        return
+    qn = schema_editor.quote_name
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for model_name, field_name, index_name in TRIGRAM_INDEXES:
+        model = apps.get_model("products", model_name)
+        column = model._meta.get_field(field_name).column
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {qn(index_name)} "
+            f"ON {qn(model._meta.db_table)} "
+            f"USING gin (UPPER({qn(column)}::text) gin_trgm_ops)"
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for _model, _field, index_name in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f"DROP INDEX IF EXISTS {schema_editor.quote_name(index_name)}"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0009_partial_active_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
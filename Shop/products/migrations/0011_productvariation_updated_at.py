@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0010_trigram_search_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="productvariation",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, verbose_name="به\u200cروزرسانی"),
+        ),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0011_productvariation_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="productvariation",
+            index=models.Index(fields=["barcode"], name="variation_barcode_idx"),
+        ),
+    ]
@@ -0,0 +1,147 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0012_variation_barcode_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NeighborBuild",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(max_length=16, unique=True, verbose_name="نوع"),
+                ),
+                (
+                    "watermark",
+                    models.BigIntegerField(default=0, verbose_name="نشانگر پیشرفت"),
+                ),
+                (
+                    "orders",
+                    models.PositiveBigIntegerField(
+                        default=0, verbose_name="تعداد سفارش\u200cهای شمرده\u200cشده"
+                    ),
+                ),
+                (
+                    "built_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="آخرین ساخت"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "ساخت محصولات مرتبط",
+                "verbose_name_plural": "ساخت محصولات مرتبط",
+            },
+        ),
+        migrations.CreateModel(
+            name="ProductCooccurrence",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "orders",
+                    models.PositiveIntegerField(default=0, verbose_name="تعداد سفارش"),
+                ),
+                (
+                    "product_a",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="products.product",
+                    ),
+                ),
+                (
+                    "product_b",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="products.product",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "هم\u200cخریدی محصولات",
+                "verbose_name_plural": "هم\u200cخریدی محصولات",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("product_a", "product_b"), name="cooccurrence_pair_uniq"
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="ProductNeighbor",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("bought", "خریداری\u200cشده با هم")],
+                        max_length=16,
+                        verbose_name="نوع",
+                    ),
+                ),
+                ("rank", models.PositiveSmallIntegerField(verbose_name="رتبه")),
+                ("score", models.FloatField(verbose_name="امتیاز")),
+                (
+                    "neighbor",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="products.product",
+                        verbose_name="محصول مرتبط",
+                    ),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="neighbors",
+                        to="products.product",
+                        verbose_name="محصول",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "محصول مرتبط",
+                "verbose_name_plural": "محصولات مرتبط",
+                "ordering": ["product", "kind", "rank"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("product", "kind", "rank"),
+                        name="product_neighbor_rank_uniq",
+                    )
+                ],
+            },
+        ),
+    ]
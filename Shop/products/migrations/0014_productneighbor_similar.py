@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0013_product_neighbors"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="productneighbor",
+            name="kind",
+            field=models.CharField(
+                choices=[("bought", "خریداری\u200cشده با هم"), ("similar", "مشابه")],
+                max_length=16,
+                verbose_name="نوع",
+            ),
+        ),
+    ]
@@ -0,0 +1,46 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def create_version_row(apps, schema_editor):
+    # نسخهٔ اولیه از زمان فعلی، تا با کلیدهای کش قدیمی‌تر تداخل نداشته باشد
+    CatalogVersion = apps.get_model("products", "CatalogVersion")
+    CatalogVersion.objects.get_or_create(
+        pk=1, defaults={"version": int(django.utils.timezone.now().timestamp() * 1000)}
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0014_productneighbor_similar"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CatalogVersion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("version", models.BigIntegerField(default=0, verbose_name="نسخه")),
+                (
+                    "changed_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, verbose_name="آخرین تغییر"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "نسخهٔ کاتالوگ",
+                "verbose_name_plural": "نسخهٔ کاتالوگ",
+            },
+        ),
+        migrations.RunPython(create_version_row, migrations.RunPython.noop),
+    ]
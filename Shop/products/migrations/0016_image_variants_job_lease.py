@@ -0,0 +1,36 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0015_catalogversion"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="imagejob",
+            name="started_at",
+            field=models.DateTimeField(blank=True, null=True, verbose_name="شروع اجرا"),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="image_variants",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                verbose_name="نسخه\u200cهای تصویر",
+            ),
+        ),
+        migrations.AddField(
+            model_name="productimage",
+            name="variants",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                verbose_name="نسخه\u200cهای تصویر",
+            ),
+        ),
+    ]
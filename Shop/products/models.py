@@ -1,35 +1,11 @@
 from django.db import models
 from django.utils.translation import gettext_lazy as _
-from django.utils.text import slugify
 from django.core.exceptions import ValidationError
 from django.urls import reverse
+from django.utils import timezone
 
-
-def unique_slugify(
-    instance,
-    value,
-    field_name: str = "slug",
-    allow_unicode: bool = True,
-    max_length: int = 160,
-):
-
-    base = slugify(value, allow_unicode=allow_unicode) or "item"
-    field = instance._meta.get_field(field_name)
-    max_len = getattr(field, "max_length", max_length) or max_length
-    base = base[:max_len]
-
-    slug = base
-    Model = instance.__class__
-    qs = Model._default_manager.all()
-    if instance.pk:
-        qs = qs.exclude(pk=instance.pk)
-
-    i = 2
-    while qs.filter(**{field_name: slug}).exists():
-        suffix = f"-{i}"
-        slug = (base[: max_len - len(suffix)]) + suffix
-        i += 1
-    return slug
+from .slugs import save_with_unique_slug, unique_slugify  # noqa: F401
+from .storage import product_media_storage
 
 
 class Category(models.Model):
@@ -44,17 +20,21 @@ class Category(models.Model):
         verbose_name = _("دسته")
         verbose_name_plural = _("دسته‌ها")
         ordering = ["name"]
-        indexes = [models.Index(fields=["slug"])]
+        indexes = [
+            models.Index(fields=["slug"]),
+            # منوی ناوبار: فقط دسته‌های فعال، به ترتیب نام زیر هر والد
+            models.Index(
+                fields=["parent", "name"],
+                name="category_active_parent_idx",
+                condition=models.Q(is_active=True),
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = unique_slugify(
-                self, self.name, allow_unicode=True, max_length=120
-            )
-        super().save(*args, **kwargs)
+        save_with_unique_slug(self, self.name, super().save, *args, **kwargs)
 
     def get_absolute_url(self):
         return reverse("products:category", args=[self.slug])
@@ -74,11 +54,7 @@ class Brand(models.Model):
         return self.name
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = unique_slugify(
-                self, self.name, allow_unicode=True, max_length=120
-            )
-        super().save(*args, **kwargs)
+        save_with_unique_slug(self, self.name, super().save, *args, **kwargs)
 
     def get_absolute_url(self):
         return reverse("products:brand", args=[self.slug])
@@ -154,8 +130,23 @@ class Product(models.Model):
     updated_at = models.DateTimeField(_("به‌روزرسانی"), auto_now=True)
 
     image = models.ImageField(
-        _("تصویر اصلی"), upload_to="products/%Y/%m/", null=True, blank=True
+        _("تصویر اصلی"),
+        upload_to="products/%Y/%m/",
+        storage=product_media_storage,
+        null=True,
+        blank=True,
     )
+    image_width = models.PositiveIntegerField(_("عرض تصویر"), null=True, blank=True)
+    image_height = models.PositiveIntegerField(_("ارتفاع تصویر"), null=True, blank=True)
+    image_placeholder = models.TextField(_("پیش‌نمایش تصویر (LQIP)"), blank=True)
+    # {label: {"name", "width"}} نسخه‌های کوچک‌شده برای srcset
+    image_variants = models.JSONField(
+        _("نسخه‌های تصویر"), default=dict, blank=True, editable=False
+    )
+
+    # (عرض، ارتفاع، placeholder) که ورکر تصویر پر می‌کند
+    IMAGE_META_FIELDS = ("image_width", "image_height", "image_placeholder")
+    IMAGE_VARIANTS_FIELD = "image_variants"
 
     class Meta:
         verbose_name = _("محصول")
@@ -166,6 +157,22 @@ class Product(models.Model):
             models.Index(fields=["brand"]),
             models.Index(fields=["category"]),
             models.Index(fields=["slug"]),
+            # ایندکس‌های جزئی (فقط is_active=True) برای لیست‌ها با مرتب‌سازی «جدیدترین»
+            models.Index(
+                fields=["-created_at", "-id"],
+                name="product_active_new_idx",
+                condition=models.Q(is_active=True),
+            ),
+            models.Index(
+                fields=["category", "-created_at"],
+                name="product_active_category_idx",
+                condition=models.Q(is_active=True),
+            ),
+            models.Index(
+                fields=["brand", "-created_at"],
+                name="product_active_brand_idx",
+                condition=models.Q(is_active=True),
+            ),
         ]
 
     def __str__(self):
@@ -185,11 +192,7 @@ class Product(models.Model):
         return sum(self.variations.values_list("stock", flat=True))
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = unique_slugify(
-                self, self.name, allow_unicode=True, max_length=160
-            )
-        super().save(*args, **kwargs)
+        save_with_unique_slug(self, self.name, super().save, *args, **kwargs)
 
     def get_absolute_url(self):
         return reverse("products:detail", args=[self.slug])
@@ -199,9 +202,20 @@ class ProductImage(models.Model):
     product = models.ForeignKey(
         Product, related_name="images", on_delete=models.CASCADE
     )
-    image = models.ImageField(_("تصویر"), upload_to="products/gallery/%Y/%m/")
+    image = models.ImageField(
+        _("تصویر"), upload_to="products/gallery/%Y/%m/", storage=product_media_storage
+    )
     alt_text = models.CharField(_("متن جایگزین"), max_length=150, blank=True)
     is_main = models.BooleanField(_("تصویر اصلی؟"), default=False)
+    width = models.PositiveIntegerField(_("عرض"), null=True, blank=True)
+    height = models.PositiveIntegerField(_("ارتفاع"), null=True, blank=True)
+    placeholder = models.TextField(_("پیش‌نمایش (LQIP)"), blank=True)
+    variants = models.JSONField(
+        _("نسخه‌های تصویر"), default=dict, blank=True, editable=False
+    )
+
+    IMAGE_META_FIELDS = ("width", "height", "placeholder")
+    IMAGE_VARIANTS_FIELD = "variants"
 
     class Meta:
         verbose_name = _("تصویر محصول")
@@ -246,9 +260,12 @@ class ProductVariation(models.Model):
     image = models.ImageField(
         _("تصویر واریانت (اختیاری)"),
         upload_to="products/variants/%Y/%m/",
+        storage=product_media_storage,
         null=True,
         blank=True,
     )
+    # برای ETag/Last-Modified صفحهٔ محصول و فید؛ همگام‌سازی موجودی هم جلو می‌برد
+    updated_at = models.DateTimeField(_("به‌روزرسانی"), auto_now=True)
 
     class Meta:
         verbose_name = _("واریانت محصول")
@@ -264,6 +281,14 @@ class ProductVariation(models.Model):
             models.Index(fields=["product", "is_active"]),
             models.Index(fields=["color"]),
             models.Index(fields=["size"]),
+            # جست‌وجوی دقیق بارکد در داشبورد staff
+            models.Index(fields=["barcode"], name="variation_barcode_idx"),
+            # زیرکوئری min_price در لیست‌ها فقط واریانت‌های فعال را می‌خواند
+            models.Index(
+                fields=["product", "price_override"],
+                name="variation_active_price_idx",
+                condition=models.Q(is_active=True),
+            ),
         ]
 
     def __str__(self):
@@ -278,3 +303,150 @@ class ProductVariation(models.Model):
     @property
     def final_price(self):
         return self.price_override or self.product.base_final_price
+
+
+class ImageJob(models.Model):
+    """
+    صف پردازش تصویر (دیتابیس‌محور).
+    هر رکورد یعنی ساخت نسخه‌های کوچک‌شده (derivative) از یک فیلد تصویر؛
+    ورکر پس‌زمینه (manage.py run_image_worker) آن را برمی‌دارد و اجرا می‌کند.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", _("در صف")
+        RUNNING = "running", _("در حال پردازش")
+        DONE = "done", _("انجام شد")
+        FAILED = "failed", _("ناموفق")
+
+    content_type = models.ForeignKey(
+        "contenttypes.ContentType", on_delete=models.CASCADE, related_name="+"
+    )
+    object_id = models.PositiveBigIntegerField()
+    field_name = models.CharField(_("فیلد تصویر"), max_length=64)
+    source = models.CharField(_("فایل مبدأ"), max_length=255)
+
+    status = models.CharField(
+        _("وضعیت"), max_length=16, choices=Status.choices, default=Status.PENDING
+    )
+    progress = models.PositiveSmallIntegerField(_("پیشرفت (٪)"), default=0)
+    attempts = models.PositiveSmallIntegerField(_("تعداد تلاش"), default=0)
+    max_attempts = models.PositiveSmallIntegerField(_("حداکثر تلاش"), default=3)
+    derivatives = models.JSONField(_("نسخه‌های ساخته‌شده"), default=dict, blank=True)
+    error = models.TextField(_("خطا"), blank=True)
+
+    run_after = models.DateTimeField(_("اجرا پس از"), default=timezone.now)
+    # شروع اجرای فعلی؛ کار RUNNING قدیمی‌تر از IMAGE_JOB_LEASE_SECONDS دوباره برداشته می‌شود
+    started_at = models.DateTimeField(_("شروع اجرا"), null=True, blank=True)
+    created_at = models.DateTimeField(_("ساخته‌شده"), auto_now_add=True)
+    updated_at = models.DateTimeField(_("به‌روزرسانی"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("کار پردازش تصویر")
+        verbose_name_plural = _("کارهای پردازش تصویر")
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "run_after"]),
+            models.Index(fields=["content_type", "object_id"]),
+            models.Index(fields=["source"]),
+        ]
+
+    def __str__(self):
+        return f"{self.source} — {self.get_status_display()}"
+
+
+class ProductCooccurrence(models.Model):
+    """
+    ماتریس هم‌خریدی تُنُک (products.recommendations): تعداد سفارش‌های پرداخت‌شده
+    که هر دو محصول را دارند، فقط برای product_a <= product_b.
+    قطر (product_a == product_b) تعداد سفارش‌های خود محصول است.
+    """
+
+    product_a = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="+", db_index=False
+    )
+    product_b = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+")
+    orders = models.PositiveIntegerField(_("تعداد سفارش"), default=0)
+
+    class Meta:
+        verbose_name = _("هم‌خریدی محصولات")
+        verbose_name_plural = _("هم‌خریدی محصولات")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product_a", "product_b"], name="cooccurrence_pair_uniq"
+            ),
+        ]
+
+
+class ProductNeighbor(models.Model):
+    """
+    top-K همسایه‌های هر محصول، از پیش محاسبه‌شده؛ صفحهٔ محصول فقط همین جدول را
+    با (product, kind, rank) می‌خواند.
+    """
+
+    class Kind(models.TextChoices):
+        BOUGHT_TOGETHER = "bought", _("خریداری‌شده با هم")
+        SIMILAR = "similar", _("مشابه")
+
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name="neighbors",
+        verbose_name=_("محصول"),
+    )
+    neighbor = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name=_("محصول مرتبط"),
+    )
+    kind = models.CharField(_("نوع"), max_length=16, choices=Kind.choices)
+    rank = models.PositiveSmallIntegerField(_("رتبه"))
+    score = models.FloatField(_("امتیاز"))
+
+    class Meta:
+        verbose_name = _("محصول مرتبط")
+        verbose_name_plural = _("محصولات مرتبط")
+        ordering = ["product", "kind", "rank"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product", "kind", "rank"], name="product_neighbor_rank_uniq"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} → {self.neighbor_id} ({self.kind} #{self.rank})"
+
+
+class NeighborBuild(models.Model):
+    """وضعیت آخرین ساخت هر نوع همسایه (برای به‌روزرسانی افزایشی)."""
+
+    kind = models.CharField(_("نوع"), max_length=16, unique=True)
+    # بزرگ‌ترین شناسهٔ سفارشی که شمرده شده است
+    watermark = models.BigIntegerField(_("نشانگر پیشرفت"), default=0)
+    orders = models.PositiveBigIntegerField(_("تعداد سفارش‌های شمرده‌شده"), default=0)
+    built_at = models.DateTimeField(_("آخرین ساخت"), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _("ساخت محصولات مرتبط")
+        verbose_name_plural = _("ساخت محصولات مرتبط")
+
+    def __str__(self):
+        return f"{self.kind} @ {self.watermark}"
+
+
+class CatalogVersion(models.Model):
+    """
+    نسخهٔ کاتالوگ برای کش صفحه و ETag (Shop.page_cache)؛ یک ردیف با pk=1.
+    در دیتابیس است تا bump از هر پروسه (ورکر وب یا management command) به
+    همهٔ پروسه‌ها برسد.
+    """
+
+    version = models.BigIntegerField(_("نسخه"), default=0)
+    changed_at = models.DateTimeField(_("آخرین تغییر"), default=timezone.now)
+
+    class Meta:
+        verbose_name = _("نسخهٔ کاتالوگ")
+        verbose_name_plural = _("نسخهٔ کاتالوگ")
+
+    def __str__(self):
+        return f"v{self.version}"
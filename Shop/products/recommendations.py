@@ -0,0 +1,420 @@
+"""
+«معمولاً با هم خریده می‌شوند»: همسایه‌های هر محصول از تاریخچهٔ سفارش‌ها.
+
+- کار آفلاین (build_product_neighbors): سبد محصولات سفارش‌های پرداخت‌شده
+  دسته‌دسته خوانده می‌شود و ماتریس هم‌خریدی C = Xᵀ·X (X: سفارش × محصول، دودویی)
+  با scipy.sparse ساخته می‌شود؛ بدون SciPy همان شمارش با دیکشنری انجام می‌شود.
+- شمارش‌ها در ProductCooccurrence جمع می‌شوند؛ اجرای بعدی فقط سفارش‌های
+  جدیدتر از NeighborBuild.watermark را اضافه می‌کند و top-K را فقط برای
+  محصولاتی که در آن سفارش‌ها بوده‌اند دوباره می‌سازد (--full همه را).
+- امتیاز: lift = c·N / (n_a·n_b) یا jaccard = c / (n_a + n_b − c).
+- ساخت افزایشی برای محصول دست‌نخوردهٔ a (بدون سفارش جدید): c و n_a ثابت‌اند،
+  پس امتیاز هر کاندید b فقط وقتی عوض می‌شود که n_b بزرگ شده باشد و آن هم فقط
+  کم می‌شود. پس کافی است لیست‌هایی که یک محصول touched را دارند هم دوباره
+  ساخته شوند؛ ترتیب بقیه دقیقاً همان ساخت کامل است. N در یک لیست ضریب ثابت
+  است، پس فقط مقدار ذخیره‌شدهٔ lift لیست‌های دست‌نخورده با N ساخت خودشان
+  است (برای مقایسه بین لیست‌ها --full).
+- سفارش‌هایی که هنوز در پنجرهٔ settle_hours هستند شمرده نمی‌شوند تا وضعیت
+  پرداختشان قطعی شود؛ سفارشی که بعد از آن پرداخت شود در ساخت افزایشی دیده
+  نمی‌شود (ساخت کامل دوره‌ای آن را هم می‌شمارد).
+- سفارش‌های بایگانی‌شده (orders.archive) هم شمرده می‌شوند؛ اقلامشان از
+  payload فشرده خوانده و variation به محصول نگاشت می‌شود (variation حذف‌شده
+  نادیده گرفته می‌شود).
+- صفحهٔ محصول با neighbors_for فقط یک کوئری روی (product, kind, rank) می‌زند.
+"""
+
+import heapq
+from dataclasses import dataclass, field
+from datetime import timedelta
+from itertools import combinations
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max, Q
+from django.utils import timezone
+
+from .models import (
+    NeighborBuild,
+    Product,
+    ProductCooccurrence,
+    ProductNeighbor,
+    ProductVariation,
+)
+from .signals import catalog_changed
+
+try:
+    import numpy as np
+    from scipy import sparse
+
+    HAS_SCIPY = True
+except Exception:
+    np = None
+    sparse = None
+    HAS_SCIPY = False
+
+try:
+    from orders.archive import unpack
+    from orders.models import ArchivedOrder, Order, OrderItem
+    from orders.stats import SPENT_STATUSES
+
+    HAS_ORDERS = True
+except Exception:
+    ArchivedOrder = Order = OrderItem = unpack = None
+    SPENT_STATUSES = ()
+    HAS_ORDERS = False
+
+METRICS = ("lift", "jaccard")
+DEFAULTS = {
+    "top_k": 8,
+    "metric": "lift",
+    # جفت‌هایی که کمتر از این تعداد سفارش مشترک دارند نویز حساب می‌شوند
+    "min_pair_orders": 2,
+    "settle_hours": 48,
+    "batch_size": 2000,
+}
+WRITE_CHUNK = 500
+
+
+def _conf():
+    return {**DEFAULTS, **getattr(settings, "PRODUCT_NEIGHBORS", {})}
+
+
+def neighbors_for(product_id, kinds=None, limit=None):
+    """
+    {kind: [محصولات فعال مرتبط به ترتیب rank]} برای همهٔ kinds در یک کوئری؛
+    هر لیست ذخیره‌شده حداکثر top_k ردیف دارد.
+    """
+    kinds = list(kinds or ProductNeighbor.Kind.values)
+    limit = limit or _conf()["top_k"]
+    rows = (
+        ProductNeighbor.objects.filter(
+            product_id=product_id, kind__in=kinds, neighbor__is_active=True
+        )
+        .select_related("neighbor")
+        .only(
+            "kind",
+            "rank",
+            "neighbor__id",
+            "neighbor__name",
+            "neighbor__slug",
+            "neighbor__price",
+            "neighbor__discount_price",
+            "neighbor__image",
+            "neighbor__image_width",
+            "neighbor__image_height",
+            "neighbor__image_placeholder",
+            "neighbor__image_variants",
+        )
+        .order_by("kind", "rank")
+    )
+    grouped = {kind: [] for kind in kinds}
+    for row in rows:
+        if len(grouped[row.kind]) < limit:
+            grouped[row.kind].append(row.neighbor)
+    return grouped
+
+
+# ---------------------------------------------------------------------------
+# خواندن سبدها و شمارش
+
+
+def _baskets(after_id: int, upto_id: int, batch_size: int):
+    """
+    دسته‌های [(order_id, {product_id, ...}), ...] برای سفارش‌های پرداخت‌شده
+    با after_id < id <= upto_id، به ترتیب id.
+    """
+    orders = Order.objects.filter(
+        id__gt=after_id, id__lte=upto_id, status__in=SPENT_STATUSES
+    ).order_by("id")
+    last = after_id
+    while True:
+        ids = list(orders.filter(id__gt=last).values_list("id", flat=True)[:batch_size])
+        if not ids:
+            break
+        last = ids[-1]
+        baskets = {}
+        rows = (
+            OrderItem.objects.filter(order_id__in=ids)
+            .values_list("order_id", "variation__product_id")
+            .iterator(chunk_size=5000)
+        )
+        for order_id, product_id in rows:
+            baskets.setdefault(order_id, set()).add(product_id)
+        yield list(baskets.items())
+    yield from _archived_baskets(after_id, upto_id, batch_size)
+
+
+def _archived_baskets(after_id: int, upto_id: int, batch_size: int):
+    """همان _baskets برای ArchivedOrder؛ اقلام از payload خوانده می‌شوند."""
+    archived = ArchivedOrder.objects.filter(
+        id__gt=after_id, id__lte=upto_id, status__in=SPENT_STATUSES
+    ).order_by("id")
+    last = after_id
+    while True:
+        rows = list(
+            archived.filter(id__gt=last).values_list("id", "payload")[:batch_size]
+        )
+        if not rows:
+            return
+        last = rows[-1][0]
+        variations = {}
+        for order_id, payload in rows:
+            items = unpack(ArchivedOrder(payload=payload))["items"]
+            variations[order_id] = {item["variation_id"] for item in items}
+        products = dict(
+            ProductVariation.objects.filter(
+                id__in=set().union(*variations.values())
+            ).values_list("id", "product_id")
+        )
+        baskets = [
+            (order_id, {products[v] for v in vids if v in products})
+            for order_id, vids in variations.items()
+        ]
+        yield [(order_id, basket) for order_id, basket in baskets if basket]
+
+
+@dataclass
+class PairCounts:
+    orders: int = 0
+    # (a, b) با a <= b => تعداد؛ قطر = تعداد سفارش‌های محصول
+    pairs: dict = field(default_factory=dict)
+
+    def products(self) -> set:
+        return {a for a, b in self.pairs if a == b}
+
+
+def _count_python(batches) -> PairCounts:
+    counts = PairCounts()
+    pairs = counts.pairs
+    for batch in batches:
+        for _order_id, products in batch:
+            counts.orders += 1
+            ordered = sorted(products)
+            for pid in ordered:
+                pairs[(pid, pid)] = pairs.get((pid, pid), 0) + 1
+            for pair in combinations(ordered, 2):
+                pairs[pair] = pairs.get(pair, 0) + 1
+    return counts
+
+
+def _count_scipy(batches, size: int) -> PairCounts:
+    counts = PairCounts()
+    total = sparse.csr_matrix((size, size), dtype=np.int64)
+    for batch in batches:
+        rows, cols = [], []
+        for row, (_order_id, products) in enumerate(batch):
+            rows.extend([row] * len(products))
+            cols.extend(products)
+        counts.orders += len(batch)
+        incidence = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.int64), (rows, cols)),
+            shape=(len(batch), size),
+        )
+        total = total + (incidence.T @ incidence)
+    upper = sparse.triu(total).tocoo()
+    counts.pairs = {
+        (int(a), int(b)): int(c)
+        for a, b, c in zip(upper.row, upper.col, upper.data)
+        if c
+    }
+    return counts
+
+
+def count_pairs(after_id: int, upto_id: int, batch_size: int) -> PairCounts:
+    batches = _baskets(after_id, upto_id, batch_size)
+    if HAS_SCIPY:
+        size = (Product.objects.aggregate(m=Max("id"))["m"] or 0) + 1
+        return _count_scipy(batches, size)
+    return _count_python(batches)
+
+
+def _merge_counts(delta: PairCounts):
+    """جمع delta با شمارش‌های ذخیره‌شده (upsert دسته‌ای)."""
+    items = list(delta.pairs.items())
+    for start in range(0, len(items), WRITE_CHUNK):
+        chunk = dict(items[start : start + WRITE_CHUNK])
+        # ابرمجموعه‌ای از جفت‌ها با دو IN؛ جفت‌های اضافه نادیده گرفته می‌شوند
+        existing = dict(
+            ((a, b), n)
+            for a, b, n in ProductCooccurrence.objects.filter(
+                product_a_id__in={a for a, _b in chunk},
+                product_b_id__in={b for _a, b in chunk},
+            ).values_list("product_a_id", "product_b_id", "orders")
+        )
+        ProductCooccurrence.objects.bulk_create(
+            [
+                ProductCooccurrence(
+                    product_a_id=a, product_b_id=b, orders=existing.get((a, b), 0) + n
+                )
+                for (a, b), n in chunk.items()
+            ],
+            update_conflicts=True,
+            unique_fields=["product_a", "product_b"],
+            update_fields=["orders"],
+        )
+
+
+# ---------------------------------------------------------------------------
+# امتیاز و top-K
+
+
+def _score(metric: str, together, n_self, n_other, total):
+    if metric == "jaccard":
+        return together / (n_self + n_other - together)
+    return together * total / (n_self * n_other)
+
+
+def _top_k_numpy(candidates, n_self, order_counts, metric, total, k):
+    others = np.fromiter((o for o, _c in candidates), dtype=np.int64)
+    together = np.fromiter((c for _o, c in candidates), dtype=np.float64)
+    n_other = np.fromiter((order_counts[o] for o in others.tolist()), dtype=np.float64)
+    scores = _score(metric, together, float(n_self), n_other, float(total))
+    # امتیاز نزولی، بعد تعداد مشترک نزولی، بعد id صعودی (مثل مسیر پایتونی)
+    keep = np.lexsort((others, -together, -scores))[:k]
+    return [(int(others[i]), float(scores[i])) for i in keep]
+
+
+def _top_k_python(candidates, n_self, order_counts, metric, total, k):
+    scored = (
+        (_score(metric, c, n_self, order_counts[o], total), c, -o)
+        for o, c in candidates
+    )
+    return [(-neg_id, s) for s, _c, neg_id in heapq.nlargest(k, scored)]
+
+
+def rebuild_neighbors(product_ids, metric: str, k: int, min_pair: int, total: int):
+    """top-K همسایهٔ خریدی product_ids را از ProductCooccurrence بازنویسی می‌کند."""
+    kind = ProductNeighbor.Kind.BOUGHT_TOGETHER
+    active = set(Product.objects.filter(is_active=True).values_list("id", flat=True))
+    top_k = _top_k_numpy if HAS_SCIPY else _top_k_python
+    written = 0
+    product_ids = sorted(product_ids)
+    for start in range(0, len(product_ids), WRITE_CHUNK):
+        ids = product_ids[start : start + WRITE_CHUNK]
+        candidates = {pid: [] for pid in ids}
+        involved = set(ids)
+        rows = (
+            ProductCooccurrence.objects.filter(
+                Q(product_a_id__in=ids) | Q(product_b_id__in=ids),
+                orders__gte=min_pair,
+            )
+            .exclude(product_a_id=F("product_b_id"))
+            .values_list("product_a_id", "product_b_id", "orders")
+        )
+        for a, b, together in rows.iterator(chunk_size=5000):
+            for own, other in ((a, b), (b, a)):
+                if own in candidates and other in active:
+                    candidates[own].append((other, together))
+                    involved.add(other)
+        order_counts = dict(
+            ProductCooccurrence.objects.filter(
+                product_a_id__in=involved, product_b_id=F("product_a_id")
+            ).values_list("product_a_id", "orders")
+        )
+
+        neighbors = []
+        for pid, cands in candidates.items():
+            if not cands or not order_counts.get(pid):
+                continue
+            ranked = top_k(cands, order_counts[pid], order_counts, metric, total, k)
+            neighbors.extend(
+                ProductNeighbor(
+                    product_id=pid, neighbor_id=other, kind=kind, rank=rank, score=score
+                )
+                for rank, (other, score) in enumerate(ranked, 1)
+            )
+        with transaction.atomic():
+            ProductNeighbor.objects.filter(product_id__in=ids, kind=kind).delete()
+            ProductNeighbor.objects.bulk_create(neighbors, batch_size=WRITE_CHUNK)
+        written += len(neighbors)
+    return written
+
+
+# ---------------------------------------------------------------------------
+# ساخت کامل / افزایشی
+
+
+def _lists_containing(product_ids, kind) -> set:
+    """محصولاتی که یکی از product_ids در لیست همسایه‌شان است."""
+    product_ids = sorted(product_ids)
+    owners = set()
+    for start in range(0, len(product_ids), WRITE_CHUNK):
+        owners.update(
+            ProductNeighbor.objects.filter(
+                kind=kind, neighbor_id__in=product_ids[start : start + WRITE_CHUNK]
+            ).values_list("product_id", flat=True)
+        )
+    return owners
+
+
+@dataclass
+class NeighborBuildResult:
+    full: bool
+    orders: int = 0
+    products: int = 0
+    neighbors: int = 0
+    watermark: int = 0
+    engine: str = "scipy" if HAS_SCIPY else "python"
+
+
+def build_bought_together(
+    full: bool = False,
+    metric: str | None = None,
+    top_k: int | None = None,
+    min_pair_orders: int | None = None,
+    batch_size: int | None = None,
+) -> NeighborBuildResult:
+    if not HAS_ORDERS:
+        raise RuntimeError("اپ orders در دسترس نیست.")
+    conf = _conf()
+    metric = metric or conf["metric"]
+    if metric not in METRICS:
+        raise ValueError(f"unknown metric: {metric}")
+    top_k = top_k or conf["top_k"]
+    min_pair = conf["min_pair_orders"] if min_pair_orders is None else min_pair_orders
+    batch_size = batch_size or conf["batch_size"]
+    kind = ProductNeighbor.Kind.BOUGHT_TOGETHER
+
+    state, _created = NeighborBuild.objects.get_or_create(kind=kind)
+    if full:
+        state.watermark, state.orders = 0, 0
+
+    settled = timezone.now() - timedelta(hours=conf["settle_hours"])
+    upto = Order.objects.filter(created_at__lt=settled).aggregate(m=Max("id"))["m"]
+    # اگر همهٔ سفارش‌ها بایگانی شده باشند سقف از بایگانی می‌آید
+    archived = ArchivedOrder.objects.aggregate(m=Max("id"))["m"]
+    upto = max(upto or 0, archived or 0, state.watermark)
+    delta = count_pairs(state.watermark, upto, batch_size)
+    result = NeighborBuildResult(full=full, orders=delta.orders, watermark=upto)
+
+    with transaction.atomic():
+        if full:
+            ProductCooccurrence.objects.all().delete()
+        _merge_counts(delta)
+        state.watermark = upto
+        state.orders += delta.orders
+        state.built_at = timezone.now()
+        state.save()
+
+    if full:
+        touched = set(
+            ProductCooccurrence.objects.filter(
+                product_a_id=F("product_b_id")
+            ).values_list("product_a_id", flat=True)
+        )
+        # محصولاتی که دیگر هیچ شمارشی ندارند همسایهٔ قدیمی هم نباید داشته باشند
+        ProductNeighbor.objects.filter(kind=kind).exclude(
+            product_id__in=touched
+        ).delete()
+    else:
+        touched = delta.products()
+        touched |= _lists_containing(touched, kind)
+    result.products = len(touched)
+    if touched and state.orders:
+        result.neighbors = rebuild_neighbors(
+            touched, metric, top_k, min_pair, state.orders
+        )
+    if touched:
+        # صفحه‌های این محصولات (کش صفحه، ETag و کش جلویی) باید تازه شوند
+        catalog_changed.send(sender=ProductNeighbor, product_ids=sorted(touched))
+    return result
@@ -0,0 +1,252 @@
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.images import get_image_dimensions
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import Signal, receiver
+from django.urls import reverse
+from django.utils import timezone
+
+from Shop.page_cache import bump_catalog_version, drop_pages
+from Shop.surrogate import (
+    CATALOG_KEY,
+    brand_key,
+    category_key,
+    product_key,
+    schedule_purge,
+)
+
+from .imaging import schedule_image_job
+from .models import (
+    Brand,
+    Category,
+    Color,
+    ImageJob,
+    Product,
+    ProductImage,
+    ProductVariation,
+    Size,
+)
+from .storage import release_blob
+
+# تغییر انبوه کاتالوگ (مثلاً همگام‌سازی موجودی)؛ یک‌بار برای هر دسته ارسال می‌شود.
+# آرگومان‌ها: product_ids (لیست id محصولات)، reason (رشته)،
+# keys (اختیاری؛ کلیدهای surrogate دیگری که باید purge شوند، مثل brand:ID)
+catalog_changed = Signal()
+
+
+def _touches_image(raw, update_fields) -> bool:
+    # save(update_fields=[...]) بدون image (مثل کم کردن موجودی در checkout) به تصویر کاری ندارد
+    if raw:
+        return False
+    return update_fields is None or "image" in update_fields
+
+
+@receiver(pre_save, sender=Product)
+@receiver(pre_save, sender=ProductImage)
+@receiver(pre_save, sender=ProductVariation)
+def remember_old_image(sender, instance, raw=False, update_fields=None, **kwargs):
+    # نام فایل قبلی را نگه می‌داریم تا اگر عوض شد، blob قدیمی آزاد شود
+    instance._old_image_name = None
+    instance._image_changed = False
+    if not _touches_image(raw, update_fields):
+        return
+    old = None
+    if instance.pk:
+        old = (
+            sender._default_manager.filter(pk=instance.pk)
+            .values_list("image", flat=True)
+            .first()
+        )
+    instance._old_image_name = old
+    instance._image_changed = (instance.image.name or None) != old
+    if not instance._image_changed:
+        return
+
+    # نسخه‌های فایل قبلی دیگر معتبر نیستند؛ ورکر برای فایل جدید می‌سازد
+    variants = getattr(sender, "IMAGE_VARIANTS_FIELD", None)
+    if variants:
+        setattr(instance, variants, {})
+
+    # ابعاد از هدر فایل خوانده می‌شود (ارزان)؛ placeholder را ورکر می‌سازد
+    meta = getattr(sender, "IMAGE_META_FIELDS", None)
+    if meta:
+        w_field, h_field, p_field = meta
+        width = height = None
+        if instance.image:
+            try:
+                width, height = get_image_dimensions(instance.image)
+            except Exception:
+                pass
+        setattr(instance, w_field, width)
+        setattr(instance, h_field, height)
+        setattr(instance, p_field, "")
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_save, sender=ProductVariation)
+def queue_image_derivatives(sender, instance, raw=False, **kwargs):
+    # هنگام loaddata (raw) یا save بدون تغییر تصویر کاری نمی‌کنیم
+    if raw or not getattr(instance, "_image_changed", False):
+        return
+    if instance.image:
+        schedule_image_job(instance, "image")
+
+    old = getattr(instance, "_old_image_name", None)
+    if old and old != (instance.image.name if instance.image else ""):
+        transaction.on_commit(lambda: release_blob(old))
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_delete, sender=ProductVariation)
+def release_deleted_image(sender, instance, **kwargs):
+    ImageJob.objects.filter(
+        content_type=ContentType.objects.get_for_model(sender),
+        object_id=instance.pk,
+    ).delete()
+    if instance.image:
+        name = instance.image.name
+        transaction.on_commit(lambda: release_blob(name))
+
+
+# save(update_fields=...) فقط با این فیلدها (کم کردن موجودی در checkout)
+STOCK_ONLY_FIELDS = frozenset({"stock", "updated_at"})
+
+
+def _stock_only(update_fields) -> bool:
+    return update_fields is not None and set(update_fields) <= STOCK_ONLY_FIELDS
+
+
+def _stock_changed(product_ids):
+    # updated_at محصول = اعتبارسنج ETag صفحهٔ محصول (Shop.conditional)؛ update بدون سیگنال
+    Product.objects.filter(pk__in=product_ids).update(updated_at=timezone.now())
+    _drop_product_pages(product_ids)
+
+
+def _drop_product_pages(product_ids):
+    slugs = (
+        Product.objects.filter(pk__in=product_ids)
+        .order_by()
+        .values_list("slug", flat=True)
+    )
+    drop_pages("products:detail", [reverse("products:detail", args=[s]) for s in slugs])
+
+
+def bump_unless_stock_only(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    تغییر موجودی تنوع فقط صفحهٔ همان محصول را عوض می‌کند؛ bump نسخه همهٔ کش
+    صفحه‌ها، ETagها و فید را باطل می‌کرد. به‌جایش updated_at محصول تازه و کش
+    صفحه‌اش پاک می‌شود؛ CDN را purge_variation_pages پاک می‌کند.
+    لیست‌ها (فیلتر «موجود») تا پایان TTL کش خود ممکن است کهنه بمانند.
+    """
+    if raw or not _stock_only(update_fields):
+        bump_catalog_version()
+        return
+    product_ids = [instance.product_id]
+    transaction.on_commit(lambda: _stock_changed(product_ids))
+
+
+# هر تغییر کاتالوگ نسخهٔ کش صفحه‌های مهمان را بالا می‌برد (Shop.page_cache)
+CATALOG_MODELS = (Product, ProductImage, ProductVariation, Category, Brand, Color, Size)
+for _model in CATALOG_MODELS:
+    post_save.connect(
+        bump_unless_stock_only if _model is ProductVariation else bump_catalog_version,
+        sender=_model,
+        dispatch_uid=f"page_cache_save_{_model.__name__}",
+    )
+    post_delete.connect(
+        bump_catalog_version,
+        sender=_model,
+        dispatch_uid=f"page_cache_delete_{_model.__name__}",
+    )
+catalog_changed.connect(bump_catalog_version, dispatch_uid="page_cache_catalog_changed")
+
+
+# فیلدهایی که عضویت یا ترتیب لیست‌ها را عوض می‌کنند (فیلتر دسته/برند، مرتب‌سازی
+# قیمت/نام، min_price تنوع‌ها)؛ صفحه‌های دیگر لیست را product:ID پوشش نمی‌دهد
+LISTING_FIELDS = {
+    Product: ("name", "price", "discount_price", "is_active", "brand", "category"),
+    ProductVariation: ("price_override", "is_active"),
+}
+
+
+@receiver(pre_save, sender=Product)
+@receiver(pre_save, sender=ProductVariation)
+def remember_old_listing(sender, instance, raw=False, update_fields=None, **kwargs):
+    # مقدار قبلی برای purge کلیدهای قدیمی (برند/دستهٔ قبلی) و تشخیص تغییر لیست
+    instance._old_listing = None
+    fields = LISTING_FIELDS[sender]
+    if raw or not instance.pk:
+        return
+    if update_fields is not None and not set(update_fields) & set(fields):
+        return
+    attnames = [sender._meta.get_field(f).attname for f in fields]
+    instance._old_listing = (
+        sender._default_manager.filter(pk=instance.pk).values(*attnames).first()
+    )
+
+
+def _listing_changed(instance) -> bool:
+    old = getattr(instance, "_old_listing", None)
+    return bool(old) and any(getattr(instance, a) != v for a, v in old.items())
+
+
+def _taxonomy_keys(brand_id, category_id):
+    return [
+        brand_key(brand_id) if brand_id else None,
+        category_key(category_id) if category_id else None,
+    ]
+
+
+# purge انتخابی کش جلویی (Shop.surrogate)؛ کلیدها بعد از commit یک‌جا فرستاده می‌شوند
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def purge_product_pages(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    keys = [
+        product_key(instance.pk),
+        *_taxonomy_keys(instance.brand_id, instance.category_id),
+    ]
+    old = getattr(instance, "_old_listing", None)
+    if old:
+        # محصول از صفحهٔ برند/دستهٔ قبلی هم باید برود
+        keys += _taxonomy_keys(old["brand_id"], old["category_id"])
+    if created or kwargs.get("signal") is post_delete or _listing_changed(instance):
+        # صفحهٔ اصلی و همهٔ لیست‌ها (برچسب catalog دارند) عوض می‌شوند
+        keys.append(CATALOG_KEY)
+    schedule_purge(keys)
+
+
+@receiver(post_save, sender=ProductVariation)
+@receiver(post_delete, sender=ProductVariation)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def purge_variation_pages(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    keys = [product_key(instance.product_id)]
+    if sender is ProductVariation and (
+        created or kwargs.get("signal") is post_delete or _listing_changed(instance)
+    ):
+        # لیست‌ها min_price تنوع‌های فعال را نشان می‌دهند و بر اساسش مرتب می‌کنند
+        keys.append(CATALOG_KEY)
+    schedule_purge(keys)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Brand)
+@receiver(post_delete, sender=Brand)
+def purge_taxonomy_pages(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    own = category_key if sender is Category else brand_key
+    # دسته‌ها و برندها در منوی همهٔ صفحه‌ها هستند
+    schedule_purge([own(instance.pk), CATALOG_KEY])
+
+
+@receiver(catalog_changed)
+def purge_changed_products(sender, product_ids=(), keys=(), **kwargs):
+    schedule_purge([*(product_key(pk) for pk in product_ids), *keys])
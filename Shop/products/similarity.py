@@ -0,0 +1,392 @@
+"""
+«محصولات مشابه» بر اساس محتوا، برای محصولاتی که هنوز فروشی ندارند.
+
+- هر محصول فعال یک بردار ویژگی دارد: دسته (و والد دسته با وزن کمتر)، برند،
+  بازهٔ قیمت (لگاریتمی؛ بازه‌های مجاور با وزن نصف)، رنگ‌ها و سایزهای فعال.
+  هر بلوک جدا نرمال و با BLOCK_WEIGHTS وزن‌دهی می‌شود و کل بردار نرمال است،
+  پس ضرب داخلی همان شباهت کسینوسی است.
+- با NumPy: ماتریس float32 (محصول × ویژگی) و ضرب دسته‌ای S = Q·Mᵀ برای
+  batch_size ردیف در هر بار، با argpartition برای top-K؛ حافظه
+  O(N·D + batch·N). با workers > 1 دسته‌ها بین پروسه‌ها تقسیم می‌شوند.
+  بدون NumPy: ایندکس معکوس ویژگی‌ها (فقط برای کاتالوگ کوچک مناسب است).
+- وابستگی اختیاری: pip install numpy (و threadpoolctl برای workers > 1)؛
+  موتور استفاده‌شده در خروجی build_similar_products چاپ می‌شود.
+- افزایشی: محصولاتی که از ساخت قبلی تغییر کرده‌اند (خودشان یا واریانت‌ها)
+  دوباره حساب می‌شوند، به‌علاوهٔ محصولاتی که یکی از آن‌ها را در لیست دارند یا
+  شباهتشان به آن‌ها از کمترین امتیاز لیست فعلی‌شان بیشتر است. اگر بیش از
+  full_ratio از کاتالوگ تغییر کرده باشد، یافتن متأثرها (changed × N) گران‌تر از
+  ساخت کامل است و ساخت کامل انجام می‌شود.
+- نتیجه در ProductNeighbor با kind=similar.
+"""
+
+import heapq
+import math
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import NeighborBuild, Product, ProductNeighbor, ProductVariation
+from .signals import catalog_changed
+
+try:
+    import numpy as np
+
+    HAS_NUMPY = True
+except Exception:
+    np = None
+    HAS_NUMPY = False
+
+try:
+    from threadpoolctl import threadpool_limits
+except Exception:
+    threadpool_limits = None
+
+KIND = ProductNeighbor.Kind.SIMILAR
+BLOCK_WEIGHTS = {"category": 3.0, "brand": 1.5, "price": 1.5, "color": 1.0, "size": 0.5}
+DEFAULTS = {
+    "top_k": 8,
+    "min_score": 0.2,
+    # هر بازهٔ قیمت یک ضریب ثابت (۱.۵ برابر) است تا مرزها با تغییر کاتالوگ جابه‌جا نشوند
+    "price_band_ratio": 1.5,
+    "batch_size": 512,
+    "workers": 1,
+    # سهم تغییرکرده‌ها از کاتالوگ که بالاتر از آن ساخت افزایشی به کامل تبدیل می‌شود
+    "full_ratio": 0.2,
+    # بدون NumPy سقف سخت‌گیرانه‌تر است (حلقهٔ پایتونی روی همهٔ محصولات)
+    "python_full_ratio": 0.02,
+}
+WRITE_CHUNK = 500
+
+
+def _conf():
+    return {**DEFAULTS, **getattr(settings, "PRODUCT_SIMILARITY", {})}
+
+
+# ---------------------------------------------------------------------------
+# بردار ویژگی
+
+
+def price_band(price, ratio: float) -> int:
+    price = float(price or 0)
+    return int(math.floor(math.log(price) / math.log(ratio))) if price > 0 else -1
+
+
+def product_features(
+    category_id, parent_id, brand_id, price, colors, sizes, ratio: float
+) -> dict:
+    """{(بلوک، مقدار): وزن} برای یک محصول، قبل از نرمال‌سازی."""
+    features = {("category", category_id): 1.0}
+    if parent_id:
+        features[("category", parent_id)] = 0.5
+    if brand_id:
+        features[("brand", brand_id)] = 1.0
+    band = price_band(price, ratio)
+    if band >= 0:
+        features[("price", band)] = 1.0
+        features[("price", band - 1)] = 0.5
+        features[("price", band + 1)] = 0.5
+    for color_id in colors:
+        features[("color", color_id)] = 1.0
+    for size_id in sizes:
+        features[("size", size_id)] = 1.0
+    return features
+
+
+def normalize(features: dict) -> dict:
+    """نرمال هر بلوک، وزن بلوک، و در آخر نرمال کل بردار."""
+    norms = {}
+    for (block, _v), w in features.items():
+        norms[block] = norms.get(block, 0.0) + w * w
+    out = {}
+    for (block, value), w in features.items():
+        out[(block, value)] = (
+            w / math.sqrt(norms[block]) * math.sqrt(BLOCK_WEIGHTS[block])
+        )
+    total = math.sqrt(sum(w * w for w in out.values())) or 1.0
+    return {key: w / total for key, w in out.items()}
+
+
+def load_catalog(ratio: float):
+    """(ids، لیست بردارهای نرمال) برای همهٔ محصولات فعال، به ترتیب id."""
+    colors, sizes = {}, {}
+    rows = (
+        ProductVariation.objects.filter(is_active=True, product__is_active=True)
+        .values_list("product_id", "color_id", "size_id")
+        .iterator(chunk_size=5000)
+    )
+    for product_id, color_id, size_id in rows:
+        if color_id:
+            colors.setdefault(product_id, set()).add(color_id)
+        if size_id:
+            sizes.setdefault(product_id, set()).add(size_id)
+
+    ids, vectors = [], []
+    products = (
+        Product.objects.filter(is_active=True)
+        .values_list(
+            "id",
+            "category_id",
+            "category__parent_id",
+            "brand_id",
+            "price",
+            "discount_price",
+        )
+        .order_by("id")
+        .iterator(chunk_size=5000)
+    )
+    for pk, category_id, parent_id, brand_id, price, discount in products:
+        ids.append(pk)
+        vectors.append(
+            normalize(
+                product_features(
+                    category_id,
+                    parent_id,
+                    brand_id,
+                    discount or price,
+                    colors.get(pk, ()),
+                    sizes.get(pk, ()),
+                    ratio,
+                )
+            )
+        )
+    return ids, vectors
+
+
+def build_matrix(vectors):
+    """ماتریس float32 (N × D) از بردارهای دیکشنری."""
+    columns = {}
+    for vec in vectors:
+        for key in vec:
+            columns.setdefault(key, len(columns))
+    matrix = np.zeros((len(vectors), max(len(columns), 1)), dtype=np.float32)
+    for row, vec in enumerate(vectors):
+        for key, w in vec.items():
+            matrix[row, columns[key]] = w
+    return matrix
+
+
+# ---------------------------------------------------------------------------
+# top-K
+
+
+def _top_k_block(matrix, rows, k: int, min_score: float):
+    """[(row, [(col, score), ...]), ...] برای ردیف‌های rows (آرایهٔ اندیس)."""
+    sims = matrix[rows] @ matrix.T
+    sims[np.arange(len(rows)), rows] = -1.0  # خود محصول
+    k = min(k, matrix.shape[0] - 1)
+    if k <= 0:
+        return [(int(r), []) for r in rows]
+    idx = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+    part = np.take_along_axis(sims, idx, axis=1)
+    order = np.argsort(-part, axis=1, kind="stable")
+    idx = np.take_along_axis(idx, order, axis=1)
+    part = np.take_along_axis(part, order, axis=1)
+    out = []
+    for r, cols, scores in zip(rows.tolist(), idx.tolist(), part.tolist()):
+        out.append((r, [(c, s) for c, s in zip(cols, scores) if s >= min_score]))
+    return out
+
+
+_WORKER = {}
+
+
+def _init_worker(matrix, k, min_score):
+    if threadpool_limits is not None:
+        # هر پروسه یک هسته؛ موازی‌سازی با خود pool است
+        threadpool_limits(1)
+    _WORKER.update(matrix=matrix, k=k, min_score=min_score)
+
+
+def _worker_block(rows):
+    return _top_k_block(_WORKER["matrix"], rows, _WORKER["k"], _WORKER["min_score"])
+
+
+def iter_top_k(matrix, rows, k: int, min_score: float, batch_size: int, workers=1):
+    """
+    top-K برای rows در دسته‌های batch_size؛ ترتیب خروجی همان ترتیب دسته‌هاست.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    blocks = [rows[i : i + batch_size] for i in range(0, len(rows), batch_size)]
+    if workers <= 1 or len(blocks) <= 1:
+        for block in blocks:
+            yield from _top_k_block(matrix, block, k, min_score)
+        return
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(matrix, k, min_score),
+    ) as pool:
+        for result in pool.map(_worker_block, blocks):
+            yield from result
+
+
+def _iter_top_k_python(vectors, rows, k: int, min_score: float):
+    """بدون NumPy: فقط محصولاتی که حداقل یک ویژگی مشترک دارند مقایسه می‌شوند."""
+    postings = {}
+    for row, vec in enumerate(vectors):
+        for key, w in vec.items():
+            postings.setdefault(key, []).append((row, w))
+    for row in rows:
+        scores = {}
+        for key, w in vectors[row].items():
+            for other, ow in postings[key]:
+                if other != row:
+                    scores[other] = scores.get(other, 0.0) + w * ow
+        best = heapq.nlargest(k, scores.items(), key=lambda item: (item[1], -item[0]))
+        yield row, [(c, s) for c, s in best if s >= min_score]
+
+
+# ---------------------------------------------------------------------------
+# ساخت کامل / افزایشی
+
+
+@dataclass
+class SimilarityBuildResult:
+    full: bool
+    products: int = 0
+    changed: int = 0
+    recomputed: int = 0
+    neighbors: int = 0
+    engine: str = "numpy" if HAS_NUMPY else "python"
+
+
+def _current_lists():
+    """{product_id: (کمترین امتیاز، تعداد، {neighbor_id})} از لیست‌های فعلی."""
+    lists = {}
+    rows = (
+        ProductNeighbor.objects.filter(kind=KIND)
+        .values_list("product_id", "neighbor_id", "score")
+        .iterator(chunk_size=10000)
+    )
+    for pid, nid, score in rows:
+        low, count, members = lists.get(pid, (score, 0, set()))
+        members.add(nid)
+        lists[pid] = (min(low, score), count + 1, members)
+    return lists
+
+
+def _affected_rows(matrix, vectors, ids, changed, k, min_score, batch_size):
+    """ردیف‌هایی که لیستشان ممکن است با تغییر changed عوض شده باشد."""
+    row_of = {pk: row for row, pk in enumerate(ids)}
+    lists = _current_lists()
+    affected = {row_of[pk] for pk in changed if pk in row_of}
+    for pid, (_low, _count, members) in lists.items():
+        if pid in row_of and members & changed:
+            affected.add(row_of[pid])
+
+    def threshold(pid):
+        low, count, _members = lists.get(pid, (min_score, 0, set()))
+        return low if count >= k else min_score
+
+    changed_rows = sorted(row_of[pk] for pk in changed if pk in row_of)
+    if not changed_rows:
+        return affected
+    limits = [threshold(pk) for pk in ids]
+    if HAS_NUMPY:
+        limits = np.asarray(limits, dtype=np.float32)
+        for i in range(0, len(changed_rows), batch_size):
+            block = changed_rows[i : i + batch_size]
+            best = (matrix[block] @ matrix.T).max(axis=0)
+            affected.update(np.nonzero(best > limits)[0].tolist())
+    else:
+        for row in changed_rows:
+            vec = vectors[row]
+            for other, other_vec in enumerate(vectors):
+                score = sum(w * other_vec.get(key, 0.0) for key, w in vec.items())
+                if score > limits[other]:
+                    affected.add(other)
+    return affected
+
+
+def _write(ids, results, written_ids):
+    neighbors, product_ids = [], []
+    for row, ranked in results:
+        pid = ids[row]
+        product_ids.append(pid)
+        neighbors.extend(
+            ProductNeighbor(
+                product_id=pid, neighbor_id=ids[col], kind=KIND, rank=rank, score=score
+            )
+            for rank, (col, score) in enumerate(ranked, 1)
+        )
+    with transaction.atomic():
+        ProductNeighbor.objects.filter(product_id__in=product_ids, kind=KIND).delete()
+        ProductNeighbor.objects.bulk_create(neighbors, batch_size=WRITE_CHUNK)
+    written_ids.update(product_ids)
+    return len(neighbors)
+
+
+def build_similar(
+    full: bool = False,
+    top_k: int | None = None,
+    workers: int | None = None,
+    batch_size: int | None = None,
+) -> SimilarityBuildResult:
+    conf = _conf()
+    top_k = top_k or conf["top_k"]
+    workers = workers or conf["workers"]
+    batch_size = batch_size or conf["batch_size"]
+    min_score = conf["min_score"]
+
+    state, _created = NeighborBuild.objects.get_or_create(kind=KIND)
+    since = None if full else state.built_at
+    # زمان شروع، تا تغییرات هم‌زمان با ساخت در دور بعد دیده شوند
+    started = timezone.now()
+
+    ids, vectors = load_catalog(conf["price_band_ratio"])
+    matrix = build_matrix(vectors) if HAS_NUMPY and ids else None
+    if since is None:
+        changed = set(ids)
+    else:
+        changed = set(
+            Product.objects.filter(
+                Q(updated_at__gt=since) | Q(variations__updated_at__gt=since)
+            ).values_list("id", flat=True)
+        )
+    ratio = conf["full_ratio"] if HAS_NUMPY else conf["python_full_ratio"]
+    rebuild_all = since is None or len(changed) > ratio * len(ids)
+    result = SimilarityBuildResult(
+        full=rebuild_all, products=len(ids), changed=len(changed)
+    )
+
+    if rebuild_all:
+        rows = range(len(ids))
+    else:
+        rows = sorted(
+            _affected_rows(matrix, vectors, ids, changed, top_k, min_score, batch_size)
+        )
+    result.recomputed = len(rows)
+
+    if HAS_NUMPY and ids:
+        if workers > 1:
+            # پروسه‌های fork‌شده نباید اتصال دیتابیس والد را به ارث ببرند
+            connections.close_all()
+        results = iter_top_k(matrix, rows, top_k, min_score, batch_size, workers)
+    else:
+        results = _iter_top_k_python(vectors, rows, top_k, min_score)
+
+    written = set()
+    chunk = []
+    for item in results:
+        chunk.append(item)
+        if len(chunk) >= WRITE_CHUNK:
+            result.neighbors += _write(ids, chunk, written)
+            chunk = []
+    if chunk:
+        result.neighbors += _write(ids, chunk, written)
+
+    # محصولات غیرفعال/حذف‌شده لیست مشابه ندارند
+    stale = ProductNeighbor.objects.filter(kind=KIND).exclude(product__is_active=True)
+    stale_ids = set(stale.values_list("product_id", flat=True))
+    stale.delete()
+
+    state.built_at = started
+    state.save(update_fields=["built_at"])
+    touched = written | stale_ids
+    if touched:
+        catalog_changed.send(sender=ProductNeighbor, product_ids=sorted(touched))
+    return result
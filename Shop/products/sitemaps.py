@@ -0,0 +1,292 @@
+"""
+سایت‌مپ تکه‌ای (sharded) برای محصولات، دسته‌ها و برندها.
+
+- هر فایل حداکثر SITEMAP_SHARD_SIZE آدرس دارد (سقف پروتکل: 50,000).
+- ردیف‌ها با values_list(...).iterator(chunk_size) خوانده می‌شوند؛ فقط یک shard در حافظه است.
+- خروجی روی دیسک (SITEMAP_ROOT) کش می‌شود. قبل از ساخت، یک probe ارزان
+  (تعداد + آخرین updated_at) با manifest مقایسه می‌شود؛ اگر تغییری نباشد
+  چیزی ساخته نمی‌شود.
+- در ساخت، هر shard اول فقط از ردیف‌های خام (id، slug، lastmod) اثرانگشت
+  می‌گیرد؛ shardی که اثرانگشتش با manifest یکی است نه reverse می‌شود، نه رندر
+  و نه نوشته. فقط shardهای تغییرکرده XML می‌سازند.
+- ساخت فقط بیرون از درخواست (manage.py build_sitemaps با cron) و با SITEMAP_BASE_URL
+  تنظیم‌شده انجام می‌شود؛ viewها فقط فایل آماده را سرو می‌کنند تا Host درخواست
+  نه آدرس‌ها را عوض کند و نه ساخت کامل را وسط درخواست راه بیندازد.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from datetime import timedelta
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Brand, Category, Product
+
+SHARD_SIZE = 50_000
+SECTIONS = ("products", "categories", "brands")
+MANIFEST_NAME = "manifest.json"
+
+
+def _root() -> str:
+    return str(
+        getattr(settings, "SITEMAP_ROOT", None) or settings.MEDIA_ROOT / "sitemaps"
+    )
+
+
+def _shard_size() -> int:
+    return min(getattr(settings, "SITEMAP_SHARD_SIZE", SHARD_SIZE), SHARD_SIZE)
+
+
+def shard_filename(section: str, page: int) -> str:
+    return f"sitemap-{section}-{page}.xml"
+
+
+def _product_rows():
+    return (
+        Product.objects.filter(is_active=True)
+        .order_by("id")
+        .values_list("id", "slug", "updated_at")
+        .iterator(chunk_size=2000)
+    )
+
+
+def _grouped_rows(model, fk: str, **filters):
+    # lastmod دسته/برند = آخرین تغییر محصولات فعالش (خودشان updated_at ندارند)
+    lastmods = dict(
+        Product.objects.filter(is_active=True)
+        .values_list(fk)
+        .annotate(last=Max("updated_at"))
+        .values_list(fk, "last")
+    )
+    rows = (
+        model.objects.filter(**filters)
+        .order_by("id")
+        .values_list("id", "slug")
+        .iterator(chunk_size=2000)
+    )
+    for pk, slug in rows:
+        yield pk, slug, lastmods.get(pk)
+
+
+# بخش => (ردیف‌های (id, slug, lastmod) به ترتیب id، نام URL)
+SECTION_ROWS = {
+    "products": (_product_rows, "products:detail"),
+    # دستهٔ غیرفعال در view 404 می‌دهد
+    "categories": (
+        lambda: _grouped_rows(Category, "category_id", is_active=True),
+        "products:category",
+    ),
+    "brands": (lambda: _grouped_rows(Brand, "brand_id"), "products:brand"),
+}
+
+
+def _rows_digest(rows) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for pk, slug, lastmod in rows:
+        h.update(f"{pk}|{slug}|{_iso(lastmod)}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+def catalog_probe() -> dict:
+    """
+    چند aggregate ارزان؛ اگر با manifest برابر باشد سایت‌مپ‌ها هنوز معتبرند.
+    """
+    products = Product.objects.filter(is_active=True).aggregate(
+        n=Count("id"), last=Max("updated_at")
+    )
+    categories = Category.objects.filter(is_active=True).aggregate(
+        n=Count("id"), last=Max("id")
+    )
+    brands = Brand.objects.aggregate(n=Count("id"), last=Max("id"))
+    return {
+        "products": [products["n"], _iso(products["last"])],
+        "categories": [categories["n"], categories["last"]],
+        "brands": [brands["n"], brands["last"]],
+    }
+
+
+def _iso(dt):
+    return dt.isoformat() if dt else None
+
+
+def _render_urlset(base_url: str, entries) -> str:
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    ]
+    for path, lastmod in entries:
+        parts.append(f"<url><loc>{escape(base_url + path)}</loc>")
+        if lastmod:
+            parts.append(f"<lastmod>{lastmod.date().isoformat()}</lastmod>")
+        parts.append("</url>\n")
+    parts.append("</urlset>\n")
+    return "".join(parts)
+
+
+def _render_index(base_url: str, shards) -> str:
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    ]
+    for shard in shards:
+        loc = base_url + reverse(
+            "sitemap_section", args=[shard["section"], shard["page"]]
+        )
+        parts.append(f"<sitemap><loc>{escape(loc)}</loc>")
+        if shard["lastmod"]:
+            parts.append(f"<lastmod>{shard['lastmod'][:10]}</lastmod>")
+        parts.append("</sitemap>\n")
+    parts.append("</sitemapindex>\n")
+    return "".join(parts)
+
+
+def _atomic_write(path: str, text: str):
+    # نام موقت یکتا، تا دو ساخت هم‌زمان فایل نیمه‌کارهٔ هم را جابه‌جا نکنند
+    with tempfile.NamedTemporaryFile(
+        "w",
+        encoding="utf-8",
+        dir=os.path.dirname(path),
+        prefix=".tmp-",
+        delete=False,
+    ) as fh:
+        fh.write(text)
+    try:
+        os.chmod(fh.name, 0o644)
+        os.replace(fh.name, path)
+    except BaseException:
+        os.remove(fh.name)
+        raise
+
+
+def _manifest_path() -> str:
+    return os.path.join(_root(), MANIFEST_NAME)
+
+
+def read_manifest():
+    try:
+        with open(_manifest_path(), encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def manifest_is_fresh(manifest, base_url: str) -> bool:
+    if not manifest or manifest.get("base_url") != base_url:
+        return False
+    # برای تغییراتی که probe نمی‌بیند (مثل تغییر اسلاگ دسته) یک سقف سن داریم
+    max_age = getattr(settings, "SITEMAP_MAX_AGE", 24 * 3600)
+    built = parse_datetime(manifest.get("built_at") or "")
+    if built is None or timezone.now() - built > timedelta(seconds=max_age):
+        return False
+
+    # mtime manifest = آخرین probe موفق؛ در این فاصله حتی probe هم اجرا نمی‌شود
+    interval = getattr(settings, "SITEMAP_PROBE_INTERVAL", 60)
+    try:
+        if time.time() - os.path.getmtime(_manifest_path()) < interval:
+            return True
+    except OSError:
+        return False
+    if manifest.get("probe") != catalog_probe():
+        return False
+    os.utime(_manifest_path())
+    return True
+
+
+def build_sitemaps(base_url: str, force: bool = False) -> dict:
+    """
+    همهٔ shardها + index را (در صورت نیاز) می‌سازد و manifest را برمی‌گرداند.
+    خروجی manifest شامل written/skipped برای گزارش است.
+    """
+    base_url = base_url.rstrip("/")
+    root = _root()
+    os.makedirs(root, exist_ok=True)
+    previous = read_manifest() or {}
+    if not force and manifest_is_fresh(previous, base_url):
+        return {**previous, "written": 0, "skipped": len(previous["shards"])}
+
+    old_digests = {
+        (s["section"], s["page"]): s.get("digest") for s in previous.get("shards", [])
+    }
+    probe = catalog_probe()
+    shard_size = _shard_size()
+    shards, written, skipped = [], 0, 0
+
+    def flush(section, page, rows, url_name):
+        nonlocal written, skipped
+        digest = _rows_digest(rows)
+        path = os.path.join(root, shard_filename(section, page))
+        if (
+            force
+            or old_digests.get((section, page)) != digest
+            or not os.path.exists(path)
+        ):
+            entries = [
+                (reverse(url_name, args=[slug]), lastmod) for _pk, slug, lastmod in rows
+            ]
+            _atomic_write(path, _render_urlset(base_url, entries))
+            written += 1
+        else:
+            skipped += 1
+        lastmods = [lm for _pk, _slug, lm in rows if lm]
+        shards.append(
+            {
+                "section": section,
+                "page": page,
+                "urls": len(rows),
+                "digest": digest,
+                "lastmod": _iso(max(lastmods)) if lastmods else None,
+            }
+        )
+
+    for section in SECTIONS:
+        iter_rows, url_name = SECTION_ROWS[section]
+        page, rows = 1, []
+        for row in iter_rows():
+            rows.append(row)
+            if len(rows) >= shard_size:
+                flush(section, page, rows, url_name)
+                page, rows = page + 1, []
+        if rows or page == 1:
+            flush(section, page, rows, url_name)
+
+    # shardهایی که دیگر وجود ندارند (کاتالوگ کوچک‌تر شده)
+    current = {(s["section"], s["page"]) for s in shards}
+    for section, page in set(old_digests) - current:
+        path = os.path.join(root, shard_filename(section, page))
+        if os.path.exists(path):
+            os.remove(path)
+
+    _atomic_write(os.path.join(root, "sitemap.xml"), _render_index(base_url, shards))
+    manifest = {
+        "base_url": base_url,
+        "built_at": timezone.now().isoformat(),
+        "probe": probe,
+        "shards": shards,
+    }
+    _atomic_write(_manifest_path(), json.dumps(manifest, ensure_ascii=False))
+    return {**manifest, "written": written, "skipped": skipped}
+
+
+def sitemap_path(section: str | None = None, page: int = 1):
+    """
+    مسیر فایل آمادهٔ روی دیسک (ساخته‌شده با build_sitemaps)؛ اینجا چیزی ساخته نمی‌شود.
+    None یعنی هنوز ساخته نشده یا چنین shardی وجود ندارد.
+    """
+    manifest = read_manifest()
+    if not manifest:
+        return None
+    if section is None:
+        return os.path.join(_root(), "sitemap.xml")
+    if not any(
+        s["section"] == section and s["page"] == page for s in manifest["shards"]
+    ):
+        return None
+    return os.path.join(_root(), shard_filename(section, page))
@@ -0,0 +1,123 @@
+"""
+تخصیص اسلاگ یکتا برای Category / Brand / Product.
+
+به‌جای یک exists() به‌ازای هر پسوند (-2، -3، …)، همهٔ اسلاگ‌های هم‌پیشوند
+با یک کوئری خوانده می‌شوند و اولین پسوند آزاد انتخاب می‌شود. اگر بین انتخاب
+و ذخیره کسی همان اسلاگ را بگیرد، save_with_unique_slug روی IntegrityError
+دوباره تلاش می‌کند (پیش‌بررسی جداگانه نداریم). اسلاگ‌های موجود از همان
+دیتابیس نوشتن (router.db_for_write) خوانده می‌شوند، نه replica عقب‌مانده.
+"""
+
+from django.db import IntegrityError, router, transaction
+from django.utils.text import slugify
+
+# جا برای پسوندی مثل "-99999" وقتی base به سقف طول رسیده باشد
+_SUFFIX_ROOM = 6
+
+
+def slug_base(value, max_len: int, allow_unicode: bool = True) -> str:
+    return (slugify(value, allow_unicode=allow_unicode) or "item")[:max_len]
+
+
+def _prefix(base: str, max_len: int) -> str:
+    # وقتی base بریده شده، نسخه‌های پسونددار با base کامل شروع نمی‌شوند
+    if len(base) > max_len - _SUFFIX_ROOM:
+        return base[: max(1, max_len - _SUFFIX_ROOM)]
+    return base
+
+
+def next_free_slug(base: str, taken, max_len: int) -> str:
+    slug, i = base, 2
+    while slug in taken:
+        suffix = f"-{i}"
+        slug = base[: max_len - len(suffix)] + suffix
+        i += 1
+    return slug
+
+
+def existing_slugs(qs, field_name: str, base: str, max_len: int) -> set:
+    return set(
+        qs.filter(**{f"{field_name}__startswith": _prefix(base, max_len)})
+        .order_by()
+        .values_list(field_name, flat=True)
+    )
+
+
+def unique_slugify(
+    instance,
+    value,
+    field_name: str = "slug",
+    allow_unicode: bool = True,
+    max_length: int = 160,
+    using: str | None = None,
+):
+    field = instance._meta.get_field(field_name)
+    max_len = getattr(field, "max_length", max_length) or max_length
+    base = slug_base(value, max_len, allow_unicode)
+
+    model = instance.__class__
+    using = using or router.db_for_write(model, instance=instance)
+    qs = model._default_manager.using(using)
+    if instance.pk:
+        qs = qs.exclude(pk=instance.pk)
+    return next_free_slug(base, existing_slugs(qs, field_name, base, max_len), max_len)
+
+
+def save_with_unique_slug(
+    instance, value, save, *args, field_name: str = "slug", attempts: int = 5, **kwargs
+):
+    """
+    اگر اسلاگ خالی باشد، یکی تخصیص می‌دهد و save را صدا می‌زند؛
+    در صورت برخورد هم‌زمان روی unique، با اسلاگ تازه دوباره تلاش می‌کند.
+    """
+    if getattr(instance, field_name):
+        return save(*args, **kwargs)
+
+    using = kwargs.get("using") or router.db_for_write(
+        instance.__class__, instance=instance
+    )
+    for attempt in range(attempts):
+        slug = unique_slugify(instance, value, field_name, using=using)
+        setattr(instance, field_name, slug)
+        try:
+            with transaction.atomic(using=using):
+                return save(*args, **kwargs)
+        except IntegrityError:
+            setattr(instance, field_name, "")
+            taken = (
+                instance.__class__._default_manager.using(using)
+                .filter(**{field_name: slug})
+                .exists()
+            )
+            # خطا ربطی به اسلاگ ندارد (مثلاً نام تکراری برند) یا تلاش‌ها تمام شد
+            if not taken or attempt == attempts - 1:
+                raise
+
+
+class SlugAllocator:
+    """
+    نسخهٔ درون‌حافظه‌ای برای عملیات انبوه (import_catalog):
+    برای هر پیشوند فقط یک کوئری، بعد اسلاگ‌های گرفته‌شده در حافظه نگه داشته می‌شوند.
+    """
+
+    def __init__(self, model, field_name: str = "slug"):
+        self.model = model
+        self.field_name = field_name
+        self.max_len = model._meta.get_field(field_name).max_length
+        self.using = router.db_for_write(model)
+        self.taken: dict[str, set[str]] = {}
+
+    def allocate(self, value: str) -> str:
+        base = slug_base(value, self.max_len)
+        prefix = _prefix(base, self.max_len)
+        if prefix not in self.taken:
+            self.taken[prefix] = existing_slugs(
+                self.model._default_manager.using(self.using),
+                self.field_name,
+                base,
+                self.max_len,
+            )
+        taken = self.taken[prefix]
+        slug = next_free_slug(base, taken, self.max_len)
+        taken.add(slug)
+        return slug
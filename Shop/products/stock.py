@@ -0,0 +1,214 @@
+"""
+همگام‌سازی انبوه موجودی از خروجی انبار.
+
+ورودی: جریانی از رکوردهای {sku یا barcode، stock (مقدار مطلق) یا delta (تغییر)}.
+- SKU/بارکد با یک ایندکس درون‌حافظه‌ای به id واریانت نگاشت می‌شود.
+- هر تکه با یک UPDATE ... CASE نوشته می‌شود (نه save به‌ازای هر ردیف).
+- به‌ازای هر تکه فقط یک سیگنال catalog_changed ارسال می‌شود.
+"""
+
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Product, ProductVariation
+from .signals import catalog_changed
+
+DEFAULT_CHUNK_SIZE = 1000
+MAX_REPORTED_UNKNOWN = 100
+
+
+class SkuIndex:
+    """
+    نگاشت sku/barcode => (variation_id, product_id) با یک کوئری.
+    برای ده‌ها هزار SKU حافظهٔ ناچیزی می‌گیرد.
+    """
+
+    def __init__(self):
+        self.by_sku = {}
+        self.by_barcode = {}
+        rows = ProductVariation.objects.values_list(
+            "id", "product_id", "sku", "barcode"
+        ).iterator(chunk_size=5000)
+        for pk, product_id, sku, barcode in rows:
+            self.by_sku[sku] = (pk, product_id)
+            if barcode:
+                self.by_barcode[barcode] = (pk, product_id)
+
+    def resolve(self, sku: str = "", barcode: str = ""):
+        if sku and sku in self.by_sku:
+            return self.by_sku[sku]
+        if barcode and barcode in self.by_barcode:
+            return self.by_barcode[barcode]
+        return None
+
+
+@dataclass
+class StockSyncResult:
+    received: int = 0
+    updated: int = 0
+    batches: int = 0
+    unknown: list = field(default_factory=list)
+    errors: list = field(default_factory=list)
+
+    def as_dict(self):
+        return {
+            "received": self.received,
+            "updated": self.updated,
+            "batches": self.batches,
+            "unknown": self.unknown[:MAX_REPORTED_UNKNOWN],
+            "unknown_count": len(self.unknown),
+            "errors": self.errors[:MAX_REPORTED_UNKNOWN],
+        }
+
+
+def parse_stock_lines(lines, fmt: str = "jsonl"):
+    """
+    خطوط (bytes یا str) را به رکوردهای dict تبدیل می‌کند؛ بدون خواندن کل ورودی.
+    خط JSON خراب یا غیر شیء (مثلاً لیست یا عدد) ValueError می‌دهد.
+    """
+    decoded = (
+        line.decode("utf-8-sig") if isinstance(line, bytes) else line for line in lines
+    )
+    if fmt == "csv":
+        yield from csv.DictReader(decoded)
+        return
+    for lineno, line in enumerate(decoded, 1):
+        line = line.strip()
+        if not line:
+            continue
+        row = json.loads(line)
+        if not isinstance(row, dict):
+            raise ValueError(f"line {lineno}: expected a JSON object")
+        yield row
+
+
+def _int_or_none(value):
+    if value is None or str(value).strip() == "":
+        return None
+    return int(str(value).strip())
+
+
+def _write_chunk(absolute: dict, deltas: dict, now=None):
+    """
+    absolute: {variation_id: stock}، deltas: {variation_id: delta}
+    یک UPDATE برای هر نوع؛ موجودی هیچ‌وقت منفی نمی‌شود.
+    updated_at واریانت هم (مثل auto_now) جلو می‌رود.
+    """
+    qn = connection.ops.quote_name
+    meta = ProductVariation._meta
+    table = qn(meta.db_table)
+    stock = qn(meta.get_field("stock").column)
+    pk = qn(meta.pk.column)
+    changed_field = meta.get_field("updated_at")
+    changed = qn(changed_field.column)
+    changed_at = changed_field.get_db_prep_value(
+        now or timezone.now(), connection=connection
+    )
+    updated = 0
+
+    with connection.cursor() as cursor:
+        if absolute:
+            whens = " ".join(["WHEN %s THEN %s"] * len(absolute))
+            params = [x for item in absolute.items() for x in item]
+            ids = list(absolute)
+            cursor.execute(
+                f"UPDATE {table} SET {stock} = CASE {pk} {whens} ELSE {stock} END, "
+                f"{changed} = %s "
+                f"WHERE {pk} IN ({', '.join(['%s'] * len(ids))})",
+                params + [changed_at] + ids,
+            )
+            updated += cursor.rowcount
+        if deltas:
+            whens = " ".join(
+                [
+                    f"WHEN %s THEN CASE WHEN {stock} + %s < 0 THEN 0 ELSE {stock} + %s END"
+                ]
+                * len(deltas)
+            )
+            params = [x for vid, d in deltas.items() for x in (vid, d, d)]
+            ids = list(deltas)
+            cursor.execute(
+                f"UPDATE {table} SET {stock} = CASE {pk} {whens} ELSE {stock} END, "
+                f"{changed} = %s "
+                f"WHERE {pk} IN ({', '.join(['%s'] * len(ids))})",
+                params + [changed_at] + ids,
+            )
+            updated += cursor.rowcount
+    return updated
+
+
+def sync_stock(records, chunk_size: int = DEFAULT_CHUNK_SIZE, index=None):
+    """
+    رکوردها را تکه‌تکه اعمال می‌کند. هر تکه در تراکنش خودش است.
+    """
+    index = index or SkuIndex()
+    result = StockSyncResult()
+
+    absolute, deltas, products = {}, {}, set()
+    pending = 0
+
+    def flush():
+        nonlocal absolute, deltas, products, pending
+        if not pending:
+            return
+        product_ids = sorted(products)
+        now = timezone.now()
+        with transaction.atomic():
+            result.updated += _write_chunk(absolute, deltas, now)
+            # updated_at محصول را هم جلو می‌بریم تا فید/سایت‌مپ/کش تغییر را ببینند
+            Product.objects.filter(id__in=product_ids).update(updated_at=now)
+            transaction.on_commit(
+                lambda: catalog_changed.send(
+                    sender=ProductVariation, product_ids=product_ids, reason="stock"
+                )
+            )
+        result.batches += 1
+        absolute, deltas, products = {}, {}, set()
+        pending = 0
+
+    for rec in records:
+        result.received += 1
+        sku = str(rec.get("sku") or "").strip()
+        barcode = str(rec.get("barcode") or "").strip()
+        try:
+            stock = _int_or_none(rec.get("stock"))
+            delta = _int_or_none(rec.get("delta"))
+        except ValueError:
+            result.errors.append(sku or barcode or f"#{result.received}")
+            continue
+
+        hit = index.resolve(sku, barcode)
+        if hit is None:
+            result.unknown.append(sku or barcode)
+            continue
+        vid, product_id = hit
+
+        if stock is not None:
+            # مقدار مطلق، deltaهای قبلی همین تکه را بی‌اثر می‌کند
+            absolute[vid] = max(stock, 0)
+            deltas.pop(vid, None)
+        elif delta is not None:
+            if vid in absolute:
+                absolute[vid] = max(absolute[vid] + delta, 0)
+            else:
+                deltas[vid] = deltas.get(vid, 0) + delta
+        else:
+            result.errors.append(sku or barcode)
+            continue
+
+        products.add(product_id)
+        pending += 1
+        if pending >= chunk_size:
+            flush()
+
+    flush()
+    return result
+
+
+def sync_stock_from_text(text: str, fmt: str = "jsonl", **kwargs):
+    return sync_stock(parse_stock_lines(io.StringIO(text), fmt), **kwargs)
@@ -0,0 +1,152 @@
+"""
+ذخیره‌سازی محتوامحور (content-addressed) برای تصاویر محصول.
+
+هر فایل با BLAKE2 هش می‌شود و فقط یک‌بار زیر cas/<aa>/<bb>/<digest>.<ext>
+ذخیره می‌شود؛ آپلود دوبارهٔ همان عکس فقط نام موجود را برمی‌گرداند.
+چون نام فایل از محتوا می‌آید، URLها تغییرناپذیرند و می‌توانند
+با Cache-Control: immutable برای همیشه کش شوند.
+
+blob مشترک است؛ آپلودی که به blob موجود می‌رسد mtime آن را تازه می‌کند و
+هیچ blobی زودتر از CAS_GRACE_SECONDS بعد از آخرین استفاده پاک نمی‌شود، تا
+رکوردی که هنوز commit نشده به فایل حذف‌شده اشاره نکند.
+"""
+
+import hashlib
+import os
+import time
+from pathlib import PurePosixPath
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import models
+
+CAS_PREFIX = "cas"
+CHUNK_SIZE = 64 * 1024
+DEFAULT_GRACE_SECONDS = 3600
+
+
+def grace_seconds() -> int:
+    return getattr(settings, "CAS_GRACE_SECONDS", DEFAULT_GRACE_SECONDS)
+
+
+def content_digest(content) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    content.seek(0)
+    for chunk in content.chunks(CHUNK_SIZE):
+        h.update(chunk)
+    content.seek(0)
+    return h.hexdigest()
+
+
+class _BlobExists(Exception):
+    pass
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    FileSystemStorage که نام فایل را از هش محتوا می‌سازد.
+    نام ورودی (upload_to) فقط برای پسوند فایل استفاده می‌شود.
+    """
+
+    def blob_name(self, name: str, digest: str) -> str:
+        ext = PurePosixPath(name).suffix.lower()
+        return f"{CAS_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+
+        cas_name = self.blob_name(name, content_digest(content))
+        if self.exists(cas_name):
+            return self._reuse(cas_name)
+        try:
+            return super().save(cas_name, content, max_length=max_length)
+        except _BlobExists:
+            return self._reuse(cas_name)
+
+    def _reuse(self, name: str) -> str:
+        # blob دوباره استفاده شد؛ mtime تازه آن را در بازهٔ grace نگه می‌دارد
+        try:
+            os.utime(self.path(name))
+        except OSError:
+            pass
+        return name
+
+    def is_recent(self, name: str, grace: int | None = None) -> bool:
+        grace = grace_seconds() if grace is None else grace
+        try:
+            return self.get_modified_time(name).timestamp() > time.time() - grace
+        except OSError:
+            return False
+
+    def get_available_name(self, name, max_length=None):
+        # دو آپلود هم‌زمانِ یک محتوا => همان blob؛ نیازی به نام جایگزین نیست
+        if name.startswith(CAS_PREFIX + "/") and self.exists(name):
+            raise _BlobExists(name)
+        return super().get_available_name(name, max_length=max_length)
+
+
+content_addressed_storage = ContentAddressedStorage()
+
+
+def product_media_storage():
+    """
+    storage فیلدهای تصویر محصول؛ با PRODUCT_MEDIA_CAS=False به storage پیش‌فرض برمی‌گردد.
+    """
+    if getattr(settings, "PRODUCT_MEDIA_CAS", True):
+        return content_addressed_storage
+    return default_storage
+
+
+def cas_file_fields():
+    """
+    (model, field_name) همهٔ فیلدهای فایلی که روی storage محتوامحور ذخیره می‌کنند.
+    """
+    out = []
+    for model in apps.get_models():
+        for f in model._meta.get_fields():
+            if isinstance(f, models.FileField) and isinstance(
+                f.storage, ContentAddressedStorage
+            ):
+                out.append((model, f.name))
+    return out
+
+
+def blob_refcount(name: str) -> int:
+    """
+    تعداد ارجاع‌ها به یک blob در تمام فیلدهای محتوامحور.
+    """
+    if not name:
+        return 0
+    return sum(
+        model._default_manager.filter(**{field: name}).count()
+        for model, field in cas_file_fields()
+    )
+
+
+def release_blob(name: str) -> bool:
+    """
+    اگر دیگر هیچ رکوردی به blob اشاره نکند، فایل را پاک می‌کند.
+    blobی که در بازهٔ grace استفاده شده می‌ماند؛ gc_media بعداً پاکش می‌کند.
+    """
+    if not name or not name.startswith(CAS_PREFIX + "/"):
+        return False
+    if blob_refcount(name) > 0:
+        return False
+    if content_addressed_storage.is_recent(name):
+        return False
+    content_addressed_storage.delete(name)
+    return True
+
+
+def iter_blob_names():
+    root = os.path.join(content_addressed_storage.location, CAS_PREFIX)
+    for dirpath, _dirs, files in os.walk(root):
+        for fn in files:
+            full = os.path.join(dirpath, fn)
+            rel = os.path.relpath(full, content_addressed_storage.location)
+            yield rel.replace(os.sep, "/")
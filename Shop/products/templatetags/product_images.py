@@ -0,0 +1,68 @@
+"""
+srcset برای تصاویر محصول از نسخه‌هایی که ورکر تصویر (products.imaging) روی
+خود رکورد نوشته است؛ بدون کوئری و بدون دسترسی به دیسک.
+
+    {% load product_images %}
+    {% product_img p alt=p.name sizes="50vw" %}
+
+    product_img کل تگ <img> را می‌سازد (ابعاد، placeholder، lazy)؛ image_srcset
+    فقط ویژگی‌های srcset/sizes را برای تگ‌هایی که خودشان نوشته می‌شوند:
+
+    <img src="{{ p.image.url }}" {% image_srcset p.image p.image_variants p.image_width sizes="50vw" %}>
+"""
+
+from django import template
+from django.utils.html import format_html
+
+register = template.Library()
+
+
+@register.simple_tag
+def image_srcset(fieldfile, variants, width=None, sizes="100vw"):
+    """
+    ویژگی‌های srcset/sizes؛ تا وقتی نسخه‌ای ساخته نشده رشتهٔ خالی (فقط src).
+    فایل اصلی با عرض واقعی‌اش (اگر معلوم باشد) بزرگ‌ترین گزینه است.
+    """
+    if not fieldfile or not variants:
+        return ""
+    storage = fieldfile.storage
+    candidates = {}
+    for item in sorted(variants.values(), key=lambda v: v["width"]):
+        # تصویر کوچک‌تر از سقف نسخه‌ها چند نسخه با عرض یکسان دارد
+        candidates.setdefault(item["width"], storage.url(item["name"]))
+    if width and width not in candidates and width > max(candidates):
+        candidates[width] = fieldfile.url
+    srcset = ", ".join(f"{url} {w}w" for w, url in sorted(candidates.items()))
+    return format_html('srcset="{}" sizes="{}"', srcset, sizes)
+
+
+@register.inclusion_tag("products/_image.html")
+def product_img(
+    obj, alt="", sizes="100vw", css_class="card-img-top", lazy=True, img_id=""
+):
+    """
+    تگ کامل <img> برای Product یا ProductImage: srcset، ابعاد (جلوگیری از CLS)
+    و placeholder پس‌زمینه از IMAGE_META_FIELDS/IMAGE_VARIANTS_FIELD مدل.
+    بدون تصویر، placeholder ثابت سایت.
+    """
+    context = {
+        "alt": getattr(obj, "alt_text", "") or alt,
+        "css_class": css_class,
+        "lazy": lazy,
+        "img_id": img_id,
+        "src": "",
+    }
+    fieldfile = getattr(obj, "image", None)
+    if not fieldfile:
+        return context
+    w_field, h_field, p_field = obj.IMAGE_META_FIELDS
+    width = getattr(obj, w_field)
+    variants = getattr(obj, obj.IMAGE_VARIANTS_FIELD)
+    context.update(
+        src=fieldfile.url,
+        srcset=image_srcset(fieldfile, variants, width, sizes=sizes),
+        width=width,
+        height=getattr(obj, h_field),
+        placeholder=getattr(obj, p_field),
+    )
+    return context
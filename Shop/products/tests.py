@@ -1,2 +1,934 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import os
+import re
+import shutil
+import tempfile
+from unittest import mock
+from urllib.parse import unquote
+from datetime import timedelta
+from decimal import Decimal
 
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from products.models import (
+    Brand,
+    Category,
+    ImageJob,
+    Product,
+    ProductNeighbor,
+    ProductVariation,
+)
+from products.catalog_import import CatalogImporter
+from products.feeds import _merge, build_feed_file, feed_path, feed_root
+from products.similarity import build_similar
+from products.sitemaps import build_sitemaps
+from products.slugs import SlugAllocator, unique_slugify
+from products.storage import (
+    CAS_PREFIX,
+    blob_refcount,
+    content_addressed_storage,
+    release_blob,
+)
+from Shop.page_cache import _cache, _path_key, get_catalog_version
+from Shop.staticfiles import minify_css
+from Shop.surrogate import LocMemPurgeBackend
+
+# قالب‌ها بدون collectstatic (manifest) رندر شوند؛ ManifestStaticTests همان
+# صفحه‌ها را با storage واقعی هم رندر می‌کند
+PLAIN_STATIC = {
+    **settings.STORAGES,
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+
+def make_product(name="تیشرت ساده", skus=("TS-1",), stock=10, **extra):
+    extra.setdefault("category", Category.objects.get_or_create(name="تیشرت")[0])
+    extra.setdefault("brand", Brand.objects.get_or_create(name="برند")[0])
+    extra.setdefault("price", Decimal("100000"))
+    product = Product.objects.create(name=name, **extra)
+    for sku in skus:
+        ProductVariation.objects.create(product=product, sku=sku, stock=stock)
+    return product
+
+
+@override_settings(STOCK_SYNC_TOKEN="secret")
+class StockSyncEndpointTests(TestCase):
+    def setUp(self):
+        make_product(skus=("TS-1", "TS-2"))
+        self.url = reverse("products:stock_sync")
+
+    def post(self, body):
+        return self.client.post(
+            self.url,
+            body,
+            content_type="application/x-ndjson",
+            HTTP_AUTHORIZATION="Token secret",
+        )
+
+    def stock(self, sku):
+        return ProductVariation.objects.get(sku=sku).stock
+
+    def test_jsonl_updates_stock(self):
+        response = self.post(
+            '{"sku": "TS-1", "stock": 3}\n{"sku": "TS-2", "delta": -4}\n'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["updated"], 2)
+        self.assertEqual((self.stock("TS-1"), self.stock("TS-2")), (3, 6))
+
+    def test_non_object_line_is_a_parse_error(self):
+        for line in ("[1, 2]", "5", '"TS-1"', "null"):
+            with self.subTest(line=line):
+                response = self.post('{"sku": "TS-1", "stock": 3}\n' + line + "\n")
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("line 2", response.json()["error"])
+                self.assertEqual(self.stock("TS-1"), 10)
+
+    def test_malformed_json_is_a_parse_error(self):
+        response = self.post('{"sku": "TS-1",\n')
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(
+    STORAGES=PLAIN_STATIC,
+    SURROGATE_KEYS={
+        **settings.SURROGATE_KEYS,
+        "backend": "Shop.surrogate.LocMemPurgeBackend",
+    },
+)
+class ProductConditionalGetTests(TransactionTestCase):
+    """
+    ETag صفحهٔ محصول (Shop.conditional) و purge کلیدهای surrogate بعد از تغییر.
+    TransactionTestCase تا bump نسخه و purge مثل محیط واقعی بعد از commit اجرا شوند.
+    """
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.product = make_product()
+        LocMemPurgeBackend.outbox.clear()
+        self.url = self.product.get_absolute_url()
+
+    def get(self, etag=None):
+        headers = {"HTTP_IF_NONE_MATCH": etag} if etag else {}
+        return self.client.get(self.url, **headers)
+
+    def change(self, obj, **fields):
+        for name, value in fields.items():
+            setattr(obj, name, value)
+        obj.save()
+
+    def test_unchanged_product_answers_304(self):
+        first = self.get()
+        self.assertEqual(first.status_code, 200)
+        self.assertIn(f"product:{self.product.pk}", first["Surrogate-Key"].split())
+        second = self.get(first["ETag"])
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second["ETag"], first["ETag"])
+
+    def test_product_update_changes_etag_and_purges(self):
+        etag = self.get()["ETag"]
+        self.change(self.product, price=Decimal("90000"))
+        response = self.get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertContains(response, "90000")
+        self.assertNotContains(response, "100000")
+        purged = {key for batch in LocMemPurgeBackend.outbox for key in batch}
+        self.assertIn(f"product:{self.product.pk}", purged)
+        self.assertEqual(self.get(response["ETag"]).status_code, 304)
+
+    def test_variation_stock_change_changes_etag(self):
+        etag = self.get()["ETag"]
+        self.change(self.product.variations.get(), stock=0)
+        self.assertEqual(self.get(etag).status_code, 200)
+
+    def test_stock_only_save_changes_etag_without_version_bump(self):
+        etag = self.get()["ETag"]
+        version = get_catalog_version()
+        variation = self.product.variations.get()
+        variation.stock = 1
+        variation.save(update_fields=["stock", "updated_at"])
+        self.assertEqual(get_catalog_version(), version)
+        response = self.get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get(response["ETag"]).status_code, 304)
+
+    def test_validators_run_no_aggregates(self):
+        # 304: فقط نسخهٔ کاتالوگ + یک lookup روی slug، بدون Max روی محصولات
+        for url in (
+            self.url,
+            reverse("products:category", args=[self.product.category.slug]),
+            reverse("products:brand", args=[self.product.brand.slug]),
+        ):
+            with self.subTest(url=url):
+                etag = self.client.get(url)["ETag"]
+                with CaptureQueriesContext(connection) as ctx:
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(len(ctx), 2)
+                self.assertFalse(any("MAX(" in q["sql"] for q in ctx))
+
+    def test_inactive_product_is_404(self):
+        etag = self.get()["ETag"]
+        self.change(self.product, is_active=False)
+        self.assertEqual(self.get(etag).status_code, 404)
+
+    def purged(self):
+        keys = {key for batch in LocMemPurgeBackend.outbox for key in batch}
+        LocMemPurgeBackend.outbox.clear()
+        return keys
+
+    def test_listing_fields_purge_catalog(self):
+        self.change(self.product, description="فقط توضیحات")
+        self.assertNotIn("catalog", self.purged())
+        for field, value in (("price", Decimal("80000")), ("name", "تیشرت نو")):
+            with self.subTest(field=field):
+                self.change(self.product, **{field: value})
+                self.assertIn("catalog", self.purged())
+
+    def test_brand_change_purges_old_and_new_brand(self):
+        old_brand, old_category = self.product.brand, self.product.category
+        new_brand = Brand.objects.create(name="برند دیگر")
+        new_category = Category.objects.create(name="پیراهن")
+        self.change(self.product, brand=new_brand, category=new_category)
+        self.assertLessEqual(
+            {
+                f"brand:{old_brand.pk}",
+                f"brand:{new_brand.pk}",
+                f"category:{old_category.pk}",
+                f"category:{new_category.pk}",
+                "catalog",
+            },
+            self.purged(),
+        )
+
+    def test_variation_price_purges_catalog_but_stock_does_not(self):
+        variation = self.product.variations.get()
+        variation.stock = 3
+        variation.save(update_fields=["stock", "updated_at"])
+        self.assertEqual(self.purged(), {f"product:{self.product.pk}"})
+        self.change(variation, price_override=Decimal("70000"))
+        self.assertEqual(self.purged(), {f"product:{self.product.pk}", "catalog"})
+
+
+@override_settings(STORAGES=PLAIN_STATIC)
+class PageCacheTests(TransactionTestCase):
+    """
+    Shop.page_cache: bump نسخه بعد از commit (یک‌بار در هر تراکنش)، save فقط
+    موجودی بدون bump، و سرو نسخهٔ stale وقتی قفل ساخت دست دیگری است.
+    """
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.product = make_product()
+        self.other = make_product(name="شلوار", skus=("PT-1",))
+        self.url = self.product.get_absolute_url()
+
+    def state(self, url=None):
+        return self.client.get(url or self.url)["X-Page-Cache"]
+
+    def test_hit_after_miss(self):
+        self.assertEqual(self.state(), "miss")
+        self.assertEqual(self.state(), "hit")
+
+    def test_full_save_bumps_once_after_commit(self):
+        version = get_catalog_version()
+        with transaction.atomic():
+            for variation in ProductVariation.objects.all():
+                variation.save()
+            self.product.save()
+            self.assertEqual(get_catalog_version(), version)
+        self.assertEqual(get_catalog_version(), version + 1)
+
+    def test_rollback_does_not_bump(self):
+        version = get_catalog_version()
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self.product.save()
+                raise RuntimeError
+        self.assertEqual(get_catalog_version(), version)
+
+    def test_stock_only_save_drops_only_that_product(self):
+        other_url = self.other.get_absolute_url()
+        self.state()
+        self.state(other_url)
+        version = get_catalog_version()
+        variation = self.product.variations.get()
+        variation.stock = 0
+        # UPDATE، تازه کردن updated_at محصول، slug و نسخه برای پاک کردن کش؛
+        # بدون SELECT تصویر در pre_save
+        with self.assertNumQueries(4):
+            variation.save(update_fields=["stock", "updated_at"])
+        self.assertEqual(get_catalog_version(), version)
+        self.assertEqual(self.state(), "miss")
+        self.assertEqual(self.state(other_url), "hit")
+
+    def test_stale_served_while_rebuild_locked(self):
+        first = self.client.get(self.url)
+        self.product.price = Decimal("90000")
+        self.product.save()
+        lock_key = f"{_path_key('products:detail', unquote(self.url))}:lock"
+        self.assertTrue(_cache().add(lock_key, 1))
+        stale = self.client.get(self.url)
+        self.assertEqual(stale["X-Page-Cache"], "stale")
+        self.assertEqual(stale.content, first.content)
+        _cache().delete(lock_key)
+        fresh = self.client.get(self.url)
+        self.assertEqual(fresh["X-Page-Cache"], "miss")
+        self.assertContains(fresh, "90000")
+
+
+@override_settings(STORAGES=PLAIN_STATIC)
+class ProductSearchTests(TestCase):
+    """
+    جست‌وجوی لیست محصولات (_search_condition): نام/توضیحات، نام برند یا نام
+    دسته؛ محصول غیرفعال دیده نمی‌شود و هر محصول یک‌بار می‌آید.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        shoes = Category.objects.create(name="کفش")
+        nike = Brand.objects.create(name="Nike")
+        cls.runner = make_product(
+            name="Runner", skus=("RN-1", "RN-2"), brand=nike, category=shoes
+        )
+        cls.tshirt = make_product(name="تیشرت ساده", description="نخی، مناسب Runner")
+        make_product(name="Runner قدیمی", skus=("RN-OLD",), is_active=False)
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+
+    def search(self, q, url=None):
+        response = self.client.get(url or reverse("products:list"), {"q": q})
+        self.assertEqual(response.status_code, 200)
+        return [p.pk for p in response.context["products"]]
+
+    def test_name_and_description_match(self):
+        self.assertCountEqual(self.search("Runner"), [self.runner.pk, self.tshirt.pk])
+
+    def test_brand_name_match(self):
+        self.assertEqual(self.search("nike"), [self.runner.pk])
+
+    def test_category_name_match(self):
+        self.assertEqual(self.search("کفش"), [self.runner.pk])
+
+    def test_no_match(self):
+        self.assertEqual(self.search("ناموجود"), [])
+
+    def test_brand_page_search_is_scoped(self):
+        url = self.runner.brand.get_absolute_url()
+        self.assertEqual(self.search("Runner", url), [self.runner.pk])
+
+
+class ManifestStaticTests(TestCase):
+    """
+    صفحه‌های کاتالوگ با storage واقعی (CompressedManifestStaticFilesStorage) بعد
+    از collectstatic؛ هر {% static %} که در manifest نباشد اینجا 500 می‌دهد.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.static_root = tempfile.mkdtemp(prefix="test_static_")
+        cls.addClassCleanup(shutil.rmtree, cls.static_root, ignore_errors=True)
+        cls.enterClassContext(override_settings(STATIC_ROOT=cls.static_root))
+        call_command("collectstatic", interactive=False, verbosity=0)
+
+    @classmethod
+    def setUpTestData(cls):
+        # بدون تصویر => قالب‌ها placeholder استاتیک را نشان می‌دهند
+        cls.product = make_product()
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+
+    def test_catalog_pages_render_with_manifest(self):
+        placeholder = staticfiles_storage.url("img/placeholder.png")
+        self.assertRegex(placeholder, r"placeholder\.[0-9a-f]{12}\.png$")
+        for url in ("/", reverse("products:list"), self.product.get_absolute_url()):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, placeholder)
+
+    def test_hashed_css_matches_its_content(self):
+        # هش روی محتوای کوچک‌شده حساب می‌شود
+        hashed_files = staticfiles_storage.hashed_files
+        css = [h for n, h in hashed_files.items() if n.endswith(".css")]
+        self.assertTrue(css)
+        for hashed in css:
+            with staticfiles_storage.open(hashed) as fh:
+                digest = staticfiles_storage.file_hash(hashed, fh)
+            self.assertIn(f".{digest}.", hashed)
+            self.assertTrue(os.path.exists(staticfiles_storage.path(hashed)))
+
+    def test_css_fallback_keeps_strings(self):
+        css = "a  {  content : \"x   /* y */  ;\" ;  }\n/* c */ b > i { font: 'A   B' , x; }"
+        minified = minify_css(css)
+        self.assertIn('"x   /* y */  ;"', minified)
+        self.assertIn("'A   B'", minified)
+        self.assertNotIn("/* c */", minified)
+        self.assertEqual(
+            re.sub(r"[\"'].*?[\"']", "", minified), "a{content : }b>i{font: ,x}"
+        )
+
+
+class SlugTests(TestCase):
+    """
+    products.slugs: پسوند آزاد با یک کوئری، اسلاگ بریده‌شده در سقف طول، و تلاش
+    دوباره وقتی کس دیگری بین انتخاب و ذخیره همان اسلاگ را گرفته.
+    """
+
+    def test_next_free_suffix(self):
+        first = Brand.objects.create(name="Nike Air")
+        second = Brand.objects.create(name="Nike  Air!")
+        self.assertEqual((first.slug, second.slug), ("nike-air", "nike-air-2"))
+
+    def test_truncated_base_gets_suffix_within_max_length(self):
+        name = "x" * 200
+        max_len = Brand._meta.get_field("slug").max_length
+        slugs = [Brand.objects.create(name=f"{name}{i}").slug for i in range(3)]
+        self.assertEqual(slugs[0], "x" * max_len)
+        self.assertEqual(
+            slugs[1:], ["x" * (max_len - 2) + "-2", "x" * (max_len - 2) + "-3"]
+        )
+
+    def test_allocator_reads_each_prefix_once_without_ordering(self):
+        make_product(name="Runner", skus=())
+        make_product(name="Runner", skus=())
+        allocator = SlugAllocator(Product)
+        with CaptureQueriesContext(connection) as queries:
+            slugs = [allocator.allocate("Runner") for _ in range(2)]
+        self.assertEqual(slugs, ["runner-3", "runner-4"])
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("ORDER BY", queries[0]["sql"])
+
+    def test_concurrent_slug_collision_is_retried(self):
+        stolen = []
+
+        def racing_slugify(instance, value, *args, **kwargs):
+            # رقیب بعد از انتخاب اسلاگ و پیش از INSERT همان را commit می‌کند
+            slug = unique_slugify(instance, value, *args, **kwargs)
+            if not stolen:
+                stolen.append(slug)
+                Brand.objects.bulk_create([Brand(name="رقیب", slug=slug)])
+            return slug
+
+        with mock.patch("products.slugs.unique_slugify", racing_slugify):
+            brand = Brand.objects.create(name="Adidas")
+        self.assertEqual(stolen, ["adidas"])
+        self.assertEqual(brand.slug, "adidas-2")
+
+    def test_unrelated_integrity_error_is_raised(self):
+        # نام برند یکتاست؛ اسلاگ آزاد است پس تلاش دوباره بی‌معناست
+        Brand.objects.create(name="Puma")
+        with self.assertRaises(IntegrityError):
+            Brand.objects.create(name="Puma")
+
+
+class CatalogImportTests(TestCase):
+    """
+    products.catalog_import: ساخت، ورود دوبارهٔ همان فایل (بدون تغییر)، ردیف
+    خطادار (rollback همان تکه) و قاعدهٔ فعال بودن محصول.
+    """
+
+    def row(self, sku, **extra):
+        return {
+            "product_name": "تیشرت نخی",
+            "brand": "Nike",
+            "category": "مردانه > تیشرت",
+            "price": "250,000",
+            "sku": sku,
+            "size": sku[-1],
+            "stock": "5",
+            **extra,
+        }
+
+    def run_import(self, rows, **kwargs):
+        return CatalogImporter(**kwargs).run(rows)
+
+    def test_import_creates_catalog(self):
+        stats = self.run_import(
+            [self.row("TN-S"), self.row("TN-M"), self.row("PL-L", product_name="پولو")]
+        )
+        self.assertEqual(stats.errors, [])
+        self.assertEqual((stats.products_created, stats.variations_created), (2, 3))
+        product = Product.objects.get(name="تیشرت نخی")
+        self.assertEqual(product.price, Decimal("250000"))
+        self.assertEqual(product.category.parent.name, "مردانه")
+        self.assertEqual(
+            sorted(product.variations.values_list("sku", "size__name")),
+            [("TN-M", "M"), ("TN-S", "S")],
+        )
+        self.assertEqual(Brand.objects.filter(name="Nike").count(), 1)
+
+    def test_reimport_is_noop_until_a_row_changes(self):
+        rows = [self.row("TN-S"), self.row("TN-M")]
+        self.run_import([dict(r) for r in rows])
+        stats = self.run_import([dict(r) for r in rows])
+        self.assertEqual(stats.errors, [])
+        self.assertEqual(
+            (
+                stats.products_created,
+                stats.products_updated,
+                stats.variations_created,
+                stats.variations_updated,
+            ),
+            (0, 0, 0, 0),
+        )
+        rows[1]["stock"] = "1"
+        stats = self.run_import(rows)
+        self.assertEqual((stats.products_updated, stats.variations_updated), (0, 1))
+        self.assertEqual(ProductVariation.objects.get(sku="TN-M").stock, 1)
+
+    def test_error_row_rolls_back_only_its_batch(self):
+        stats = self.run_import(
+            [
+                self.row("TN-S"),
+                self.row("TN-M", price="abc"),
+                self.row("PL-L", product_name="پولو"),
+            ],
+            batch_size=2,
+        )
+        self.assertEqual(len(stats.errors), 1)
+        self.assertIn("1-2", stats.errors[0])
+        self.assertEqual(stats.rows, 3)
+        self.assertEqual(list(Product.objects.values_list("name", flat=True)), ["پولو"])
+        self.assertFalse(ProductVariation.objects.filter(sku__startswith="TN").exists())
+
+    def test_product_is_active_rule(self):
+        self.run_import(
+            [
+                # یک واریانت غیرفعال محصول را خاموش نمی‌کند
+                self.row("A-S", product_name="الف", is_active="0"),
+                self.row("A-M", product_name="الف", is_active="1"),
+                # همهٔ ردیف‌ها غیرفعال => محصول غیرفعال
+                self.row("B-S", product_name="ب", is_active="0"),
+                # product_is_active تعیین‌کننده است
+                self.row("C-S", product_name="ج", product_is_active="0"),
+            ]
+        )
+        active = dict(Product.objects.values_list("name", "is_active"))
+        self.assertEqual(active, {"الف": True, "ب": False, "ج": False})
+        self.assertFalse(ProductVariation.objects.get(sku="A-S").is_active)
+        self.assertTrue(ProductVariation.objects.get(sku="C-S").is_active)
+
+    def test_command_reads_csv(self):
+        with tempfile.NamedTemporaryFile(
+            "w", suffix=".csv", encoding="utf-8", delete=False
+        ) as fh:
+            self.addCleanup(os.remove, fh.name)
+            writer = csv.DictWriter(fh, fieldnames=list(self.row("TN-S")))
+            writer.writeheader()
+            writer.writerows([self.row("TN-S"), self.row("TN-M")])
+        out = io.StringIO()
+        call_command("import_catalog", fh.name, stdout=out)
+        self.assertIn("2 ردیف", out.getvalue())
+        self.assertEqual(ProductVariation.objects.count(), 2)
+
+
+@override_settings(
+    PRODUCT_SIMILARITY={
+        **settings.PRODUCT_SIMILARITY,
+        # لیست کامل (top_k بیشتر از کاتالوگ) تا تساوی امتیاز در مرز top-K بی‌اثر باشد
+        "top_k": 20,
+        "min_score": 0.4,
+        "full_ratio": 0.5,
+        "python_full_ratio": 0.5,
+    }
+)
+class SimilarityBuildTests(TestCase):
+    """products.similarity: ساخت افزایشی باید همان نتیجهٔ ساخت کامل را بدهد."""
+
+    def setUp(self):
+        shirts = Category.objects.create(name="پیراهن")
+        pants = Category.objects.create(name="شلوار")
+        brands = [Brand.objects.create(name=n) for n in ("A", "B")]
+        self.products = [
+            make_product(
+                name=f"محصول {i}",
+                skus=(f"SIM-{i}",),
+                category=(shirts, pants)[i % 2],
+                brand=brands[i // 4],
+                price=Decimal(100000 * (1 + i % 3)),
+            )
+            for i in range(8)
+        ]
+
+    def lists(self):
+        lists = {}
+        for pid, nid, score in ProductNeighbor.objects.filter(
+            kind=ProductNeighbor.Kind.SIMILAR
+        ).values_list("product_id", "neighbor_id", "score"):
+            lists.setdefault(pid, set()).add((nid, round(score, 4)))
+        return lists
+
+    def change(self, product, **fields):
+        for name, value in fields.items():
+            setattr(product, name, value)
+        product.save()
+
+    def test_incremental_matches_full(self):
+        build_similar(full=True)
+        moved, hidden = self.products[0], self.products[2]
+        self.change(moved, category=self.products[1].category, price=Decimal("900000"))
+        self.change(hidden, is_active=False)
+
+        result = build_similar()
+        self.assertFalse(result.full)
+        self.assertEqual(result.changed, 2)
+        incremental = self.lists()
+        self.assertNotIn(hidden.pk, incremental)
+        self.assertTrue(
+            all(hidden.pk not in {n for n, _ in v} for v in incremental.values())
+        )
+
+        build_similar(full=True)
+        self.assertEqual(incremental, self.lists())
+
+    def test_large_change_falls_back_to_full_build(self):
+        build_similar(full=True)
+        for product in self.products[:5]:
+            self.change(product, price=product.price + 1)
+        result = build_similar()
+        self.assertTrue(result.full)
+        self.assertEqual((result.changed, result.recomputed), (5, 8))
+
+
+def png_bytes(size=(800, 400), color=(200, 30, 30)):
+    from PIL import Image
+
+    out = io.BytesIO()
+    Image.new("RGB", size, color).save(out, format="PNG")
+    return out.getvalue()
+
+
+@override_settings(STORAGES=PLAIN_STATIC, CAS_GRACE_SECONDS=0)
+class ImagePipelineTests(TransactionTestCase):
+    """
+    storage محتوامحور، صف ImageJob و ورکر (با executor رشته‌ای به‌جای پروسه)،
+    و خروجی قالب: srcset، ابعاد و placeholder.
+    """
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp(prefix="test_media_")
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        for cache in caches.all():
+            cache.clear()
+
+    def upload(self, name="shirt.png", **kwargs):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        return SimpleUploadedFile(name, png_bytes(**kwargs), content_type="image/png")
+
+    def work(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        from products.imaging import _claim, process_job
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            for job in ImageJob.objects.filter(status=ImageJob.Status.PENDING):
+                self.assertTrue(_claim(job))
+                process_job(job, executor)
+
+    def test_same_content_is_stored_once(self):
+        a = make_product("الف", skus=("A-1",), image=self.upload("a.png"))
+        b = make_product("ب", skus=("B-1",), image=self.upload("b.jpg"))
+        self.assertTrue(a.image.name.startswith(f"{CAS_PREFIX}/"))
+        self.assertEqual(a.image.name, b.image.name[: -len(".jpg")] + ".png")
+        c = make_product("ج", skus=("C-1",), image=self.upload("c.png"))
+        self.assertEqual(c.image.name, a.image.name)
+        self.assertEqual(blob_refcount(a.image.name), 2)
+
+    def test_blob_released_only_without_references(self):
+        a = make_product("الف", skus=("A-1",), image=self.upload())
+        b = make_product("ب", skus=("B-1",), image=self.upload())
+        name = a.image.name
+        a.delete()
+        self.assertTrue(content_addressed_storage.exists(name))
+        b.delete()
+        self.assertFalse(content_addressed_storage.exists(name))
+
+    @override_settings(CAS_GRACE_SECONDS=3600)
+    def test_recent_blob_survives_grace(self):
+        product = make_product(image=self.upload())
+        name = product.image.name
+        product.delete()
+        self.assertTrue(content_addressed_storage.exists(name))
+        self.assertFalse(release_blob(name))
+
+    def test_worker_builds_variants_and_placeholder(self):
+        product = make_product(image=self.upload())
+        job = ImageJob.objects.get()
+        self.assertEqual(job.source, product.image.name)
+        self.assertEqual(
+            (Product.objects.get().image_width, job.status), (800, "pending")
+        )
+
+        self.work()
+        job.refresh_from_db()
+        product.refresh_from_db()
+        self.assertEqual((job.status, job.progress, job.attempts), ("done", 100, 1))
+        self.assertEqual(
+            {label: v["width"] for label, v in product.image_variants.items()},
+            {"thumb": 320, "card": 640, "large": 800},
+        )
+        for variant in product.image_variants.values():
+            self.assertTrue(content_addressed_storage.exists(variant["name"]))
+        self.assertEqual((product.image_width, product.image_height), (800, 400))
+        self.assertTrue(product.image_placeholder.startswith("data:image/webp;base64,"))
+
+    def test_same_image_reuses_finished_derivatives(self):
+        first = make_product("الف", skus=("A-1",), image=self.upload())
+        self.work()
+        first.refresh_from_db()
+        second = make_product("ب", skus=("B-1",), image=self.upload())
+        second.refresh_from_db()
+        self.assertFalse(ImageJob.objects.filter(status=ImageJob.Status.PENDING))
+        self.assertEqual(second.image_variants, first.image_variants)
+        self.assertEqual(second.image_placeholder, first.image_placeholder)
+
+    def test_failure_backs_off_then_fails(self):
+        from products.imaging import _claim, _fail
+
+        make_product(image=self.upload())
+        job = ImageJob.objects.get()
+        for attempt in range(1, job.max_attempts + 1):
+            ImageJob.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            job.refresh_from_db()
+            self.assertTrue(_claim(job))
+            self.assertFalse(_claim(job))
+            with self.assertLogs("products.imaging", "WARNING"):
+                _fail(job, RuntimeError("decode"))
+            job.refresh_from_db()
+            self.assertEqual(job.attempts, attempt)
+        self.assertEqual(job.status, ImageJob.Status.FAILED)
+        self.assertEqual(job.error, "RuntimeError: decode")
+
+    def test_expired_lease_is_reclaimed(self):
+        from products.imaging import _claim
+
+        make_product(image=self.upload())
+        job = ImageJob.objects.get()
+        self.assertTrue(_claim(job))
+        job.refresh_from_db()
+        self.assertFalse(_claim(job))
+        ImageJob.objects.filter(pk=job.pk).update(
+            started_at=timezone.now() - timedelta(hours=1)
+        )
+        self.assertTrue(_claim(job))
+
+    def test_pages_render_dimensions_and_placeholder(self):
+        product = make_product(image=self.upload())
+        no_image = make_product("بدون عکس", skus=("N-1",))
+        self.work()
+        product.refresh_from_db()
+
+        page = self.client.get(product.get_absolute_url()).content.decode()
+        tag = re.search(r'<img id="mainImage"[^>]*>', page).group(0)
+        self.assertIn('width="800" height="400"', tag)
+        self.assertIn('fetchpriority="high"', tag)
+        self.assertNotIn("loading=", tag)
+        self.assertIn(f"background:url('{product.image_placeholder}')", tag)
+        card = content_addressed_storage.url(product.image_variants["card"]["name"])
+        self.assertIn(f"{card} 640w", tag)
+
+        listing = self.client.get(reverse("products:list")).content.decode()
+        cards = re.findall(r'<img src="[^"]*" class="card-img-top"[^>]*>', listing)
+        self.assertEqual(len(cards), 2)
+        self.assertTrue(any('loading="lazy"' in c and "srcset" in c for c in cards))
+        empty = self.client.get(no_image.get_absolute_url()).content.decode()
+        self.assertIn(
+            "img/placeholder.png",
+            re.search(r'<img id="mainImage"[^>]*>', empty).group(0),
+        )
+
+
+class ProductFeedTests(TestCase):
+    """
+    فید gzip: ساخت کامل/افزایشی، تغییر نام برند بدون --full، حذف محصول
+    غیرفعال، و سرو فایل ساخته‌شده از بیرون MEDIA_ROOT.
+    """
+
+    base_url = "https://shop.example"
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix="test_feeds_")
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        feeds = override_settings(PRODUCT_FEED_ROOT=self.root)
+        feeds.enable()
+        self.addCleanup(feeds.disable)
+        self.shirt = make_product("تیشرت", skus=("TS-1", "TS-2"))
+        self.pants = make_product(
+            "شلوار", skus=("PT-1",), brand=Brand.objects.create(name="دیگر")
+        )
+        self.path = feed_path("csv")
+
+    def build(self, **kwargs):
+        return build_feed_file(self.path, "csv", self.base_url, **kwargs)
+
+    def rows(self):
+        with gzip.open(self.path, "rt", encoding="utf-8") as fh:
+            return {row["id"]: row for row in csv.DictReader(fh)}
+
+    def test_default_root_is_not_public(self):
+        with override_settings(PRODUCT_FEED_ROOT=None):
+            root = os.path.abspath(feed_root())
+        self.assertFalse(root.startswith(os.path.abspath(settings.MEDIA_ROOT)))
+        self.assertTrue(self.path.startswith(self.root))
+
+    def test_incremental_rebuilds_only_changed(self):
+        first = self.build()
+        self.assertEqual((first.incremental, first.rendered), (False, 2))
+        second = self.build()
+        self.assertEqual(
+            (second.incremental, second.rendered, second.reused), (True, 0, 2)
+        )
+
+        ProductVariation.objects.filter(sku="TS-2").update(
+            stock=0, updated_at=timezone.now()
+        )
+        third = self.build()
+        self.assertEqual((third.rendered, third.reused), (1, 1))
+        rows = self.rows()
+        self.assertEqual(set(rows), {"TS-1", "TS-2", "PT-1"})
+        self.assertEqual(rows["TS-2"]["availability"], "out_of_stock")
+
+        Product.objects.filter(pk=self.pants.pk).update(is_active=False)
+        self.build()
+        self.assertEqual(set(self.rows()), {"TS-1", "TS-2"})
+
+    def test_brand_rename_without_full(self):
+        self.build()
+        Brand.objects.filter(pk=self.pants.brand_id).update(name="نام تازه")
+        result = self.build()
+        self.assertEqual(
+            (result.incremental, result.rendered, result.reused), (True, 1, 1)
+        )
+        self.assertEqual(self.rows()["PT-1"]["brand"], "نام تازه")
+        Category.objects.filter(pk=self.shirt.category_id).update(name="بالاتنه")
+        self.assertEqual(self.build().rendered, 2)
+        self.assertEqual(self.rows()["TS-1"]["product_type"], "بالاتنه")
+
+    def test_merge_streams_changed_products(self):
+        state = iter([(1, "a"), (3, "c"), (4, "d")])
+        changed = iter([(2, "B"), (3, "C"), (5, "gone")])
+        merged = list(_merge(iter([1, 2, 3, 4, 6]), state, changed, lambda pk: "F"))
+        self.assertEqual(
+            merged,
+            [
+                (1, "a", False),
+                (2, "B", True),
+                (3, "C", True),
+                (4, "d", False),
+                (6, "F", True),
+            ],
+        )
+
+    def test_view_serves_built_file(self):
+        self.build()
+        url = reverse("products:feed", args=["csv"])
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        body = gzip.decompress(b"".join(response.streaming_content)).decode("utf-8")
+        self.assertIn(self.base_url, body)
+
+        response = self.client.get(url)
+        self.assertFalse(response.has_header("Content-Encoding"))
+        body = b"".join(response.streaming_content).decode("utf-8")
+        self.assertIn("TS-1", body)
+        self.assertIn("http://testserver/", body)
+
+
+@override_settings(SITEMAP_SHARD_SIZE=2, SITEMAP_PROBE_INTERVAL=0)
+class SitemapTests(TestCase):
+    """
+    سایت‌مپ تکه‌ای: ساخت، probe بدون تغییر، رندر فقط shard تغییرکرده،
+    حذف shard اضافه و سرو فایل‌های آماده.
+    """
+
+    base_url = "https://shop.example"
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix="test_sitemaps_")
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        root = override_settings(SITEMAP_ROOT=self.root)
+        root.enable()
+        self.addCleanup(root.disable)
+        self.products = [
+            make_product(name, skus=(f"S-{i}",))
+            for i, name in enumerate(("الف", "ب", "ج"))
+        ]
+
+    def build(self, **kwargs):
+        with mock.patch("products.sitemaps.reverse", wraps=reverse) as rev:
+            manifest = build_sitemaps(self.base_url, **kwargs)
+        detail = [c for c in rev.call_args_list if c.args[0] == "products:detail"]
+        return manifest, len(detail)
+
+    def shards(self, manifest, section="products"):
+        return [s["urls"] for s in manifest["shards"] if s["section"] == section]
+
+    def test_build_and_serve(self):
+        self.assertEqual(self.client.get("/sitemap.xml").status_code, 404)
+        manifest, rendered = self.build()
+        self.assertEqual(self.shards(manifest), [2, 1])
+        self.assertEqual(rendered, 3)
+
+        index = self.client.get("/sitemap.xml")
+        self.assertEqual(index["Content-Type"], "application/xml")
+        body = b"".join(index.streaming_content).decode("utf-8")
+        self.assertIn(f"{self.base_url}/sitemap-products-2.xml", body)
+        shard = self.client.get(reverse("sitemap_section", args=["products", 2]))
+        body = b"".join(shard.streaming_content).decode("utf-8")
+        self.assertIn(unquote(self.products[2].get_absolute_url()), unquote(body))
+        missing = reverse("sitemap_section", args=["products", 3])
+        self.assertEqual(self.client.get(missing).status_code, 404)
+
+    def test_unchanged_catalog_writes_nothing(self):
+        self.build()
+        manifest, rendered = self.build()
+        self.assertEqual((manifest["written"], rendered), (0, 0))
+
+    def test_only_changed_shard_is_rendered(self):
+        self.build()
+        Product.objects.filter(pk=self.products[2].pk).update(
+            updated_at=timezone.now() + timedelta(days=1)
+        )
+        manifest, rendered = self.build()
+        # فقط shard دوم محصولات؛ دسته و برند هم lastmod تازه گرفته‌اند
+        self.assertEqual(rendered, 1)
+        self.assertEqual(manifest["written"], 3)
+        self.assertEqual(manifest["skipped"], 1)
+
+    def test_shrinking_catalog_removes_shard(self):
+        self.build()
+        Product.objects.filter(pk=self.products[0].pk).update(is_active=False)
+        manifest, _ = self.build()
+        self.assertEqual(self.shards(manifest), [2])
+        self.assertFalse(
+            os.path.exists(os.path.join(self.root, "sitemap-products-2.xml"))
+        )
+
+    def test_force_rewrites_everything(self):
+        self.build()
+        manifest, rendered = self.build(force=True)
+        self.assertEqual((manifest["written"], rendered), (4, 3))
@@ -5,6 +5,8 @@ app_name = "products"
 
 urlpatterns = [
     path("", views.product_list, name="list"),
+    path("feed/<str:fmt>/", views.product_feed, name="feed"),
+    path("stock/sync/", views.stock_sync, name="stock_sync"),
     path("category/<str:slug>/", views.category_detail, name="category"),
     path("brand/<str:slug>/", views.brand_detail, name="brand"),
     path("<str:slug>/", views.product_detail, name="detail"),
@@ -1,4 +1,18 @@
+import hmac
+import os
+
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponseForbidden,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from django.core.paginator import Paginator
 from django.db.models import (
     Q,
@@ -13,9 +27,24 @@ from django.db.models import (
 )
 from django.db.models.functions import Coalesce
 
+from Shop.conditional import catalog_condition
+from Shop.page_cache import anonymous_page_cache
+from Shop.surrogate import (
+    CATALOG_KEY,
+    brand_key,
+    category_key,
+    product_key,
+    tag_response,
+)
+
+from .feeds import FEED_FORMATS, feed_path, get_serializer, stream_feed
+from .recommendations import neighbors_for
+from .sitemaps import sitemap_path
+from .stock import parse_stock_lines, sync_stock
 from .models import (
     Product,
     ProductImage,
+    ProductNeighbor,
     ProductVariation,
     Category,
     Brand,
@@ -52,6 +81,13 @@ def _descendant_ids(root: Category) -> list[int]:
     return ids
 
 
+def _listing_keys(page, *keys):
+    """
+    کلیدهای surrogate صفحهٔ لیست: catalog (منوی دسته/برند) + محصولات همین صفحه.
+    """
+    return [CATALOG_KEY, *keys, *(product_key(p.pk) for p in page)]
+
+
 def _base_queryset():
     """
     Queryset پایه:
@@ -92,6 +128,27 @@ def _base_queryset():
     )
 
 
+def _search_condition(q: str) -> Q:
+    """
+    جست‌وجوی متنی محصول: نام/توضیحات، یا برند/دسته‌ای که نامش q را دارد.
+    برند/دسته جدا (و با ایندکس خودشان) پیدا می‌شوند و به‌صورت لیست id می‌آیند؛
+    این‌طور هر شاخهٔ OR ایندکس‌پذیر است و PostgreSQL می‌تواند BitmapOr بسازد
+    (تری‌گرام روی name/description، btree روی brand/category — مایگریشن 0010)
+    """
+    cond = Q(name__icontains=q) | Q(description__icontains=q)
+    brand_ids = list(
+        Brand.objects.filter(name__icontains=q).values_list("id", flat=True)
+    )
+    if brand_ids:
+        cond |= Q(brand_id__in=brand_ids)
+    category_ids = list(
+        Category.objects.filter(name__icontains=q).values_list("id", flat=True)
+    )
+    if category_ids:
+        cond |= Q(category_id__in=category_ids)
+    return cond
+
+
 def _apply_filters_sort(request, qs):
     """
     فیلترهای عمومی + مرتب‌سازی برای لیست‌ها/برند/دسته
@@ -99,12 +156,7 @@ def _apply_filters_sort(request, qs):
     """
     q = request.GET.get("q")
     if q:
-        qs = qs.filter(
-            Q(name__icontains=q)
-            | Q(description__icontains=q)
-            | Q(brand__name__icontains=q)
-            | Q(category__name__icontains=q)
-        )
+        qs = qs.filter(_search_condition(q))
 
     brand_slug = request.GET.get("brand")
     if brand_slug:
@@ -144,6 +196,7 @@ def _apply_filters_sort(request, qs):
     return qs, {"q": q, "brand": brand_slug, "cat": cat_slug, "sort": sort}
 
 
+@anonymous_page_cache("products:list")
 def product_list(request):
     """
     لیست محصولات با فیلتر و مرتب‌سازی (پوشش دستهٔ والد + زیر‌دسته‌ها)
@@ -164,11 +217,7 @@ def product_list(request):
 
     q = (request.GET.get("q") or "").strip()
     if q:
-        qs = qs.filter(
-            Q(name__icontains=q)
-            | Q(description__icontains=q)
-            | Q(brand__name__icontains=q)
-        )
+        qs = qs.filter(_search_condition(q))
 
     brand = request.GET.get("brand")
     if brand:
@@ -254,15 +303,55 @@ def product_list(request):
             f"{k}={v}" for k, v in request.GET.items() if k != "page"
         ),
     }
-    return render(request, "products/product_list.html", ctx)
+    response = render(request, "products/product_list.html", ctx)
+    return tag_response(response, _listing_keys(page_obj))
+
+
+# نسخه و زمان تغییر کاتالوگ (catalog_state) در خود ETag/Last-Modified هستند و
+# هر تغییر لیست آن‌ها را عوض می‌کند؛ resolve دسته/برند فقط وجود را بررسی می‌کند.
+# تغییر فقط موجودی نسخه را بالا نمی‌برد و updated_at محصول را تازه می‌کند
+# (products.signals.bump_unless_stock_only)؛ پس صفحهٔ محصول همان را می‌خواند.
+
+
+def _category_changed(request, slug):
+    pk = (
+        Category.objects.filter(slug=slug, is_active=True)
+        .values_list("id", flat=True)
+        .first()
+    )
+    if pk is None:
+        return None
+    return f"category:{pk}", None
+
+
+def _brand_changed(request, slug):
+    brand_id = Brand.objects.filter(slug=slug).values_list("id", flat=True).first()
+    if brand_id is None:
+        return None
+    return f"brand:{brand_id}", None
+
+
+def _product_changed(request, slug):
+    row = (
+        Product.objects.filter(slug=slug, is_active=True)
+        .values_list("id", "updated_at")
+        .first()
+    )
+    if row is None:
+        return None
+    pk, updated_at = row
+    return f"product:{pk}", updated_at
 
 
+@catalog_condition(_category_changed)
+@anonymous_page_cache("products:category")
 def category_detail(request, slug):
     """
     صفحهٔ دسته: محصولات دستهٔ انتخابی + تمام زیر‌دسته‌هایش
     """
     category = get_object_or_404(Category, slug=slug, is_active=True)
-    qs = _base_queryset().filter(category_id__in=_descendant_ids(category))
+    category_ids = _descendant_ids(category)
+    qs = _base_queryset().filter(category_id__in=category_ids)
     qs, params = _apply_filters_sort(request, qs)
 
     paginator = Paginator(qs, 12)
@@ -273,7 +362,7 @@ def category_detail(request, slug):
     ).prefetch_related("children")
     brands = Brand.objects.all()
 
-    return render(
+    response = render(
         request,
         "products/product_list.html",
         {
@@ -286,8 +375,13 @@ def category_detail(request, slug):
             "brands": brands,
         },
     )
+    return tag_response(
+        response, _listing_keys(products, *map(category_key, category_ids))
+    )
 
 
+@catalog_condition(_brand_changed)
+@anonymous_page_cache("products:brand")
 def brand_detail(request, slug):
     brand = get_object_or_404(Brand, slug=slug)
     qs = _base_queryset().filter(brand=brand)
@@ -301,7 +395,7 @@ def brand_detail(request, slug):
     ).prefetch_related("children")
     brands = Brand.objects.all()
 
-    return render(
+    response = render(
         request,
         "products/product_list.html",
         {
@@ -314,6 +408,7 @@ def brand_detail(request, slug):
             "brands": brands,
         },
     )
+    return tag_response(response, _listing_keys(products, brand_key(brand.pk)))
 
 
 def _norm_hex(val: str) -> str:
@@ -330,6 +425,8 @@ def _norm_hex(val: str) -> str:
     return v
 
 
+@catalog_condition(_product_changed)
+@anonymous_page_cache("products:detail")
 def product_detail(request, slug):
     product = get_object_or_404(
         Product.objects.select_related("brand", "category").prefetch_related(
@@ -383,7 +480,16 @@ def product_detail(request, slug):
             sizes.append({"id": v.size_id, "name": v.size.name})
             seen_sizes.add(v.size_id)
 
-    return render(
+    # از پیش محاسبه‌شده (build_product_neighbors / build_similar_products)؛
+    # هر دو لیست در یک کوئری روی ایندکس (product, kind, rank)
+    neighbors = neighbors_for(product.pk)
+    bought_together = neighbors[ProductNeighbor.Kind.BOUGHT_TOGETHER]
+    shown = {p.pk for p in bought_together}
+    similar = [
+        p for p in neighbors[ProductNeighbor.Kind.SIMILAR] if p.pk not in shown
+    ]
+
+    response = render(
         request,
         "products/product_detail.html",
         {
@@ -391,6 +497,8 @@ def product_detail(request, slug):
             "variants": variants,
             "colors": colors,
             "sizes": sizes,
+            "bought_together": bought_together,
+            "similar_products": similar,
             # پارامترهای اختیاری برای نمایش پیام‌ها
             "out_of_stock": request.GET.get("out_of_stock"),
             "available": request.GET.get("available"),
@@ -398,3 +506,88 @@ def product_detail(request, slug):
             "vid": request.GET.get("vid"),
         },
     )
+    return tag_response(
+        response,
+        [
+            CATALOG_KEY,
+            product_key(product.pk),
+            brand_key(product.brand_id),
+            category_key(product.category_id),
+            *(product_key(p.pk) for p in (*bought_together, *similar)),
+        ],
+    )
+
+
+def _stock_token_ok(request) -> bool:
+    expected = getattr(settings, "STOCK_SYNC_TOKEN", "")
+    if not expected:
+        return False
+    header = request.headers.get("Authorization", "")
+    scheme, _, token = header.partition(" ")
+    return scheme.lower() in ("token", "bearer") and hmac.compare_digest(
+        token.strip().encode(), expected.encode()
+    )
+
+
+@csrf_exempt
+@require_POST
+def stock_sync(request):
+    """
+    همگام‌سازی انبوه موجودی برای سیستم انبار (احراز هویت فقط با توکن).
+
+    بدنه: JSON Lines (پیش‌فرض) یا CSV (Content-Type: text/csv) با ستون‌های
+    sku یا barcode و stock (مطلق) یا delta (تغییر). بدنه خط‌به‌خط خوانده می‌شود.
+    """
+    if not _stock_token_ok(request):
+        return HttpResponseForbidden()
+
+    fmt = "csv" if "csv" in (request.content_type or "") else "jsonl"
+    try:
+        result = sync_stock(
+            parse_stock_lines(request, fmt),
+            chunk_size=getattr(settings, "STOCK_SYNC_CHUNK_SIZE", 1000),
+        )
+    except ValueError as exc:
+        # JSON خراب؛ دسته‌های قبلی commit شده‌اند
+        return JsonResponse({"error": str(exc)}, status=400)
+    return JsonResponse(result.as_dict())
+
+
+def product_feed(request, fmt):
+    """
+    فید کامل محصولات فعال.
+    اگر build_product_feed فایل gzip را ساخته باشد (PRODUCT_FEED_ROOT) و کلاینت
+    gzip بپذیرد همان فایل سرو می‌شود؛ وگرنه به‌صورت جریانی ساخته می‌شود.
+    """
+    if fmt not in FEED_FORMATS:
+        raise Http404
+    content_type = get_serializer(fmt).content_type
+    path = feed_path(fmt)
+    if "gzip" in request.headers.get("Accept-Encoding", "") and os.path.exists(path):
+        response = FileResponse(open(path, "rb"), content_type=content_type)
+        response["Content-Encoding"] = "gzip"
+    else:
+        base_url = getattr(settings, "PRODUCT_FEED_BASE_URL", "") or (
+            request.build_absolute_uri("/").rstrip("/")
+        )
+        response = StreamingHttpResponse(
+            stream_feed(fmt, base_url), content_type=content_type
+        )
+    patch_vary_headers(response, ("Accept-Encoding",))
+    response["Content-Disposition"] = f'inline; filename="products.{fmt}"'
+    return response
+
+
+def _sitemap_response(path):
+    # فایل‌ها را فقط manage.py build_sitemaps (با SITEMAP_BASE_URL) می‌سازد
+    if path is None or not os.path.exists(path):
+        raise Http404
+    return FileResponse(open(path, "rb"), content_type="application/xml")
+
+
+def sitemap_index(request):
+    return _sitemap_response(sitemap_path())
+
+
+def sitemap_section(request, section, page):
+    return _sitemap_response(sitemap_path(section, page))